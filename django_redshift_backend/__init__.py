@@ -1,4 +1,22 @@
-from .meta import DistKey, SortKey  # noqa
+from .meta import (  # noqa
+    DistKey,
+    DistStyle,
+    MaterializedView,
+    SortKey,
+    SortKeys,
+    SortStyle,
+)
+from .aggregates import (  # noqa
+    ApproxCountDistinct,
+    ApproxPercentileDisc,
+    HllCombine,
+    HllCreateSketch,
+    Median,
+)
+from .fields import CompactUUIDField, HLLSketchField, SuperJSONField  # noqa
+from .functions import HllCardinality, HllCombineSketches  # noqa
+from .query import RedshiftQuerySet, estimated_count  # noqa
+from .paginator import EstimatedCountPaginator, KeysetPaginator  # noqa
 
 # py38 or later
 from importlib.metadata import version, PackageNotFoundError
@@ -0,0 +1,117 @@
+"""
+Aggregates of Redshift.
+
+``HllCreateSketch`` and ``HllCombine`` aggregate values and sketches of a
+HLLSketchField into a HyperLogLog sketch.
+
+``Count(distinct=True)`` is compiled to ``APPROXIMATE COUNT(DISTINCT ...)``,
+estimated by HyperLogLog, with the ``REDSHIFT_APPROXIMATE_COUNT_DISTINCT``
+setting or in a queryset of ``RedshiftQuerySet.approximate()``, including its
+subqueries.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Aggregate, Count, IntegerField
+from django.db.models.functions.mixins import NumericOutputFieldMixin
+
+from .fields import HLLSketchField
+
+
+class ApproxCountDistinct(Aggregate):
+    """Approximate number of distinct values, by APPROXIMATE COUNT(DISTINCT)."""
+
+    function = "COUNT"
+    name = "ApproxCountDistinct"
+    template = "APPROXIMATE %(function)s(DISTINCT %(expressions)s)"
+    output_field = IntegerField()
+    empty_result_set_value = 0
+
+
+class ApproxPercentileDisc(Aggregate):
+    """Approximate value of the percentile between 0 and 1, by APPROXIMATE
+    PERCENTILE_DISC.
+    """
+
+    function = "PERCENTILE_DISC"
+    name = "ApproxPercentileDisc"
+    template = (
+        "APPROXIMATE %(function)s(%(percentile)s) "
+        "WITHIN GROUP (ORDER BY %(expressions)s)"
+    )
+
+    def __init__(self, expression, percentile, **extra):
+        if not isinstance(percentile, (int, float)) or not 0 <= percentile <= 1:
+            raise ValueError(
+                "ApproxPercentileDisc percentile must be a number between 0 and 1, "
+                "got %r." % (percentile,)
+            )
+        super().__init__(expression, percentile=percentile, **extra)
+
+
+class Median(NumericOutputFieldMixin, Aggregate):
+    """Median of the values, interpolated between the middle values."""
+
+    function = "MEDIAN"
+    name = "Median"
+
+
+class HllCreateSketch(Aggregate):
+    """HyperLogLog sketch of the values, by HLL_CREATE_SKETCH."""
+
+    function = "HLL_CREATE_SKETCH"
+    name = "HllCreateSketch"
+    output_field = HLLSketchField()
+
+
+class HllCombine(Aggregate):
+    """Union of the HyperLogLog sketches, by HLL_COMBINE."""
+
+    function = "HLL_COMBINE"
+    name = "HllCombine"
+    output_field = HLLSketchField()
+
+
+# approximate() of the query being compiled, for its subqueries.
+_approximate = ContextVar("approximate", default=None)
+
+
+@contextmanager
+def approximate_context(approximate):
+    """
+    Compile the subqueries of the query being compiled with its approximate(),
+    unless None.
+    """
+    if approximate is None:
+        yield
+        return
+    token = _approximate.set(approximate)
+    try:
+        yield
+    finally:
+        _approximate.reset(token)
+
+
+def is_approximate(query, connection):
+    # An aggregation over a subquery is compiled by an AggregateQuery of the
+    # query of the queryset.
+    while query is not None:
+        approximate = getattr(query, "approximate", None)
+        if approximate is not None:
+            return approximate
+        query = getattr(query, "inner_query", None)
+    approximate = _approximate.get()
+    if approximate is not None:
+        return approximate
+    return connection.ops.approximate_count_distinct
+
+
+def count_as_redshift(self, compiler, connection, **extra_context):
+    sql, params = self.as_sql(compiler, connection, **extra_context)
+    if self.distinct and is_approximate(compiler.query, connection):
+        sql = "APPROXIMATE " + sql
+    return sql, params
+
+
+Count.as_redshift = count_as_redshift
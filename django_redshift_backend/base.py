@@ -4,21 +4,33 @@ Redshift database backend for Django based upon django PostgreSQL backend.
 Requires psycopg 2: http://initd.org/projects/psycopg2
 """
 
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
 from copy import deepcopy
+import hashlib
 import re
+import sys
+import time
 import uuid
 import logging
 import json
 
+from django.apps import apps
 from django.utils import timezone
 from django.conf import settings
 from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
-from django.db.models import Index
+from django.db import transaction
+from django.db.models import Index, UniqueConstraint
 from django.db.models.expressions import Col
-from django.db.utils import NotSupportedError, ProgrammingError
+from django.db.utils import DatabaseError, NotSupportedError, ProgrammingError
 
 try:
-    from psycopg2.extensions import Binary
+    from psycopg2.extensions import (
+        ISQLQuote,
+        TRANSACTION_STATUS_INERROR,
+        Binary,
+        adapt,
+    )
 except ImportError:
     raise ImproperlyConfigured(
         "Error loading psycopg2 module. Please install as: `pip install django-redshift-backend[psycopg2]` or `pip install django-redshift-backend[psycopg2-binary]`. For more information, see https://django-redshift-backend.readthedocs.io/en/master/basic.html#installation"
@@ -30,8 +42,9 @@ from ._vendor.django40.db.backends.base.schema import (
     _related_non_m2m_objects,
 )
 from ._vendor.django40.db.backends.base.validation import BaseDatabaseValidation
-from ._vendor.django40.db.backends.ddl_references import Statement
+from ._vendor.django40.db.backends.ddl_references import Statement, Table
 from ._vendor.django40.db.backends.postgresql.base import (
+    CursorDebugWrapper as BasePGCursorDebugWrapper,
     DatabaseFeatures as BasePGDatabaseFeatures,
     DatabaseWrapper as BasePGDatabaseWrapper,
     DatabaseOperations as BasePGDatabaseOperations,
@@ -40,11 +53,51 @@ from ._vendor.django40.db.backends.postgresql.base import (
     DatabaseCreation as BasePGDatabaseCreation,
     DatabaseIntrospection as BasePGDatabaseIntrospection,
 )
-from .meta import DistKey, SortKey
+from ._vendor.django40.db.backends.utils import CursorWrapper as BaseCursorWrapper
+from . import aggregates, lookups  # noqa: F401 (adds as_redshift to them)
+from .fields import SuperJSONField
+from .meta import (
+    DistKey,
+    DistStyle,
+    MaterializedView,
+    SortKey,
+    SortKeys,
+    SortStyle,
+    TableStyle,
+)
 from .psycopg2adapter import RedshiftBinary
 
 logger = logging.getLogger("django.db.backends")
 
+# Distribution and sort key columns of a table.
+TableKeys = namedtuple("TableKeys", ["distkey", "sortkeys", "interleaved"])
+# Size and layout of a table, from svv_table_info.
+TableStorageInfo = namedtuple(
+    "TableStorageInfo",
+    ["diststyle", "sortkey1", "unsorted", "tbl_rows", "estimated_visible_rows", "size"],
+)
+# Owner of a table and [(grantee, [privilege, ...]), ...] granted on it, from
+# pg_class.
+TablePrivileges = namedtuple("TablePrivileges", ["owner", "grants"])
+# Refresh state of a materialized view, from stv_mv_info.
+MaterializedViewInfo = namedtuple(
+    "MaterializedViewInfo", ["is_stale", "state", "autorefresh"]
+)
+
+# table names written by each statement of a cursor.
+_write_statement_re = re.compile(
+    r"(?:^|;)\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?|COPY)\s+"
+    r'(?:"?[\w$]+"?\.)?"?([\w$]+)"?',
+    re.I,
+)
+# {table: rows} written through the connections of each alias since the last
+# flush, tracked for the test databases with "FLUSH_WRITTEN_TABLES". The rows
+# are None if unknown.
+_written_tables = {}
+# {(alias, table): (expiry, rows)} of the row counts estimated by
+# svv_table_info, shared by the connections of the threads.
+_estimated_row_counts = {}
+
 
 class DatabaseFeatures(BasePGDatabaseFeatures):
     minimum_database_version = (8,)  # Redshift is postgres 8.0.2
@@ -79,7 +132,43 @@ class DatabaseFeatures(BasePGDatabaseFeatures):
     delete_can_self_reference_subquery = True
 
 
+class InTempTable:
+    """
+    The temporary table of the values of an ``__in`` lookup, as a parameter
+    of the query adapted to the quoted name of the table. The cursor creates
+    the table before executing the query, and drops it after.
+    """
+
+    def __init__(self, name, db_type, values, distkey=False):
+        self.name = name
+        self.db_type = db_type
+        self.values = values
+        self.distkey = distkey
+
+    def __str__(self):
+        return self.name
+
+    def __conform__(self, proto):
+        if proto is ISQLQuote:
+            return self
+
+    def getquoted(self):
+        return self.name.encode()
+
+
+def _get_in_temp_tables(params):
+    if not isinstance(params, (list, tuple)):
+        return []
+    tables = {}
+    for param in params:
+        if isinstance(param, InTempTable):
+            tables.setdefault(param.name, param)
+    return list(tables.values())
+
+
 class DatabaseOperations(BasePGDatabaseOperations):
+    compiler_module = "django_redshift_backend.compiler"
+
     def last_insert_id(self, cursor, table_name, pk_name):
         """
         Amazon Redshift doesn't support RETURNING, so this method
@@ -118,6 +207,183 @@ class DatabaseOperations(BasePGDatabaseOperations):
         # impossible with Redshift to reset a sequence
         return []
 
+    @property
+    def flush_delete_max_rows(self):
+        return getattr(settings, "REDSHIFT_FLUSH_DELETE_MAX_ROWS", 10000)
+
+    @property
+    def in_temp_table_min_values(self):
+        min_values = getattr(settings, "REDSHIFT_IN_TEMP_TABLE_MIN_VALUES", None)
+        return None if min_values is None else int(min_values)
+
+    @property
+    def approximate_count_distinct(self):
+        return bool(getattr(settings, "REDSHIFT_APPROXIMATE_COUNT_DISTINCT", False))
+
+    @property
+    def estimated_count_timeout(self):
+        return getattr(settings, "REDSHIFT_ESTIMATED_COUNT_TIMEOUT", 60)
+
+    def estimated_row_count(self, table):
+        """
+        Return the number of visible rows of the table estimated by
+        svv_table_info, cached for ``REDSHIFT_ESTIMATED_COUNT_TIMEOUT`` seconds.
+        """
+        key = (self.connection.alias, table)
+        now = time.monotonic()
+        cached = _estimated_row_counts.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        with self.connection.cursor() as cursor:
+            info = self.connection.introspection.get_table_info(cursor, table)
+        if info is None:
+            # An empty table isn't listed.
+            rows = 0
+        elif info.estimated_visible_rows is not None:
+            rows = int(info.estimated_visible_rows)
+        else:
+            rows = int(info.tbl_rows)
+        _estimated_row_counts[key] = (now + self.estimated_count_timeout, rows)
+        return rows
+
+    # rows of an INSERT statement into the temp table of an ``__in`` lookup.
+    in_temp_table_batch_size = 10000
+
+    def in_temp_table(self, values, field, distkey=False):
+        """
+        Return an InTempTable of the values in a "value" column of the type of
+        the field, of which the name is the hash of the adapted values. It's
+        distributed by the values with ``distkey``, to join with a table of the
+        same distkey, or to all nodes.
+        """
+        db_type = field.rel_db_type(self.connection)
+        if re.match(r"(var)?char\b", db_type):
+            # As long as the longest value, in bytes of Redshift.
+            max_bytes = max(len(str(value).encode()) for value in values)
+            db_type = "varchar(%s)" % max(max_bytes, 1)
+        quoted = []
+        for value in values:
+            adapted = adapt(value)
+            if hasattr(adapted, "encoding"):
+                adapted.encoding = "utf8"
+            quoted.append(adapted.getquoted())
+        # The same table for the values in any order.
+        digest = hashlib.sha1(b",".join([db_type.encode(), *sorted(quoted)]))
+        name = self.quote_name("django_in_%s" % digest.hexdigest()[:16])
+        return InTempTable(name, db_type, values, distkey)
+
+    def create_in_temp_tables(self, tables):
+        """
+        Create the temporary tables of the session, filled with the values.
+        """
+        column = self.quote_name("value")
+        with self.connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute("DROP TABLE IF EXISTS %s" % table)
+                cursor.execute(
+                    "CREATE TEMP TABLE %s (%s %s) %s SORTKEY(%s)"
+                    % (
+                        table,
+                        column,
+                        table.db_type,
+                        "DISTKEY(%s)" % column if table.distkey else "DISTSTYLE ALL",
+                        column,
+                    )
+                )
+                values = table.values
+                for offset in range(0, len(values), self.in_temp_table_batch_size):
+                    batch = values[offset : offset + self.in_temp_table_batch_size]
+                    cursor.execute(
+                        "INSERT INTO %s VALUES %s"
+                        % (table, ", ".join(["(%s)"] * len(batch))),
+                        batch,
+                    )
+
+    def drop_temp_tables(self, tables):
+        """
+        Drop the temporary tables, unless the transaction failed, of which no
+        statement can be executed until the rollback, which drops the tables
+        created in the transaction. Other tables are dropped at the end of the
+        session.
+        """
+        connection = self.connection.connection
+        if self.connection.needs_rollback or (
+            connection is not None
+            and connection.get_transaction_status() == TRANSACTION_STATUS_INERROR
+        ):
+            return
+        with self.connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute("DROP TABLE IF EXISTS %s" % table)
+
+    def create_temp_table_as(self, table, sql, params, distkey=None, sortkey=()):
+        """
+        Create a temporary table of the session with the result of the query,
+        distributed by the ``distkey`` column and sorted by the ``sortkey``
+        columns.
+        """
+        parts = ["CREATE TEMP TABLE %s" % self.quote_name(table)]
+        if distkey is not None:
+            parts.append("DISTKEY(%s)" % self.quote_name(distkey))
+        if sortkey:
+            parts.append(
+                "SORTKEY(%s)" % ", ".join(self.quote_name(column) for column in sortkey)
+            )
+        parts.append("AS %s" % sql)
+        with self.connection.cursor() as cursor:
+            cursor.execute(" ".join(parts), params)
+
+    def sql_flush(self, style, tables, *, reset_sequences=False, allow_cascade=False):
+        """
+        Redshift's TRUNCATE takes one table and commits implicitly, so each
+        table is truncated by its own statement.
+
+        In a test database with ``"FLUSH_WRITTEN_TABLES": True``, only the
+        tables written since the last flush are flushed, and the tables with
+        up to ``REDSHIFT_FLUSH_DELETE_MAX_ROWS`` written rows are deleted in
+        one transaction before the larger ones are truncated. IDENTITY
+        columns can't be reset, so ``reset_sequences`` is ignored.
+        """
+        written_tables = self.connection.written_tables
+        if written_tables is not None:
+            tables = [table for table in tables if table in written_tables]
+        max_rows = self.flush_delete_max_rows
+        deletes = []
+        truncates = []
+        for table in tables:
+            rows = None if written_tables is None else written_tables[table]
+            if rows is not None and (max_rows is None or rows <= max_rows):
+                deletes.append(
+                    "%s %s;"
+                    % (
+                        style.SQL_KEYWORD("DELETE FROM"),
+                        style.SQL_FIELD(self.quote_name(table)),
+                    )
+                )
+            else:
+                truncates.append(
+                    "%s %s;"
+                    % (
+                        style.SQL_KEYWORD("TRUNCATE"),
+                        style.SQL_FIELD(self.quote_name(table)),
+                    )
+                )
+        # The first TRUNCATE commits the DELETEs.
+        return deletes + truncates
+
+    def execute_sql_flush(self, sql_list):
+        started = time.monotonic()
+        super().execute_sql_flush(sql_list)
+        written_tables = self.connection.written_tables
+        if written_tables is not None:
+            written_tables.clear()
+        logger.info(
+            "Flushed %s tables of %s in %.3fs.",
+            len(sql_list),
+            self.connection.alias,
+            time.monotonic() - started,
+        )
+
     def get_db_converters(self, expression):
         converters = super().get_db_converters(expression)
         internal_type = expression.output_field.get_internal_type()
@@ -126,8 +392,12 @@ class DatabaseOperations(BasePGDatabaseOperations):
         return converters
 
     def convert_uuidfield_value(self, value, expression, connection):
-        if value is not None:
-            value = uuid.UUID(value)
+        if value is not None and not isinstance(value, uuid.UUID):
+            if isinstance(value, (bytes, memoryview)):
+                # varbyte(16) of CompactUUIDField
+                value = uuid.UUID(bytes=bytes(value))
+            else:
+                value = uuid.UUID(value)
         return value
 
     def distinct_sql(self, fields, *args):
@@ -142,6 +412,33 @@ class DatabaseOperations(BasePGDatabaseOperations):
     def adapt_integerfield_value(self, value, internal_type):
         return value
 
+    # internal types stored as varchar or char, compared as is by text lookups.
+    text_internal_types = {
+        "CharField",
+        "FileField",
+        "FilePathField",
+        "SlugField",
+        "TextField",
+        "UUIDField",
+    }
+
+    def lookup_cast(self, lookup_type, internal_type=None):
+        """
+        Compare the text columns as is, and case-insensitively with ILIKE
+        instead of ``UPPER(column::text)``: a cast or a function around a
+        column, as a sortkey, defeats the zone maps of Redshift.
+        """
+        if internal_type in self.text_internal_types:
+            return "%s"
+        if lookup_type in ("iexact", "icontains", "istartswith", "iendswith"):
+            # Cast to text as the other text lookups, ILIKE ignores the case.
+            lookup_type = "contains"
+        return super().lookup_cast(lookup_type, internal_type)
+
+    def prep_for_iexact_query(self, x):
+        # iexact is ILIKE, escape the wildcards.
+        return self.prep_for_like_query(x)
+
     def insert_statement(self, on_conflict=None):
         return "INSERT INTO"
 
@@ -162,11 +459,114 @@ class DatabaseOperations(BasePGDatabaseOperations):
 
         return lhs_expr, rhs_expr
 
+    # copy from django 4.2 postgresql/operations.py
+    # The SQL of the datetime functions takes params since django-4.1.
+    def date_extract_sql(self, lookup_type, sql, params):
+        if lookup_type == "week_day":
+            # For consistency across backends, we return Sunday=1, Saturday=7.
+            return f"EXTRACT(DOW FROM {sql}) + 1", params
+        elif lookup_type == "iso_week_day":
+            return f"EXTRACT(ISODOW FROM {sql})", params
+        elif lookup_type == "iso_year":
+            return f"EXTRACT(ISOYEAR FROM {sql})", params
+        return f"EXTRACT({lookup_type.upper()} FROM {sql})", params
+
+    def date_trunc_sql(self, lookup_type, sql, params, tzname=None):
+        sql, params = self._convert_sql_to_tz(sql, params, tzname)
+        return f"DATE_TRUNC(%s, {sql})", (lookup_type, *params)
+
+    def _convert_sql_to_tz(self, sql, params, tzname):
+        if tzname and settings.USE_TZ:
+            tzname_param = self._prepare_tzname_delta(tzname)
+            return f"{sql} AT TIME ZONE %s", (*params, tzname_param)
+        return sql, params
+
+    def datetime_cast_date_sql(self, sql, params, tzname):
+        sql, params = self._convert_sql_to_tz(sql, params, tzname)
+        return f"({sql})::date", params
+
+    def datetime_cast_time_sql(self, sql, params, tzname):
+        sql, params = self._convert_sql_to_tz(sql, params, tzname)
+        return f"({sql})::time", params
+
+    def datetime_extract_sql(self, lookup_type, sql, params, tzname):
+        sql, params = self._convert_sql_to_tz(sql, params, tzname)
+        if lookup_type == "second":
+            # Truncate fractional seconds.
+            return f"EXTRACT(SECOND FROM DATE_TRUNC(%s, {sql}))", ("second", *params)
+        return self.date_extract_sql(lookup_type, sql, params)
+
+    def datetime_trunc_sql(self, lookup_type, sql, params, tzname):
+        sql, params = self._convert_sql_to_tz(sql, params, tzname)
+        return f"DATE_TRUNC(%s, {sql})", (lookup_type, *params)
+
+    def time_extract_sql(self, lookup_type, sql, params):
+        if lookup_type == "second":
+            # Truncate fractional seconds.
+            return f"EXTRACT(SECOND FROM DATE_TRUNC(%s, {sql}))", ("second", *params)
+        return self.date_extract_sql(lookup_type, sql, params)
+
+    def time_trunc_sql(self, lookup_type, sql, params, tzname=None):
+        sql, params = self._convert_sql_to_tz(sql, params, tzname)
+        return f"DATE_TRUNC(%s, {sql})::time", (lookup_type, *params)
+
     # copy from djang 4.2 base/operations.py
     def adapt_json_value(self, value, encoder):
         return json.dumps(value, cls=encoder)
 
 
+class CursorTrackingMixin:
+    """
+    Track the tables and the number of rows written by the statements, for
+    sql_flush(), and create the temporary tables of ``__in`` lookups in the
+    params of a statement while executing it.
+    """
+
+    def execute(self, sql, params=None):
+        in_temp_tables = _get_in_temp_tables(params)
+        if in_temp_tables:
+            self.db.ops.create_in_temp_tables(in_temp_tables)
+        try:
+            result = super().execute(sql, params)
+        finally:
+            if in_temp_tables:
+                self._release_in_temp_tables(in_temp_tables)
+        self.db.track_written_tables(sql, self.cursor.rowcount)
+        return result
+
+    def executemany(self, sql, param_list):
+        result = super().executemany(sql, param_list)
+        self.db.track_written_tables(sql, self.cursor.rowcount)
+        return result
+
+    def _release_in_temp_tables(self, tables):
+        if getattr(self.cursor, "name", None) is None:
+            self.db.ops.drop_temp_tables(tables)
+        else:
+            # A server-side cursor reads the tables until it's closed.
+            self._in_temp_tables = tables
+
+    def close(self):
+        try:
+            self.cursor.close()
+        finally:
+            tables = self.__dict__.pop("_in_temp_tables", None)
+            if tables:
+                self.db.ops.drop_temp_tables(tables)
+
+
+class CursorWrapper(CursorTrackingMixin, BaseCursorWrapper):
+    pass
+
+
+class CursorDebugWrapper(CursorTrackingMixin, BasePGCursorDebugWrapper):
+    pass
+
+
+def _is_bytea_binary(param):
+    return isinstance(param, Binary) and not isinstance(param, RedshiftBinary)
+
+
 def _get_type_default(field):
     internal_type = field.get_internal_type()
     if internal_type in ("CharField", "SlugField"):
@@ -195,23 +595,266 @@ def _get_type_default(field):
         default = timezone.time()
     elif internal_type == "DateTimeField":
         default = timezone.now()
+    elif internal_type == "UUIDField":
+        default = uuid.UUID(int=0)
     else:
         default = None
     return default
 
 
+_integer_types = (
+    "AutoField",
+    "BigAutoField",
+    "BigIntegerField",
+    "IntegerField",
+    "PositiveBigIntegerField",
+    "PositiveIntegerField",
+    "PositiveSmallIntegerField",
+    "SmallAutoField",
+    "SmallIntegerField",
+)
+
+
 def _remove_length_from_type(column_type):
     return re.sub(r"\(.*", "", column_type)
 
 
+def _get_type_cast(old_field, new_field):
+    type_cast = ""
+    if new_field.get_internal_type() == "BinaryField":
+        # In most cases, we don't change the type to a type that can't be cast,
+        # so we don't check it.
+        type_cast = "::" + _remove_length_from_type(
+            DatabaseWrapper.data_types["BinaryField"]
+        )
+    elif (
+        old_field.get_internal_type() == "BinaryField"
+        and new_field.get_internal_type() == "CharField"
+    ):
+        type_cast = "::" + _remove_length_from_type(
+            DatabaseWrapper.data_types["CharField"]
+        )
+    return type_cast
+
+
+def _get_uuid_storage(field):
+    """
+    Return the storage of a UUIDField: "varchar", or the storage of a
+    CompactUUIDField. None for the other fields.
+    """
+    if field.get_internal_type() != "UUIDField":
+        return None
+    return getattr(field, "storage", "varchar")
+
+
+class ChunkedUpdate:
+    """
+    An UPDATE of all rows of a table, that is executed in ranges of the
+    integer key column by the schema editor.
+    """
+
+    def __init__(self, table, assignments, where=None, key=None):
+        self.table = table
+        self.assignments = assignments
+        self.where = where
+        self.key = key
+
+    def sql(self, condition=None):
+        conditions = [c for c in (self.where, condition) if c]
+        sql = "UPDATE %s SET %s" % (self.table, self.assignments)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return sql
+
+    def __str__(self):
+        return self.sql()
+
+
+class DeepCopy:
+    """
+    A copy of a table into a new table of the altered columns, that is
+    executed by the schema editor in one transaction after locking the table,
+    so that the IDENTITY columns are seeded by the rows that are copied.
+    """
+
+    def __init__(
+        self, model, table, new_table, old_table, alterations, encodings, grants
+    ):
+        self.model = model
+        self.table = table
+        self.new_table = new_table
+        self.old_table = old_table
+        self.alterations = alterations
+        self.encodings = encodings
+        self.grants = grants
+
+
 class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
     sql_create_table = "CREATE TABLE %(table)s (%(definition)s) %(options)s"
+    sql_create_materialized_view = (
+        "CREATE MATERIALIZED VIEW %(table)s %(options)s AS %(query)s"
+    )
+    sql_delete_materialized_view = "DROP MATERIALIZED VIEW %(table)s"
     sql_delete_fk = "ALTER TABLE %(table)s DROP CONSTRAINT %(name)s"
+    sql_alter_diststyle = "ALTER TABLE %(table)s ALTER DISTSTYLE %(style)s"
+    sql_alter_sortkey = "ALTER TABLE %(table)s ALTER %(sortkey)s"
+    sql_create_backfill_table = (
+        "CREATE TABLE IF NOT EXISTS %(table)s ("
+        "table_name varchar(127) NOT NULL, assignments varchar(max) NOT NULL, "
+        "last_value bigint NULL, updated_at timestamp NOT NULL)"
+    )
+    # bookkeeping table of the chunked backfills, to resume them.
+    backfill_table = "django_redshift_backfill"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # deferred statements that reset a table option removed by the migration,
+        # keyed by (table, option).
+        self._deferred_option_resets = {}
+        # statements that altered a table option in the migration, keyed by
+        # (table, option).
+        self._altered_options = {}
+        # "recreate", "deep_copy" or None to choose by the size of the table.
+        self.alter_column_strategy = None
+        # columns to recreate in batch_alterations(), keyed by table.
+        self._batched_alterations = None
+        # (sql, params) to execute at once by REDSHIFT_BATCH_STATEMENTS.
+        self._batched_statements = []
+        # models of the materialized views removed, keyed by table, of which
+        # the table is created before any other statement unless the view is
+        # created again.
+        self._removed_views = {}
 
     @property
     def multiply_varchar_length(self):
         return int(getattr(settings, "REDSHIFT_VARCHAR_LENGTH_MULTIPLIER", 1))
 
+    def __enter__(self):
+        super().__enter__()
+        if self.batch_statements and not self.collect_sql:
+            self.connection.batching_schema_editor = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self._removed_views:
+            self._create_removed_view_tables()
+        if self.connection.batching_schema_editor is self:
+            try:
+                if exc_type is None:
+                    for sql in self.deferred_sql:
+                        self.execute(sql)
+                    self.deferred_sql = []
+                self.flush_statements()
+            finally:
+                self.connection.batching_schema_editor = None
+        return super().__exit__(exc_type, exc_value, traceback)
+
+    def execute(self, sql, params=()):
+        # Any other statement may depend on the tables of removed views.
+        if self._removed_views:
+            self._create_removed_view_tables()
+        # Any other statement may depend on the batched columns.
+        if self._batched_alterations:
+            self.flush_alterations()
+        if isinstance(sql, ChunkedUpdate):
+            return self._execute_chunked_update(sql)
+        if isinstance(sql, DeepCopy):
+            return self._execute_deep_copy(sql)
+        if (
+            self.connection.batching_schema_editor is self
+            and not self.connection.in_atomic_block
+        ):
+            sql = str(sql)
+            logger.debug(
+                "%s; (params %r)", sql, params, extra={"params": params, "sql": sql}
+            )
+            self._batched_statements.append((sql, params))
+            if len(self._batched_statements) >= self.batch_statements:
+                self.flush_statements()
+            return
+        return super().execute(sql, params)
+
+    def flush_statements(self):
+        """
+        Execute the statements batched by the ``REDSHIFT_BATCH_STATEMENTS``
+        setting with one round trip.
+
+        The statements run in one implicit transaction. When it fails, they
+        are executed one by one to raise the error of the failed statement.
+        """
+        statements = self._batched_statements
+        self._batched_statements = []
+        if not statements:
+            return
+        with self.connection.cursor() as cursor:
+            sqls = [
+                sql if params is None else cursor.mogrify(sql, params).decode()
+                for sql, params in statements
+            ]
+            if len(sqls) == 1:
+                cursor.execute(sqls[0])
+                return
+            try:
+                cursor.execute(";\n".join(sqls))
+            except DatabaseError:
+                logger.info(
+                    "Batch of %s statements failed, executing them one by one.",
+                    len(sqls),
+                )
+                for sql in sqls:
+                    cursor.execute(sql)
+
+    @contextmanager
+    def batch_alterations(self):
+        """
+        Recreate the columns altered in the block once per table, instead
+        of a table rewrite for each column.
+
+        The alterations are applied before any other statement, and at the
+        end of the block.
+        """
+        if self._batched_alterations is not None:
+            yield
+            return
+        self._batched_alterations = {}
+        try:
+            yield
+            self.flush_alterations()
+        finally:
+            self._batched_alterations = None
+
+    def flush_alterations(self):
+        """
+        Apply the columns alterations batched by `batch_alterations()`.
+        """
+        if not self._batched_alterations:
+            return
+        batched = self._batched_alterations
+        self._batched_alterations = {}
+        for model, alterations in batched.values():
+            fragment, actions = self._alter_columns_sqls(
+                model, list(alterations.values())
+            )
+            if fragment:
+                actions.insert(0, fragment)
+            for sql, params in actions:
+                self.execute(sql, params)
+
+    @property
+    def batch_statements(self):
+        batch_statements = getattr(settings, "REDSHIFT_BATCH_STATEMENTS", None)
+        return None if batch_statements is None else int(batch_statements)
+
+    @property
+    def backfill_chunk_size(self):
+        chunk_size = getattr(settings, "REDSHIFT_BACKFILL_CHUNK_SIZE", None)
+        return None if chunk_size is None else int(chunk_size)
+
+    @property
+    def deep_copy_min_rows(self):
+        min_rows = getattr(settings, "REDSHIFT_DEEP_COPY_MIN_ROWS", None)
+        return None if min_rows is None else int(min_rows)
+
     def _model_indexes_sql(self, model):
         # Redshift doesn't support INDEX.
         return []
@@ -230,18 +873,51 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
         return
 
     def add_index(self, model, index, concurrently=False):
-        # Redshift doesn't support INDEX.
-        pass
+        # Redshift doesn't support INDEX, but DistKey and SortKeys are altered in place.
+        # https://docs.aws.amazon.com/redshift/latest/dg/r_ALTER_TABLE.html
+        if isinstance(index, DistKey):
+            self._get_diststyle(model)  # validate
+            column = self._column_name(model, index.fields[0])
+            keys = self._get_table_keys(model)
+            if keys is None or keys.distkey != column:
+                self._alter_table_option(
+                    model, "diststyle", self._alter_diststyle_sql(model, "KEY")
+                )
+        elif isinstance(index, SortKeys):
+            sortstyle = self._get_sortstyle(model)
+            style = sortstyle.style if sortstyle else None
+            columns = [self._column_name(model, field) for field in index.fields]
+            keys = self._get_table_keys(model)
+            if (
+                keys is None
+                or keys.sortkeys != columns
+                or keys.interleaved != (style == "INTERLEAVED")
+            ):
+                self._alter_table_option(
+                    model, "sortkey", self._alter_sortkey_sql(model, style)
+                )
 
     def remove_index(self, model, index, concurrently=False):
-        # Redshift doesn't support INDEX.
-        pass
+        # Redshift doesn't support INDEX, but DistKey and SortKeys are reset in place.
+        if isinstance(index, DistKey):
+            self._defer_option_reset(
+                model, "diststyle", self._alter_diststyle_sql(model, "AUTO")
+            )
+        elif isinstance(index, SortKeys):
+            self._defer_option_reset(
+                model, "sortkey", self._alter_sortkey_sql(model, None, columns=[])
+            )
 
     def column_sql(self, *args, **kwargs):
         definition, params = super().column_sql(*args, **kwargs)
         params = self._modify_params_for_redshift(params)
         return definition, params
 
+    def _column_default_sql(self, field):
+        if isinstance(field, SuperJSONField):
+            return "JSON_PARSE(%s)"
+        return super()._column_default_sql(field)
+
     def _modify_params_for_redshift(self, params):
         """
         `Psycopg2.extensions.Binary(b'\x80\x00')` in params is converted to `'\\x80\\x00'::bytea` when applied to SQL placeholders. However, Redshift needs to treat binary columns as `to_varbyte('8000', 'hex')::varbyte` instead of `::bytea` [#].
@@ -250,43 +926,31 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
 
         So, this function converts `Binary` instances to `RedshiftBinary` instances.
         RedshiftBinary is converted to `to_varbyte('8000', 'hex')::varbyte` when applied to placeholders.
+        Values of queries are adapted by the adapter of `Binary` registered in `psycopg2adapter`,
+        but the adapter isn't prepared for a connection when the SQL is collected.
+        If there are no `Binary` instances, the params are returned as is, without copying the list.
         """
-        new_params = [
-            RedshiftBinary(p.adapted) if isinstance(p, Binary) else p for p in params
-        ]
-        return new_params
+        if not any(_is_bytea_binary(p) for p in params):
+            return params
+        return [RedshiftBinary(p.adapted) if _is_bytea_binary(p) else p for p in params]
 
     def create_model(self, model):
         """
         Takes a model and creates a table for it in the database.
         Will also create any accompanying indexes or unique constraints.
         """
+        view = self._get_materialized_view(model)
+        if view is not None:
+            self.execute(view.create_sql(model, self))
+            return
         # Create column SQL, add FK deferreds if needed
         column_sqls = []
         params = []
         for field in model._meta.local_fields:
             # SQL
-            definition, extra_params = self.column_sql(model, field)
+            definition, extra_params = self._create_column_sql(model, field)
             if definition is None:
                 continue
-
-            # ## if 'definition' contains 'varchar', length must be 3 times
-            # ## because Redshift requires bytes length for utf-8 chars.
-            m = re.match(r"varchar\((\d+?)\)", definition)
-            if m:
-                definition = re.sub(
-                    r"varchar\((\d+?)\)",
-                    "varchar({})".format(
-                        str(int(m.group(1)) * self.multiply_varchar_length)
-                    ),
-                    definition,
-                )
-
-            field.db_parameters(connection=self.connection)
-            # Autoincrement SQL (for backends with inline variant)
-            col_type_suffix = field.db_type_suffix(connection=self.connection)
-            if col_type_suffix:
-                definition += " %s" % col_type_suffix
             params.extend(extra_params)
             # FK
             if field.remote_field and field.db_constraint:
@@ -351,12 +1015,83 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
             if field.remote_field.through._meta.auto_created:
                 self.create_model(field.remote_field.through)
 
+    def delete_model(self, model):
+        view = self._get_materialized_view(model)
+        if view is not None:
+            self.execute(view.remove_sql(model, self))
+            return
+        super().delete_model(model)
+
+    def _get_materialized_view(self, model):
+        for constraint in model._meta.constraints:
+            if isinstance(constraint, MaterializedView):
+                return constraint
+        return None
+
+    def _create_materialized_view_sql(self, model, view):
+        options = self._get_create_options(model)
+        if view.auto_refresh:
+            options = (options + " AUTO REFRESH YES").lstrip()
+        sql, params = view.get_sql()
+        if _get_in_temp_tables(params):
+            raise NotSupportedError(
+                "The query of a materialized view can't read the temporary table "
+                "of an __in lookup, use fewer values than "
+                "REDSHIFT_IN_TEMP_TABLE_MIN_VALUES."
+            )
+        return self.sql_create_materialized_view % {
+            "table": self.quote_name(model._meta.db_table),
+            "options": options,
+            "query": sql % tuple(self.quote_value(param) for param in params),
+        }
+
+    def _delete_materialized_view_sql(self, model):
+        return self.sql_delete_materialized_view % {
+            "table": self.quote_name(model._meta.db_table),
+        }
+
+    def _create_column_sql(self, model, field, include_default=False):
+        """
+        Return the column definition and params of the field for CREATE TABLE.
+        """
+        definition, params = self.column_sql(
+            model, field, include_default=include_default
+        )
+        if definition is None:
+            return None, []
+
+        definition = self._multiply_varchar_length(definition)
+
+        field.db_parameters(connection=self.connection)
+        # Autoincrement SQL (for backends with inline variant)
+        col_type_suffix = field.db_type_suffix(connection=self.connection)
+        if col_type_suffix:
+            definition += " %s" % col_type_suffix
+        return definition, params
+
+    def _multiply_varchar_length(self, definition):
+        # ## if 'definition' contains 'varchar', length must be 3 times
+        # ## because Redshift requires bytes length for utf-8 chars.
+        m = re.match(r"varchar\((\d+?)\)", definition)
+        if m:
+            definition = re.sub(
+                r"varchar\((\d+?)\)",
+                "varchar({})".format(
+                    str(int(m.group(1)) * self.multiply_varchar_length)
+                ),
+                definition,
+            )
+        return definition
+
     def add_field(self, model, field):
         """
         Creates a field on a model.
         Usually involves adding a column, but may involve adding a
         table instead (for M2M fields)
         """
+        # The columns of a materialized view are of its query.
+        if self._get_materialized_view(model) is not None:
+            return
         # Special-case implicit M2M tables
         if field.many_to_many and field.remote_field.through._meta.auto_created:
             return self.create_model(field.remote_field.through)
@@ -427,6 +1162,8 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
         strict=False,
     ):
         """Perform a "physical" (non-ManyToMany) field update."""
+        if self._get_materialized_view(model) is not None:
+            return
         # Drop any FK constraints, we'll remake them later
         fks_dropped = set()
         if (
@@ -612,7 +1349,8 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
             fragment, other_actions = self._alter_column_null_sqls(
                 model, old_field, new_field
             )
-            actions.append(fragment)
+            if fragment:  # ## Redshift: In some case, fragment will be empty.
+                actions.append(fragment)
             null_actions.extend(other_actions)
 
         # Only if we have a default and there is a change from NULL to NOT NULL
@@ -720,7 +1458,8 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
             #     fragment[1],
             # )
             # ## Redshift executes ADD and UPDATE on alter, so the fragment[0] is a complete sentence
-            self.execute(fragment[0], fragment[1])
+            if fragment:  # ## Redshift: In some case, fragment will be empty.
+                self.execute(fragment[0], fragment[1])
             for sql, params in other_actions:
                 self.execute(sql, params)
         # Does it have a foreign key?
@@ -775,10 +1514,10 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
         2. Migrate values from original column to temprary column
         3. Drop old column
         4. Rename temporary column name to original column name
-        """
-        fragment = ("", [])
-        actions = []
 
+        In `batch_alterations()`, the alteration is postponed to rewrite the
+        table once for all altered columns.
+        """
         # ## ALTER TABLE <table> ADD COLUMN 'tmp' <type> DEFAULT <value>
         if not new_field.null and not new_field.has_default():
             # Redshift can't add NOT NULL or DROP NOT NULL, then DEFAULT value is needed.
@@ -792,79 +1531,596 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
                 )
             new_field.default = default
 
-        definition, params = self.column_sql(model, new_field, include_default=True)
-        fragment = (
-            self.sql_create_column
-            % {
-                "table": self.quote_name(model._meta.db_table),
-                "column": self.quote_name(new_field.column + "_tmp"),
-                "definition": definition,
-            },
-            params,
-        )
-
-        type_cast = ""
-        if new_field.get_internal_type() == "BinaryField":
-            # In most cases, we don't change the type to a type that can't be cast,
-            # so we don't check it.
-            type_cast = "::" + _remove_length_from_type(
-                DatabaseWrapper.data_types["BinaryField"]
+        if self._batched_alterations is not None:
+            _model, alterations = self._batched_alterations.get(
+                model._meta.db_table, (model, {})
             )
-        elif (
-            old_field.get_internal_type() == "BinaryField"
-            and new_field.get_internal_type() == "CharField"
-        ):
-            type_cast = "::" + _remove_length_from_type(
-                DatabaseWrapper.data_types["CharField"]
+            # Altered twice, e.g. type and null, the column is recreated once.
+            first_old_field, _ = alterations.get(new_field.name, (old_field, None))
+            alterations[new_field.name] = (first_old_field, new_field)
+            self._batched_alterations[model._meta.db_table] = (model, alterations)
+            return None, []
+
+        return self._alter_columns_sqls(model, [(old_field, new_field)])
+
+    def _alter_columns_sqls(self, model, alterations):
+        """
+        Return a (fragment, actions) to recreate the columns of
+        [(old_field, new_field), ...] by the strategy for the table.
+        """
+        if self._get_alter_column_strategy(model) == "deep_copy":
+            return self._alter_columns_with_deep_copy(model, alterations)
+        return self._alter_columns_with_update(model, alterations)
+
+    def _alter_columns_with_update(self, model, alterations):
+        backfill_key = None
+        existing_columns = set()
+        if self.backfill_chunk_size is not None and not self.collect_sql:
+            backfill_key = self._get_backfill_key(model)
+            if backfill_key is not None:
+                # A failed backfill is resumed with the 'tmp' columns added before.
+                with self.connection.cursor() as cursor:
+                    existing_columns = {
+                        info.name
+                        for info in self.connection.introspection.get_table_description(
+                            cursor, model._meta.db_table
+                        )
+                    }
+
+        actions = []
+        for old_field, new_field in alterations:
+            if new_field.column + "_tmp" in existing_columns:
+                continue
+            definition, params = self.column_sql(model, new_field, include_default=True)
+            actions.append(
+                (
+                    self.sql_create_column
+                    % {
+                        "table": self.quote_name(model._meta.db_table),
+                        "column": self.quote_name(new_field.column + "_tmp"),
+                        "definition": definition,
+                    },
+                    params,
+                )
             )
+        fragment = actions.pop(0) if actions else None
 
         # ## UPDATE <table> SET 'tmp' = <orig column>
-        actions.append(
-            (
-                "UPDATE %(table)s SET %(new_column)s = %(old_column)s%(cast)s WHERE %(old_column)s IS NOT NULL"
-                % {
-                    "table": model._meta.db_table,
-                    "new_column": self.quote_name(new_field.column + "_tmp"),
-                    "old_column": self.quote_name(new_field.column),
-                    "cast": type_cast,
-                },
-                [],
-            )
+        if len(alterations) == 1:
+            old_field, new_field = alterations[0]
+            old_column = self.quote_name(new_field.column)
+            assignments = [
+                "%s = %s"
+                % (
+                    self.quote_name(new_field.column + "_tmp"),
+                    self._get_column_conversion(old_column, old_field, new_field),
+                )
+            ]
+            where = "%s IS NOT NULL" % old_column
+        else:
+            # Without the WHERE of a single column, NULL values keep the
+            # default of the 'tmp' column as well.
+            assignments = []
+            for old_field, new_field in alterations:
+                new_column = self.quote_name(new_field.column + "_tmp")
+                old_column = self.quote_name(new_field.column)
+                assignments.append(
+                    "%s = COALESCE(%s, %s)"
+                    % (
+                        new_column,
+                        self._get_column_conversion(
+                            old_column, old_field, new_field, explicit=True
+                        ),
+                        new_column,
+                    )
+                )
+            where = None
+        update = ChunkedUpdate(
+            model._meta.db_table, ", ".join(assignments), where, backfill_key
         )
+        if backfill_key is None:
+            update = str(update)
+        actions.append((update, []))
         # ## ALTER TABLE <table> DROP COLUMN <orig column>
-        actions.append(
-            (
-                self.sql_delete_column
-                % {
-                    "table": model._meta.db_table,
-                    "column": self.quote_name(new_field.column),
-                },
-                [],
+        for _old_field, new_field in alterations:
+            actions.append(
+                (
+                    self.sql_delete_column
+                    % {
+                        "table": model._meta.db_table,
+                        "column": self.quote_name(new_field.column),
+                    },
+                    [],
+                )
             )
-        )
         # ## ALTER TABLE <table> RENAME COLUMN 'tmp' <orig column>
-        actions.append(
-            (
-                self.sql_rename_column
-                % {
-                    "table": model._meta.db_table,
-                    "old_column": self.quote_name(new_field.column + "_tmp"),
-                    "new_column": self.quote_name(new_field.column),
-                },
-                [],
+        for _old_field, new_field in alterations:
+            actions.append(
+                (
+                    self.sql_rename_column
+                    % {
+                        "table": model._meta.db_table,
+                        "old_column": self.quote_name(new_field.column + "_tmp"),
+                        "new_column": self.quote_name(new_field.column),
+                    },
+                    [],
+                )
             )
-        )
 
         return fragment, actions
 
-    # BASED FROM https://github.com/django/django/blob/3.2.12/django/db/backends/base/schema.py#L866-L886
-    # postgres/schema.py doesn't have `_alter_column_null_sql` method.
-    def _alter_column_null_sqls(self, model, old_field, new_field):
+    def _alter_columns_with_deep_copy(self, model, alterations):
         """
-        Hook to specialize column null alteration.
-
-        Return a [(sql, params), ...] fragment to set a column to null or non-null
-        as required by new_field, or None if no changes are required.
+        To change column type or default of a large table, the table is copied
+        instead of updating all rows of it:
+
+        1. In one transaction, lock the original table, create a new table
+           with the new column definitions, the distkey and sortkey of the
+           model, the encodings of the other columns and the grants of the
+           original table, copy its rows with INSERT ... SELECT and swap the
+           table names
+        2. Drop the original table, recreate the foreign keys and unique
+           constraints, and restore the owner
+
+        Views bound to the table would keep referencing the original table,
+        so the deep copy is refused if there are any.
+        """
+        table = model._meta.db_table
+        new_table = table + "_deepcopy"
+        old_table = table + "_deepcopy_old"
+        old_fields = {new_field.name: old_field for old_field, new_field in alterations}
+        new_fields = {new_field.name: new_field for old_field, new_field in alterations}
+        fields = [
+            new_fields.get(field.name, field)
+            for field in model._meta.local_concrete_fields
+        ]
+
+        introspection = self.connection.introspection
+        with self.connection.cursor() as cursor:
+            views = introspection.get_dependent_views(cursor, table)
+            if views:
+                raise NotSupportedError(
+                    "Can't alter %s by a deep copy, the views %s depend on it. "
+                    "Recreate them as late-binding views (WITH NO SCHEMA BINDING), "
+                    "or use AlterColumnStrategy('recreate')."
+                    % (table, ", ".join(views))
+                )
+            encodings = introspection.get_column_encodings(cursor, table)
+            privileges = introspection.get_table_privileges(cursor, table)
+
+        actions = []
+
+        # ## ALTER TABLE <other table> DROP CONSTRAINT <fk to table>
+        incoming_fks = []
+        for rel in model._meta.related_objects:
+            if (
+                rel.many_to_many
+                or not rel.field.db_constraint
+                or rel.related_model._meta.db_table == table
+            ):
+                continue
+            fk_names = self._constraint_names(
+                rel.related_model, [rel.field.column], foreign_key=True
+            )
+            for fk_name in fk_names:
+                actions.append((self._delete_fk_sql(rel.related_model, fk_name), []))
+            if fk_names:
+                incoming_fks.append(rel)
+
+        # ## LOCK TABLE <table>;
+        # ## CREATE TABLE <new table> (...) <options>;
+        # ## GRANT ... ON <new table> TO ...;
+        # ## INSERT INTO <new table> (...) SELECT ... FROM <table>;
+        # ## ALTER TABLE <table> RENAME TO <old table>;
+        # ## ALTER TABLE <new table> RENAME TO <table>
+        # In one transaction, not to lose the rows written during the copy.
+        actions.append(
+            (
+                DeepCopy(
+                    model,
+                    table,
+                    new_table,
+                    old_table,
+                    alterations,
+                    encodings,
+                    [] if privileges is None else privileges.grants,
+                ),
+                [],
+            )
+        )
+        # ## DROP TABLE <old table>
+        # Without CASCADE, to not drop views depending on the table silently.
+        actions.append(("DROP TABLE %s" % self.quote_name(old_table), []))
+
+        # ## ALTER TABLE ... ADD CONSTRAINT ... FOREIGN KEY
+        # FK of the altered fields are recreated by _alter_field.
+        fks = [
+            (model, field)
+            for field in fields
+            if field.name not in old_fields
+            and field.remote_field
+            and field.db_constraint
+        ]
+        fks.extend((rel.related_model, rel.field) for rel in incoming_fks)
+        for fk_model, fk_field in fks:
+            actions.append(
+                (
+                    self._create_fk_sql(
+                        fk_model, fk_field, "_fk_%(to_table)s_%(to_column)s"
+                    ),
+                    [],
+                )
+            )
+
+        # ## ALTER TABLE ... ADD CONSTRAINT ... UNIQUE
+        for field_names in model._meta.unique_together:
+            unique_fields = [model._meta.get_field(name) for name in field_names]
+            actions.append((self._create_unique_sql(model, unique_fields), []))
+        for constraint in model._meta.constraints:
+            if isinstance(constraint, UniqueConstraint) and constraint.fields:
+                unique_fields = [
+                    model._meta.get_field(name) for name in constraint.fields
+                ]
+                actions.append(
+                    (
+                        self._create_unique_sql(
+                            model,
+                            unique_fields,
+                            constraint.name,
+                            deferrable=constraint.deferrable,
+                        ),
+                        [],
+                    )
+                )
+
+        # ## ALTER TABLE <table> OWNER TO <owner>
+        # Last, adding the foreign keys and constraints requires owning the table.
+        if privileges is not None:
+            actions.append(
+                (
+                    "ALTER TABLE %s OWNER TO %s"
+                    % (self.quote_name(table), self.quote_name(privileges.owner)),
+                    [],
+                )
+            )
+
+        return None, actions
+
+    def _deep_copy_sqls(self, copy):
+        """
+        Return [(sql, params), ...] of the statements of the DeepCopy, after
+        LOCK TABLE.
+        """
+        create, insert = self._copy_table_sqls(
+            copy.model,
+            self.quote_name(copy.table),
+            self.quote_name(copy.new_table),
+            copy.alterations,
+            encodings=copy.encodings,
+        )
+        grants = [
+            (
+                "GRANT %s ON %s TO %s"
+                % (", ".join(privileges), self.quote_name(copy.new_table), grantee),
+                None,
+            )
+            for grantee, privileges in copy.grants
+        ]
+        renames = [
+            (
+                self.sql_rename_table
+                % {
+                    "old_table": self.quote_name(old_table),
+                    "new_table": self.quote_name(new_table),
+                },
+                None,
+            )
+            for old_table, new_table in [
+                (copy.table, copy.old_table),
+                (copy.new_table, copy.table),
+            ]
+        ]
+        return [create, *grants, insert, *renames]
+
+    def _execute_deep_copy(self, copy):
+        """
+        Execute the DeepCopy in one transaction, of which the IDENTITY columns
+        are seeded after the table is locked. Collected SQL joins the
+        statements into one, in an implicit transaction.
+        """
+        lock = "LOCK TABLE %s" % self.quote_name(copy.table)
+        if self.collect_sql:
+            statements = self._deep_copy_sqls(copy)
+            params = [
+                param for _sql, sql_params in statements for param in sql_params or ()
+            ]
+            return super().execute(
+                "; ".join([lock, *(sql for sql, _params in statements)]),
+                params or None,
+            )
+        self.flush_statements()
+        with transaction.atomic(using=self.connection.alias, savepoint=False):
+            super().execute(lock, None)
+            for sql, params in self._deep_copy_sqls(copy):
+                super().execute(sql, params)
+
+    def _copy_table_sqls(self, model, table, new_table, alterations=(), encodings=None):
+        """
+        Return the CREATE TABLE and INSERT ... SELECT statements as
+        (sql, params) to copy the quoted ``table`` into the quoted
+        ``new_table`` with the altered fields of [(old_field, new_field), ...].
+
+        The columns other than the altered ones keep their ``encodings`` of
+        {column: encoding}. IDENTITY columns are created as GENERATED BY
+        DEFAULT AS IDENTITY to keep the copied values.
+        """
+        encodings = encodings or {}
+        old_fields = {new_field.name: old_field for old_field, new_field in alterations}
+        new_fields = {new_field.name: new_field for old_field, new_field in alterations}
+        fields = [
+            new_fields.get(field.name, field)
+            for field in model._meta.local_concrete_fields
+        ]
+
+        # ## CREATE TABLE <new table> (...) <options>
+        column_sqls = []
+        params = []
+        for field in fields:
+            old_field = old_fields.get(field.name)
+            definition, extra_params = self._create_column_sql(
+                model, field, include_default=old_field is not None
+            )
+            if old_field is not None:
+                # PRIMARY KEY and UNIQUE are added by _alter_field.
+                if not old_field.primary_key:
+                    definition = definition.replace(" PRIMARY KEY", "")
+                if not old_field.unique:
+                    definition = definition.replace(" UNIQUE", "")
+            if re.search(r"identity\(", definition):
+                # IDENTITY column can't be inserted explicitly, so the values are
+                # copied into GENERATED BY DEFAULT AS IDENTITY column.
+                seed = self._get_identity_seed(model, field, table)
+                definition = re.sub(
+                    r"identity\(\d+, (\d+)\)",
+                    lambda m: (
+                        "GENERATED BY DEFAULT AS IDENTITY(%s, %s)" % (seed, m.group(1))
+                    ),
+                    definition,
+                )
+            encoding = encodings.get(field.column)
+            if old_field is None and encoding:
+                # ENCODE precedes the NULL and key constraints of the column.
+                nulls = list(re.finditer(r" (?:NOT )?NULL\b", definition))
+                position = nulls[-1].start() if nulls else len(definition)
+                definition = "%s ENCODE %s%s" % (
+                    definition[:position],
+                    encoding,
+                    definition[position:],
+                )
+            column_sqls.append("%s %s" % (self.quote_name(field.column), definition))
+            params.extend(extra_params)
+        fragment = (
+            self.sql_create_table
+            % {
+                "table": new_table,
+                "definition": ", ".join(column_sqls),
+                "options": self._get_create_options(model),
+            },
+            params or None,
+        )
+
+        # ## INSERT INTO <new table> (...) SELECT ... FROM <table>
+        columns = []
+        params = []
+        for field in fields:
+            column = self.quote_name(field.column)
+            old_field = old_fields.get(field.name)
+            if old_field is not None:
+                if old_field.null and not field.null:
+                    column = "COALESCE(%s, %%s)" % self._get_column_conversion(
+                        column, old_field, field, explicit=True
+                    )
+                    params.extend(
+                        self._modify_params_for_redshift(
+                            [self.effective_default(field)]
+                        )
+                    )
+                else:
+                    column = self._get_column_conversion(column, old_field, field)
+            columns.append(column)
+        insert = (
+            "INSERT INTO %(new_table)s (%(columns)s) SELECT %(select)s FROM %(table)s"
+            % {
+                "new_table": new_table,
+                "columns": ", ".join(self.quote_name(f.column) for f in fields),
+                "select": ", ".join(columns),
+                "table": table,
+            },
+            params,
+        )
+        return fragment, insert
+
+    def _get_backfill_key(self, model):
+        """
+        Return the integer column to backfill the table in ranges of: the first
+        sortkey column, or the primary key. None if they aren't integers.
+        """
+        columns = self._get_sortkey_columns(model)[:1] + [model._meta.pk.column]
+        for column in columns:
+            for field in model._meta.local_concrete_fields:
+                if (
+                    field.column == column
+                    and field.get_internal_type() in _integer_types
+                ):
+                    return column
+        logger.warning(
+            "%s has no integer sortkey or primary key to backfill in chunks.",
+            model._meta.db_table,
+        )
+        return None
+
+    def _execute_chunked_update(self, update):
+        """
+        Execute the UPDATE in ranges of its key column, committing the
+        progress of each range into the bookkeeping table.
+
+        An interrupted UPDATE is resumed after the last committed range.
+        """
+        table = self.quote_name(self.backfill_table)
+        quoted_key = self.quote_name(update.key)
+        chunk_size = self.backfill_chunk_size
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.sql_create_backfill_table % {"table": table})
+            cursor.execute(
+                "SELECT MIN(%(key)s), MAX(%(key)s) FROM %(table)s"
+                % {"key": quoted_key, "table": self.quote_name(update.table)}
+            )
+            min_value, max_value = cursor.fetchone()
+            cursor.execute(
+                "SELECT last_value FROM %s WHERE table_name = %%s AND assignments = %%s"
+                % table,
+                [update.table, update.assignments],
+            )
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute(
+                    "INSERT INTO %s (table_name, assignments, last_value, updated_at) "
+                    "VALUES (%%s, %%s, NULL, %%s)" % table,
+                    [update.table, update.assignments, timezone.now()],
+                )
+                last_value = None
+            else:
+                last_value = row[0]
+                logger.info(
+                    "Resume backfill of %s after %s = %s.",
+                    update.table,
+                    update.key,
+                    last_value,
+                )
+
+        if min_value is not None:
+            value = min_value if last_value is None else last_value + 1
+            while value <= max_value:
+                upper = min(value + chunk_size - 1, max_value)
+                started = time.monotonic()
+                with transaction.atomic(using=self.connection.alias):
+                    with self.connection.cursor() as cursor:
+                        cursor.execute(
+                            update.sql("%s BETWEEN %%s AND %%s" % quoted_key),
+                            [value, upper],
+                        )
+                        rows = cursor.rowcount
+                        cursor.execute(
+                            "UPDATE %s SET last_value = %%s, updated_at = %%s "
+                            "WHERE table_name = %%s AND assignments = %%s" % table,
+                            [upper, timezone.now(), update.table, update.assignments],
+                        )
+                elapsed = time.monotonic() - started
+                logger.info(
+                    "Backfilled %s rows of %s for %s %s..%s (chunk size %s) "
+                    "in %.1fs, %.0f rows/s, %.0f%% done.",
+                    rows,
+                    update.table,
+                    update.key,
+                    value,
+                    upper,
+                    chunk_size,
+                    elapsed,
+                    rows / elapsed if elapsed else rows,
+                    100.0 * (upper - min_value + 1) / (max_value - min_value + 1),
+                )
+                value = upper + 1
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(update.sql("%s IS NULL" % quoted_key))
+            cursor.execute(
+                "DELETE FROM %s WHERE table_name = %%s AND assignments = %%s" % table,
+                [update.table, update.assignments],
+            )
+
+    def _get_column_conversion(self, column, old_field, new_field, explicit=False):
+        """
+        Return the SQL expression of the old column converted to new_field.
+        With ``explicit``, the type is cast also when it's cast on assignment.
+        """
+        old_storage = _get_uuid_storage(old_field)
+        new_storage = _get_uuid_storage(new_field)
+        if old_storage and new_storage and old_storage != new_storage:
+            # UUID without hyphens in hex, as UUIDField.get_db_prep_value() does.
+            if old_storage == "varbyte":
+                column = "TO_HEX(%s)" % column
+            elif old_storage == "varchar":
+                column = "REPLACE(%s, '-', '')" % column
+            if new_storage == "varbyte":
+                column = "FROM_HEX(%s)" % column
+            return column
+        if explicit:
+            return column + self._get_explicit_type_cast(old_field, new_field)
+        return column + _get_type_cast(old_field, new_field)
+
+    def _get_explicit_type_cast(self, old_field, new_field):
+        """
+        Return a cast of the old column to the type of new_field, for
+        expressions such as COALESCE that don't cast on assignment.
+        """
+        type_cast = _get_type_cast(old_field, new_field)
+        if not type_cast:
+            type_cast = (
+                "::" + new_field.db_parameters(connection=self.connection)["type"]
+            )
+        return type_cast
+
+    def _get_identity_seed(self, model, field, table=None):
+        """
+        Return the next value of the IDENTITY column of the model's table, or
+        of the quoted ``table``.
+
+        When SQL is only collected, e.g. by sqlmigrate, the seed is unknown, so
+        NotSupportedError is raised.
+        """
+        if table is None:
+            table = self.quote_name(model._meta.db_table)
+        if self.collect_sql:
+            raise NotSupportedError(
+                "Can't output the deep copy of %s as SQL, the seed of its IDENTITY "
+                "column %s is read from the rows when the migration is applied."
+                % (table, self.quote_name(field.column))
+            )
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT MAX(%s) FROM %s" % (self.quote_name(field.column), table)
+            )
+            max_value = cursor.fetchone()[0]
+        return (max_value or 0) + 1
+
+    def _get_alter_column_strategy(self, model):
+        """
+        Return "deep_copy" or "recreate" to alter columns of the model's table.
+
+        The strategy is set by the ``AlterColumnStrategy`` operation, or chosen
+        by the number of rows of the table and the
+        ``REDSHIFT_DEEP_COPY_MIN_ROWS`` setting.
+        """
+        if self.alter_column_strategy is not None:
+            return self.alter_column_strategy
+        min_rows = self.deep_copy_min_rows
+        if min_rows is not None:
+            with self.connection.cursor() as cursor:
+                info = self.connection.introspection.get_table_info(
+                    cursor, model._meta.db_table
+                )
+            if info is not None and info.tbl_rows >= min_rows:
+                return "deep_copy"
+        return "recreate"
+
+    # BASED FROM https://github.com/django/django/blob/3.2.12/django/db/backends/base/schema.py#L866-L886
+    # postgres/schema.py doesn't have `_alter_column_null_sql` method.
+    def _alter_column_null_sqls(self, model, old_field, new_field):
+        """
+        Hook to specialize column null alteration.
+
+        Return a [(sql, params), ...] fragment to set a column to null or non-null
+        as required by new_field, or None if no changes are required.
         """
         # ## original BaseDatabaseSchemaEditor._alter_column_null_sql return a sql fragment
         # ## Redshift needs 4 step alter
@@ -935,8 +2191,11 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
 
         old_max_length = _get_max_length(old_field)
         new_max_length = _get_max_length(new_field)
-        decrease_size_with_default = old_default is not None and (
-            old_max_length > new_max_length
+        decrease_size_with_default = (
+            old_default is not None
+            and old_max_length is not None
+            and new_max_length is not None
+            and old_max_length > new_max_length
         )
 
         # Size is changed
@@ -991,7 +2250,7 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
                         "changes": self.sql_alter_column_type
                         % {
                             "column": self.quote_name(new_field.column),
-                            "type": new_type,
+                            "type": self._multiply_varchar_length(new_type),
                         },
                     },
                     [],
@@ -1029,28 +2288,144 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
     def _get_create_options(self, model):
         """
         Provide options to create the table. Supports:
+            - diststyle
             - distkey
+            - sortstyle
             - sortkey
 
-        N.B.: no validation is made on these options, we'll let the Database
-              do the validation for us.
+        N.B.: apart from the combinations of the styles and keys, no validation
+              is made on these options, we'll let the Database do the validation
+              for us.
         """
+        create_options = []
 
-        def quoted_column_name(field_name):
-            # We strip the '-' that may precede the field name in an `ordering`
-            # specification.
-            try:
-                colname = model._meta.get_field(
-                    field_name.strip("-")
-                ).get_attname_column()[1]
-            except FieldDoesNotExist:
-                # Out of an abundance of caution - e.g., so that you get a more
-                # appropriate error message higher up the stack.
-                colname = field_name
-            return self.connection.ops.quote_name(colname)
+        distkey = self._get_distkey(model)
+        diststyle = self._get_diststyle(model)
+        if diststyle:
+            create_options.append(f"DISTSTYLE {diststyle.style}")
+        if distkey:
+            normalized_field = self._quoted_column_name(model, distkey.fields[0])
+            create_options.append(f"DISTKEY({normalized_field})")
 
-        create_options = []
+        sortkeys = self._get_sortkeys(model)
+        sortstyle = self._get_sortstyle(model)
+        if sortstyle and sortstyle.style == "AUTO":
+            create_options.append("SORTKEY AUTO")
+        elif sortkeys:
+            create_options.append(
+                "{style}SORTKEY({fields})".format(
+                    style=f"{sortstyle.style} " if sortstyle else "",
+                    fields=", ".join(sortkeys),
+                )
+            )
+
+        return " ".join(create_options)
+
+    def _column_name(self, model, field_name):
+        # We strip the '-' that may precede the field name in an `ordering`
+        # specification.
+        try:
+            field = model._meta.get_field(field_name.strip("-"))
+            colname = field.get_attname_column()[1]
+        except FieldDoesNotExist:
+            # Out of an abundance of caution - e.g., so that you get a more
+            # appropriate error message higher up the stack.
+            colname = field_name
+        return colname
+
+    def _quoted_column_name(self, model, field_name):
+        return self.connection.ops.quote_name(self._column_name(model, field_name))
+
+    def _get_sortkeys(self, model):
+        return [
+            self.connection.ops.quote_name(column)
+            for column in self._get_sortkey_columns(model)
+        ]
 
+    def _get_sortkey_columns(self, model):
+        sortkeys = None
+        for idx in model._meta.indexes:
+            if isinstance(idx, SortKeys):
+                if sortkeys:
+                    raise ValueError(
+                        f"Model {model.__name__} has more than one SortKeys."
+                    )
+                sortkeys = idx
+        fields = [field for field in model._meta.ordering if isinstance(field, SortKey)]
+        if sortkeys:
+            if fields:
+                raise ValueError(
+                    f"Model {model.__name__} can't have both SortKeys and SortKey "
+                    "in ordering."
+                )
+            fields = sortkeys.fields
+        return [self._column_name(model, field) for field in fields]
+
+    def _get_sortstyle(self, model):
+        sortstyle = None
+        for constraint in model._meta.constraints:
+            if isinstance(constraint, SortStyle):
+                if sortstyle:
+                    raise ValueError(
+                        f"Model {model.__name__} has more than one SortStyle."
+                    )
+                sortstyle = constraint
+        if sortstyle:
+            has_sortkeys = bool(self._get_sortkeys(model))
+            if sortstyle.style == "AUTO" and has_sortkeys:
+                raise ValueError(
+                    f"SortStyle AUTO on model {model.__name__} can't be used "
+                    "with SortKeys or SortKey."
+                )
+            if sortstyle.style != "AUTO" and not has_sortkeys:
+                raise ValueError(
+                    f"SortStyle {sortstyle.style} on model {model.__name__} "
+                    "requires SortKeys or SortKey."
+                )
+        return sortstyle
+
+    def _alter_sortkey_sql(self, model, style, columns=None):
+        """
+        Return the in-place alteration of the sort key to `style` and the
+        SortKeys or SortKey columns of the model, or `columns` if given. The
+        style None means the default, that is a compound sort key if there are
+        sort key columns and no sort key otherwise.
+        """
+        if columns is None:
+            sortkeys = self._get_sortkeys(model)
+        else:
+            sortkeys = [self.quote_name(column) for column in columns]
+        # Same validation as _get_sortstyle() when the table is created.
+        if style == "AUTO" and sortkeys:
+            raise ValueError(
+                f"SortStyle AUTO on model {model.__name__} can't be used "
+                "with SortKeys or SortKey."
+            )
+        if style is not None and style != "AUTO" and not sortkeys:
+            raise ValueError(
+                f"SortStyle {style} on model {model.__name__} "
+                "requires SortKeys or SortKey."
+            )
+        if style == "INTERLEAVED":
+            # https://docs.aws.amazon.com/redshift/latest/dg/r_ALTER_TABLE.html
+            raise NotSupportedError(
+                "Redshift can't alter the sort key of an existing table to "
+                f"INTERLEAVED. Specify SortStyle INTERLEAVED for {model.__name__} "
+                "in the options of CreateModel instead."
+            )
+        elif style == "AUTO":
+            sortkey = "SORTKEY AUTO"
+        elif sortkeys:
+            sortkey = "COMPOUND SORTKEY ({})".format(", ".join(sortkeys))
+        else:
+            sortkey = "SORTKEY NONE"
+        return Statement(
+            self.sql_alter_sortkey,
+            table=Table(model._meta.db_table, self.quote_name),
+            sortkey=sortkey,
+        )
+
+    def _get_distkey(self, model):
         distkey = None
         for idx in model._meta.indexes:
             if isinstance(idx, DistKey):
@@ -1059,31 +2434,207 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
                         f"Model {model.__name__} has more than one DistKey."
                     )
                 distkey = idx
-        if distkey:
-            # It would be nicer to enforce this by having DistKey's ctor accept exactly
-            # one field. However overriding the superclass Index ctor causes problems
-            # with migrations, so we validate here instead.
-            if len(distkey.fields) != 1:
-                raise ValueError(
-                    "DistKey on model {} must have exactly one field.".format(
-                        model.__name__
+        # It would be nicer to enforce this by having DistKey's ctor accept exactly
+        # one field. However overriding the superclass Index ctor causes problems
+        # with migrations, so we validate here instead.
+        if distkey and len(distkey.fields) != 1:
+            raise ValueError(
+                "DistKey on model {} must have exactly one field.".format(
+                    model.__name__
+                )
+            )
+        return distkey
+
+    def _get_diststyle(self, model):
+        diststyle = None
+        for constraint in model._meta.constraints:
+            if isinstance(constraint, DistStyle):
+                if diststyle:
+                    raise ValueError(
+                        f"Model {model.__name__} has more than one DistStyle."
                     )
+                diststyle = constraint
+        if diststyle:
+            has_distkey = self._get_distkey(model) is not None
+            if diststyle.style == "KEY" and not has_distkey:
+                raise ValueError(
+                    f"DistStyle KEY on model {model.__name__} requires a DistKey."
                 )
-            normalized_field = quoted_column_name(distkey.fields[0])
-            create_options.append(f"DISTKEY({normalized_field})")
-            # TODO: Support DISTSTYLE ALL.
+            if diststyle.style != "KEY" and has_distkey:
+                raise ValueError(
+                    f"DistStyle {diststyle.style} on model {model.__name__} "
+                    "can't be used with a DistKey."
+                )
+        return diststyle
 
-        sortkeys = [
-            quoted_column_name(field)
-            for field in model._meta.ordering
-            if isinstance(field, SortKey)
-        ]
-        if sortkeys:
-            create_options.append(
-                "SORTKEY({fields})".format(fields=", ".join(sortkeys))
+    def _alter_diststyle_sql(self, model, style):
+        if style == "KEY":
+            distkey = self._get_distkey(model)
+            if distkey is None:
+                raise ValueError(
+                    f"DistStyle KEY on model {model.__name__} requires a DistKey."
+                )
+            style = "KEY DISTKEY {}".format(
+                self._quoted_column_name(model, distkey.fields[0])
             )
+        return Statement(
+            self.sql_alter_diststyle,
+            table=Table(model._meta.db_table, self.quote_name),
+            style=style,
+        )
 
-        return " ".join(create_options)
+    def _defer_option_reset(self, model, option, statement):
+        """
+        Defer a statement resetting a removed table option to the end of the
+        migration. Changing an option is migrated as a removal followed by an
+        addition, so deferring the reset lets the addition replace it with a
+        single in-place ALTER.
+        """
+        self._discard_option_reset(model, option)
+        key = (model._meta.db_table, option)
+        self._deferred_option_resets[key] = statement
+        self.deferred_sql.append(statement)
+
+    def _discard_option_reset(self, model, option):
+        key = (model._meta.db_table, option)
+        statement = self._deferred_option_resets.pop(key, None)
+        if statement is not None and statement in self.deferred_sql:
+            self.deferred_sql.remove(statement)
+
+    def _alter_table_option(self, model, option, statement):
+        """
+        Alter a table option in place. A style and a key of the same option,
+        e.g. DistStyle KEY and DistKey, alter it at most once per migration.
+        """
+        self._discard_option_reset(model, option)
+        key = (model._meta.db_table, option)
+        if self._altered_options.get(key) == str(statement):
+            return
+        self._altered_options[key] = str(statement)
+        self.execute(statement)
+
+    def _get_table_keys(self, model):
+        # Nothing to compare with when SQL is only collected, e.g. sqlmigrate.
+        if self.collect_sql:
+            return None
+        with self.connection.cursor() as cursor:
+            return self.connection.introspection.get_table_keys(
+                cursor, model._meta.db_table
+            )
+
+    def wait_for_table_keys(
+        self, model, timeout=None, poll_interval=10, max_unsorted=0
+    ):
+        """
+        Wait until Redshift has redistributed and sorted the table of the model
+        to its DistStyle, DistKey and sort key, polling svv_table_info every
+        `poll_interval` seconds. The in-place ALTER DISTKEY and ALTER SORTKEY
+        return before the background redistribution and sort are finished.
+
+        Raise TimeoutError after `timeout` seconds; with `timeout=0` the
+        progress is polled once. Return the last TableStorageInfo, or None for
+        an empty table which is not listed in svv_table_info.
+        """
+        table = model._meta.db_table
+        distkey = self._get_distkey(model)
+        diststyle = self._get_diststyle(model)
+        if distkey:
+            expected_diststyle = "KEY({})".format(
+                self._column_name(model, distkey.fields[0])
+            )
+        elif diststyle:
+            expected_diststyle = diststyle.style
+        else:
+            expected_diststyle = None
+        sortkeys = self._get_sortkey_columns(model)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.connection.cursor() as cursor:
+                info = self.connection.introspection.get_table_info(cursor, table)
+            if info is None:
+                return None
+            done = (
+                expected_diststyle is None
+                or info.diststyle == expected_diststyle
+                or (expected_diststyle == "AUTO" and info.diststyle.startswith("AUTO"))
+            ) and (
+                not sortkeys
+                or (
+                    info.sortkey1 == sortkeys[0]
+                    and (info.unsorted or 0) <= max_unsorted
+                )
+            )
+            logger.info(
+                "Waiting for table keys of %s: diststyle=%s sortkey1=%s unsorted=%s%%",
+                table,
+                info.diststyle,
+                info.sortkey1,
+                info.unsorted,
+            )
+            if done:
+                return info
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Redistribution of table {table} is not finished: "
+                    f"diststyle={info.diststyle} sortkey1={info.sortkey1} "
+                    f"unsorted={info.unsorted}%"
+                )
+            time.sleep(poll_interval)
+
+    def add_constraint(self, model, constraint):
+        if isinstance(constraint, MaterializedView):
+            if self._removed_views.pop(model._meta.db_table, None) is None:
+                # The view replaces the table of the model.
+                self._check_table_is_empty(model)
+                super().delete_model(model)
+            self.execute(constraint.create_sql(model, self))
+            return
+        if isinstance(constraint, TableStyle):
+            self._alter_table_option(
+                model, constraint.option, constraint.create_sql(model, self)
+            )
+            return
+        super().add_constraint(model, constraint)
+
+    def remove_constraint(self, model, constraint):
+        if isinstance(constraint, MaterializedView):
+            # A table replaces the view, unless the view is created again with
+            # another query.
+            self.execute(constraint.remove_sql(model, self))
+            self._removed_views[model._meta.db_table] = model
+            return
+        if isinstance(constraint, TableStyle):
+            statement = constraint.remove_sql(model, self)
+            if statement is not None:
+                self._defer_option_reset(model, constraint.option, statement)
+            return
+        super().remove_constraint(model, constraint)
+
+    def _create_removed_view_tables(self):
+        """
+        Create the tables of the models of the removed materialized views.
+        """
+        models = list(self._removed_views.values())
+        self._removed_views = {}
+        for model in models:
+            self.create_model(model)
+
+    def _check_table_is_empty(self, model):
+        """
+        Raise NotSupportedError if the table of the model has rows, which a
+        materialized view replacing the table would drop.
+        """
+        if self.collect_sql:
+            return
+        table = model._meta.db_table
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM %s LIMIT 1" % self.quote_name(table))
+            if cursor.fetchone() is not None:
+                raise NotSupportedError(
+                    f"Cannot replace table {table} with a materialized view, the "
+                    "table has rows. Delete the rows first."
+                )
 
     def remove_field(self, model, field):
         """
@@ -1099,6 +2650,8 @@ class DatabaseSchemaEditor(BasePGDatabaseSchemaEditor):
         This is not strictly correct, but since Django's migration does not keep track
         of ordering changes, there is no other way to unconditionally remove SORTKEY.
         """
+        if self._get_materialized_view(model) is not None:
+            return
         try:
             super().remove_field(model, field)
         except ProgrammingError as e:
@@ -1130,14 +2683,402 @@ redshift_data_types = {
     "TextField": "varchar(max)",  # text must be varchar(max)
     "UUIDField": "varchar(36)",  # redshift doesn't support uuid fields
     "BinaryField": "varbyte(%(max_length)s)",
+    "HLLSketchField": "hllsketch",
 }
 
 
 class DatabaseCreation(BasePGDatabaseCreation):
-    pass
+    """
+    With ``"SNAPSHOT": True`` in the TEST settings of the database, the
+    migrations are applied once into a snapshot schema of the test database,
+    and the tests run in schemas cloned from the snapshot.
+
+    The snapshot schema is named by a hash of the migration files, so it's
+    reused by later runs until the migrations change. The snapshots of other
+    hashes are kept, unless ``"DROP_OLD_SNAPSHOTS": True`` is set in the TEST
+    settings.
+    """
+
+    # prefix of the snapshot schemas, followed by the hash of the migrations.
+    snapshot_schema_prefix = "django_snapshot_"
+    # schema of the tests, followed by the suffix of the parallel worker.
+    test_schema = "django_test"
+    # settings changing the schema created by the migrations.
+    snapshot_settings = (
+        "AUTH_USER_MODEL",
+        "DEFAULT_AUTO_FIELD",
+        "INSTALLED_APPS",
+        "MIGRATION_MODULES",
+        "REDSHIFT_VARCHAR_LENGTH_MULTIPLIER",
+    )
+
+    def _uses_snapshot(self):
+        return bool(self.connection.settings_dict["TEST"].get("SNAPSHOT"))
+
+    def _track_written_tables(self):
+        if self.connection.settings_dict["TEST"].get("FLUSH_WRITTEN_TABLES"):
+            self.connection.track_written_tables()
+
+    def create_test_db(
+        self, verbosity=1, autoclobber=False, serialize=True, keepdb=False
+    ):
+        if not self._uses_snapshot():
+            test_database_name = super().create_test_db(
+                verbosity, autoclobber, serialize, keepdb
+            )
+            self._track_written_tables()
+            return test_database_name
+
+        # Don't import django.core.management if it isn't needed.
+        from django.core.management import call_command
+        from django.test.utils import override_settings
+
+        test_database_name = self._get_test_db_name()
+        if verbosity >= 1:
+            self.log(
+                "Using test database for alias %s..."
+                % self._get_database_display_str(verbosity, test_database_name)
+            )
+        # The test database is kept to reuse the snapshot by later runs.
+        self._create_test_db(verbosity, autoclobber, keepdb=True)
+
+        self.connection.close()
+        self.connection.settings_dict["NAME"] = test_database_name
+        self._old_schema = self.connection.settings_dict.get("SCHEMA")
+
+        self.snapshot_schema = self._get_snapshot_schema()
+        quote_name = self.connection.ops.quote_name
+        with self.connection.cursor() as cursor:
+            snapshot_exists = self._schema_exists(cursor, self.snapshot_schema)
+        if snapshot_exists:
+            if verbosity >= 1:
+                self.log("Using migration snapshot %s..." % self.snapshot_schema)
+        else:
+            if verbosity >= 1:
+                self.log("Creating migration snapshot %s..." % self.snapshot_schema)
+            # The snapshot is built under another name, to not reuse the
+            # snapshot of an interrupted run.
+            build_schema = self.snapshot_schema + "_build"
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    "DROP SCHEMA IF EXISTS %s CASCADE" % quote_name(build_schema)
+                )
+                cursor.execute("CREATE SCHEMA %s" % quote_name(build_schema))
+            self._set_schema(build_schema)
+            if self.connection.settings_dict["TEST"]["MIGRATE"] is False:
+                # Disable migrations for all apps.
+                migration_modules = override_settings(
+                    MIGRATION_MODULES={
+                        app.label: None for app in apps.get_app_configs()
+                    }
+                )
+            else:
+                migration_modules = nullcontext()
+            with migration_modules:
+                call_command(
+                    "migrate",
+                    verbosity=max(verbosity - 1, 0),
+                    interactive=False,
+                    database=self.connection.alias,
+                    run_syncdb=True,
+                )
+            call_command("createcachetable", database=self.connection.alias)
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    "ALTER SCHEMA %s RENAME TO %s"
+                    % (quote_name(build_schema), quote_name(self.snapshot_schema))
+                )
+                if self.connection.settings_dict["TEST"].get("DROP_OLD_SNAPSHOTS"):
+                    for schema in self._get_snapshot_schemas(cursor):
+                        if schema != self.snapshot_schema:
+                            if verbosity >= 1:
+                                self.log("Dropping migration snapshot %s..." % schema)
+                            cursor.execute(
+                                "DROP SCHEMA %s CASCADE" % quote_name(schema)
+                            )
+
+        self._clone_schema(self.snapshot_schema, self.test_schema)
+        self._set_schema(self.test_schema)
+
+        if serialize:
+            self.connection._test_serialized_contents = self.serialize_db_to_string()
+
+        # Ensure a connection for the side effect of initializing the test database.
+        self.connection.ensure_connection()
+        self._track_written_tables()
+
+        return test_database_name
+
+    def get_test_db_clone_settings(self, suffix):
+        if not self._uses_snapshot():
+            return super().get_test_db_clone_settings(suffix)
+        return {
+            **self.connection.settings_dict,
+            "SCHEMA": "{}_{}".format(self.test_schema, suffix),
+        }
+
+    def setup_worker_connection(self, _worker_id):
+        # Same as Django 4.1+, not in the vendored creation of Django 4.0.
+        settings_dict = self.get_test_db_clone_settings(str(_worker_id))
+        self.connection.settings_dict.update(settings_dict)
+        self.connection.close()
+        self._track_written_tables()
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        if not self._uses_snapshot():
+            return super()._clone_test_db(suffix, verbosity, keepdb)
+        # The clone is recreated to start from the current snapshot.
+        self._clone_schema(
+            self.snapshot_schema, self.get_test_db_clone_settings(suffix)["SCHEMA"]
+        )
+
+    def destroy_test_db(
+        self, old_database_name=None, verbosity=1, keepdb=False, suffix=None
+    ):
+        if suffix is None:
+            _written_tables.pop(self.connection.alias, None)
+        if not self._uses_snapshot():
+            return super().destroy_test_db(old_database_name, verbosity, keepdb, suffix)
+        if suffix is None:
+            schema = self.test_schema
+        else:
+            schema = self.get_test_db_clone_settings(suffix)["SCHEMA"]
+        if verbosity >= 1:
+            self.log(
+                "%s test schema %s..."
+                % ("Preserving" if keepdb else "Destroying", schema)
+            )
+        # The test database is kept with the snapshot.
+        if not keepdb:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    "DROP SCHEMA IF EXISTS %s CASCADE"
+                    % self.connection.ops.quote_name(schema)
+                )
+        if suffix is None:
+            self._set_schema(self._old_schema)
+            if old_database_name is not None:
+                self.connection.settings_dict["NAME"] = old_database_name
+
+    def _set_schema(self, schema):
+        """
+        Switch the connection to the schema by its search_path.
+        """
+        self.connection.close()
+        if schema is None:
+            self.connection.settings_dict.pop("SCHEMA", None)
+        else:
+            self.connection.settings_dict["SCHEMA"] = schema
+
+    def _get_snapshot_schema(self):
+        """
+        Return the name of the snapshot schema, by a hash of the migration
+        files, of the models of the apps without migrations and of the
+        settings changing the schema.
+        """
+        from django.db.migrations.loader import MigrationLoader
+
+        migrate = self.connection.settings_dict["TEST"]["MIGRATE"] is not False
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        modules = []
+        if migrate:
+            for key in sorted(loader.graph.nodes):
+                modules.append(sys.modules[type(loader.graph.nodes[key]).__module__])
+        for app_config in apps.get_app_configs():
+            if app_config.models_module is not None and (
+                not migrate or app_config.label in loader.unmigrated_apps
+            ):
+                modules.append(app_config.models_module)
+        digest = hashlib.sha1()
+        for module in modules:
+            digest.update(module.__name__.encode())
+            with open(module.__file__, "rb") as f:
+                digest.update(f.read())
+        for name in self.snapshot_settings:
+            digest.update(("%s=%r" % (name, getattr(settings, name, None))).encode())
+        return self.snapshot_schema_prefix + digest.hexdigest()[:12]
+
+    def _get_snapshot_schemas(self, cursor):
+        """
+        Return the built snapshot schemas, without the ones being built.
+        """
+        cursor.execute("SELECT nspname FROM pg_namespace")
+        return [
+            schema
+            for (schema,) in cursor.fetchall()
+            if schema.startswith(self.snapshot_schema_prefix)
+            and not schema.endswith("_build")
+        ]
+
+    def _schema_exists(self, cursor, schema):
+        cursor.execute("SELECT 1 FROM pg_namespace WHERE nspname = %s", [schema])
+        return cursor.fetchone() is not None
+
+    def _clone_schema(self, source, target):
+        """
+        Recreate the target schema with the tables and rows of the source
+        schema, by CREATE TABLE ... (LIKE ...) and INSERT ... SELECT, then
+        their primary key, unique and foreign key constraints, and the
+        materialized views of the models.
+
+        A table with rows and an IDENTITY column is created from its model,
+        because explicit values can't be inserted into an IDENTITY column.
+        """
+        # Don't import django.db.migrations if it isn't needed.
+        from django.db.migrations.recorder import MigrationRecorder
+
+        models = {
+            model._meta.db_table: model
+            for model in apps.get_models(include_auto_created=True)
+        }
+        models[MigrationRecorder.Migration._meta.db_table] = MigrationRecorder.Migration
+        quote_name = self.connection.ops.quote_name
+        views = []
+        with self.connection.schema_editor() as editor:
+            for model in models.values():
+                view = editor._get_materialized_view(model)
+                if model._meta.managed and view is not None:
+                    views.append((model, view))
+        view_tables = {model._meta.db_table for model, view in views}
+        with self.connection.cursor() as cursor:
+            cursor.execute("DROP SCHEMA IF EXISTS %s CASCADE" % quote_name(target))
+            cursor.execute("CREATE SCHEMA %s" % quote_name(target))
+            cursor.execute(
+                "SELECT tablename FROM pg_tables WHERE schemaname = %s", [source]
+            )
+            tables = [
+                table
+                for (table,) in cursor.fetchall()
+                # the data of the materialized views is stored in mv_tbl__ tables.
+                if table not in view_tables and not table.startswith("mv_tbl__")
+            ]
+            for table in tables:
+                source_table = "%s.%s" % (quote_name(source), quote_name(table))
+                target_table = "%s.%s" % (quote_name(target), quote_name(table))
+                cursor.execute("SELECT 1 FROM %s LIMIT 1" % source_table)
+                has_rows = cursor.fetchone() is not None
+                model = models.get(table)
+                if (
+                    has_rows
+                    and model is not None
+                    and "identity(" in (model._meta.pk.db_type(self.connection) or "")
+                ):
+                    with self.connection.schema_editor() as editor:
+                        statements = editor._copy_table_sqls(
+                            model, source_table, target_table
+                        )
+                    for sql, params in statements:
+                        cursor.execute(sql, params)
+                    continue
+                cursor.execute(
+                    "CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS)"
+                    % (target_table, source_table)
+                )
+                if has_rows:
+                    cursor.execute(
+                        "INSERT INTO %s SELECT * FROM %s" % (target_table, source_table)
+                    )
+
+            # LIKE doesn't copy the constraints. The tables created from their
+            # models already have the primary key and unique columns.
+            existing = {
+                (constraint[0], constraint[2], tuple(constraint[3]))
+                for constraint in self._get_schema_constraints(cursor, target)
+            }
+            constraints = self._get_schema_constraints(cursor, source)
+            for table, name, kind, columns, to_table, to_columns in constraints:
+                if table not in tables or (table, kind, tuple(columns)) in existing:
+                    continue
+                if kind == "p":
+                    constraint = "PRIMARY KEY"
+                elif kind == "u":
+                    constraint = "UNIQUE"
+                elif to_table in tables:
+                    constraint = "FOREIGN KEY"
+                else:
+                    continue
+                sql = "ALTER TABLE %s.%s ADD CONSTRAINT %s %s (%s)" % (
+                    quote_name(target),
+                    quote_name(table),
+                    quote_name(name),
+                    constraint,
+                    ", ".join(quote_name(column) for column in columns),
+                )
+                if kind == "f":
+                    sql += " REFERENCES %s.%s (%s)" % (
+                        quote_name(target),
+                        quote_name(to_table),
+                        ", ".join(quote_name(column) for column in to_columns),
+                    )
+                cursor.execute(sql)
+
+            if views:
+                # The queries of the views select from the tables of the schema.
+                cursor.execute("SHOW search_path")
+                (search_path,) = cursor.fetchone()
+                cursor.execute("SET search_path TO %s" % quote_name(target))
+                try:
+                    with self.connection.schema_editor() as editor:
+                        for model, view in views:
+                            cursor.execute(
+                                str(editor._create_materialized_view_sql(model, view))
+                            )
+                finally:
+                    cursor.execute("SET search_path TO %s" % search_path)
+
+    def _get_schema_constraints(self, cursor, schema):
+        """
+        Return [(table, name, kind, columns, to_table, to_columns), ...] of
+        the primary key ("p"), unique ("u") and foreign key ("f") constraints
+        of the tables of the schema, the foreign keys last.
+        """
+        cursor.execute(
+            """
+            SELECT cl.relname, a.attnum, a.attname
+            FROM pg_attribute a
+            JOIN pg_class cl ON a.attrelid = cl.oid
+            JOIN pg_namespace n ON cl.relnamespace = n.oid
+            WHERE n.nspname = %s AND a.attnum > 0
+        """,
+            [schema],
+        )
+        attnames = {
+            (table, attnum): attname for table, attnum, attname in cursor.fetchall()
+        }
+        cursor.execute(
+            """
+            SELECT cl.relname, c.conname, c.contype, c.conkey::int[],
+                fcl.relname, c.confkey::int[]
+            FROM pg_constraint c
+            JOIN pg_class cl ON c.conrelid = cl.oid
+            JOIN pg_namespace n ON cl.relnamespace = n.oid
+            LEFT JOIN pg_class fcl
+                ON c.confrelid = fcl.oid AND fcl.relnamespace = n.oid
+            WHERE n.nspname = %s AND c.contype IN ('p', 'u', 'f')
+            ORDER BY CASE c.contype WHEN 'f' THEN 1 ELSE 0 END, cl.relname, c.conname
+        """,
+            [schema],
+        )
+        return [
+            (
+                table,
+                name,
+                kind,
+                [attnames[table, attnum] for attnum in conkey],
+                to_table,
+                # None for a foreign key to a table of another schema.
+                [attnames.get((to_table, attnum)) for attnum in confkey or ()],
+            )
+            for table, name, kind, conkey, to_table, confkey in cursor.fetchall()
+        ]
 
 
 class DatabaseIntrospection(BasePGDatabaseIntrospection):
+    data_types_reverse = {
+        **BasePGDatabaseIntrospection.data_types_reverse,
+        2935: "django_redshift_backend.HLLSketchField",  # hllsketch
+    }
+
     # to avoid output 'id = meta.AutoField(primary_key=True)',
     # return 'AutoField' for 'identity'.
     def get_field_type(self, data_type, description):
@@ -1243,10 +3184,14 @@ class DatabaseIntrospection(BasePGDatabaseIntrospection):
             (conname, conkey, conrelid, contype, used_cols)
             for (conname, conkey, conrelid, contype, used_cols) in cursor.fetchall()
         ]
-        table_oid = list(constraint_records)[0][2]  # Assuming at least one constraint
-        attribute_num_to_name_map = self._get_attribute_number_to_name_map_for_table(
-            cursor, table_oid
-        )
+        attribute_num_to_name_map = {}
+        if constraint_records:
+            # The constraints are of the same table.
+            attribute_num_to_name_map = (
+                self._get_attribute_number_to_name_map_for_table(
+                    cursor, constraint_records[0][2]
+                )
+            )
 
         for constraint, conkey, conrelid, kind, used_cols in constraint_records:
             constraints[constraint] = {
@@ -1288,6 +3233,12 @@ class DatabaseIntrospection(BasePGDatabaseIntrospection):
             (index_name, indrelid, indkey, unique, primary)
             for (index_name, indrelid, indkey, unique, primary) in cursor.fetchall()
         ]
+        if index_records and not attribute_num_to_name_map:
+            attribute_num_to_name_map = (
+                self._get_attribute_number_to_name_map_for_table(
+                    cursor, index_records[0][1]
+                )
+            )
         for index_name, indrelid, indkey, unique, primary in index_records:
             if index_name not in constraints:
                 constraints[index_name] = {
@@ -1342,6 +3293,175 @@ class DatabaseIntrospection(BasePGDatabaseIntrospection):
             if row[0] not in self.ignored_tables
         ]
 
+    def get_table_keys(self, cursor, table_name):
+        """
+        Return the distkey column, the sortkey columns in order and whether the
+        sortkey is interleaved for the given table.
+        """
+        cursor.execute(
+            """
+            SELECT a.attname, a.attisdistkey, a.attsortkeyord
+            FROM pg_attribute a
+            JOIN pg_class c ON a.attrelid = c.oid
+            WHERE c.relname = %s
+                AND pg_catalog.pg_table_is_visible(c.oid)
+                AND a.attnum > 0
+                AND (a.attisdistkey OR a.attsortkeyord <> 0)
+        """,
+            [table_name],
+        )
+        distkey = None
+        sortkeys = []
+        interleaved = False
+        for attname, isdistkey, sortkeyord in cursor.fetchall():
+            if isdistkey:
+                distkey = attname
+            if sortkeyord:
+                # interleaved sortkey columns have negative ordinals.
+                sortkeys.append((abs(sortkeyord), attname))
+                interleaved = interleaved or sortkeyord < 0
+        return TableKeys(
+            distkey, [attname for _, attname in sorted(sortkeys)], interleaved
+        )
+
+    def get_table_info(self, cursor, table_name):
+        """
+        Return the TableStorageInfo of the given table from svv_table_info, or
+        None if the table is not listed there, e.g. an empty table.
+        """
+        cursor.execute(
+            """
+            SELECT diststyle, sortkey1, unsorted, tbl_rows, estimated_visible_rows, size
+            FROM svv_table_info
+            WHERE "table" = %s AND "schema" = current_schema()
+        """,
+            [table_name],
+        )
+        row = cursor.fetchone()
+        return TableStorageInfo(*row) if row else None
+
+    # privileges of the letters of aclitem, grantable on Redshift tables.
+    acl_privileges = {
+        "r": "SELECT",
+        "a": "INSERT",
+        "w": "UPDATE",
+        "d": "DELETE",
+        "x": "REFERENCES",
+        "D": "DROP",
+    }
+
+    def get_table_privileges(self, cursor, table_name):
+        """
+        Return the TablePrivileges of the given table, of which the grants
+        are [(grantee, [privilege, ...]), ...] of the users and groups other
+        than the owner. The grantee is quoted, "GROUP ..." or PUBLIC.
+        """
+        cursor.execute(
+            """
+            SELECT pg_get_userbyid(c.relowner), c.relacl
+            FROM pg_class c
+            WHERE c.relname = %s AND pg_catalog.pg_table_is_visible(c.oid)
+        """,
+            [table_name],
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        owner, acl = row
+        quote_name = self.connection.ops.quote_name
+        grants = []
+        # e.g. {owner=arwdxD/owner,=r/owner,"group analysts=r/owner"}
+        for quoted, item in re.findall(r'"((?:[^"\\]|\\.)*)"|([^{},]+)', acl or ""):
+            grantee, _, privileges = (quoted or item).partition("=")
+            privileges = privileges.partition("/")[0]
+            if grantee == owner:
+                continue
+            if not grantee:
+                grantee = "PUBLIC"
+            elif grantee.startswith("group "):
+                grantee = "GROUP " + quote_name(grantee[len("group ") :])
+            else:
+                grantee = quote_name(grantee)
+            privileges = [
+                self.acl_privileges[letter]
+                for letter in privileges
+                if letter in self.acl_privileges
+            ]
+            if privileges:
+                grants.append((grantee, privileges))
+        return TablePrivileges(owner, grants)
+
+    def get_column_encodings(self, cursor, table_name):
+        """
+        Return {column: encoding} of the compression encodings of the given
+        table, or {} if the encodings are chosen by Redshift (ENCODE AUTO).
+        """
+        cursor.execute(
+            """
+            SELECT encoded
+            FROM svv_table_info
+            WHERE "table" = %s AND "schema" = current_schema()
+        """,
+            [table_name],
+        )
+        row = cursor.fetchone()
+        if row is not None and "AUTO" in (row[0] or ""):
+            return {}
+        cursor.execute(
+            """
+            SELECT a.attname, format_encoding(a.attencodingtype::integer)
+            FROM pg_attribute a
+            JOIN pg_class c ON a.attrelid = c.oid
+            WHERE c.relname = %s
+                AND pg_catalog.pg_table_is_visible(c.oid)
+                AND a.attnum > 0
+                AND NOT a.attisdropped
+        """,
+            [table_name],
+        )
+        # "none" is the raw encoding.
+        return {
+            column: "RAW" if encoding == "none" else encoding.upper()
+            for column, encoding in cursor.fetchall()
+        }
+
+    def get_dependent_views(self, cursor, table_name):
+        """
+        Return the names of the views bound to the given table, that is
+        views other than late-binding views (WITH NO SCHEMA BINDING).
+        """
+        cursor.execute(
+            """
+            SELECT DISTINCT v.relname
+            FROM pg_class t
+            JOIN pg_depend d ON d.refobjid = t.oid
+            JOIN pg_rewrite r ON d.objid = r.oid
+            JOIN pg_class v ON r.ev_class = v.oid
+            WHERE t.relname = %s
+                AND pg_catalog.pg_table_is_visible(t.oid)
+                AND v.oid <> t.oid
+            ORDER BY v.relname
+        """,
+            [table_name],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def get_materialized_view_info(self, cursor, view_name):
+        """
+        Return the MaterializedViewInfo of the given materialized view from
+        stv_mv_info, or None if the view doesn't exist.
+        """
+        cursor.execute(
+            """
+            SELECT is_stale = 't', state, autorefresh = 't'
+            FROM stv_mv_info
+            WHERE "name" = %s AND "schema" = current_schema()
+        """,
+            [view_name],
+        )
+        row = cursor.fetchone()
+        return MaterializedViewInfo(*row) if row else None
+
     def get_primary_key_column(self, cursor, table_name):
         """
         Return the name of the primary key column for the given table.
@@ -1365,6 +3485,21 @@ class DatabaseWrapper(BasePGDatabaseWrapper):
     data_types = deepcopy(BasePGDatabaseWrapper.data_types)
     data_types.update(redshift_data_types)
 
+    # ILIKE for case-insensitive lookups, instead of UPPER() of the column.
+    operators = dict(
+        BasePGDatabaseWrapper.operators,
+        iexact="ILIKE %s",
+        icontains="ILIKE %s",
+        istartswith="ILIKE %s",
+        iendswith="ILIKE %s",
+    )
+    pattern_ops = dict(
+        BasePGDatabaseWrapper.pattern_ops,
+        icontains="ILIKE '%%' || {} || '%%'",
+        istartswith="ILIKE {} || '%%'",
+        iendswith="ILIKE '%%' || {}",
+    )
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -1375,6 +3510,57 @@ class DatabaseWrapper(BasePGDatabaseWrapper):
         self.creation = DatabaseCreation(self)
         self.introspection = DatabaseIntrospection(self)
         self.validation = BaseDatabaseValidation(self)
+        # schema editor batching statements until the next query.
+        self.batching_schema_editor = None
+
+    @property
+    def written_tables(self):
+        """
+        Return {table: rows} of the tables written since the last flush and
+        the number of written rows, None if unknown, or None if they are not
+        tracked.
+        """
+        return _written_tables.get(self.alias)
+
+    def track_written_tables(self, sql=None, rows=-1):
+        """
+        Start tracking the written tables of the connections of this alias,
+        or add the tables written by the ``sql`` and its ``rows`` if they are
+        tracked. The rows are unknown if negative.
+        """
+        if sql is None:
+            _written_tables.setdefault(self.alias, {})
+            return
+        tables = _written_tables.get(self.alias)
+        if tables is None:
+            return
+        for table in _write_statement_re.findall(str(sql)):
+            written = tables.get(table, 0)
+            if written is None or rows is None or rows < 0:
+                tables[table] = None
+            else:
+                tables[table] = written + rows
+
+    def make_debug_cursor(self, cursor):
+        return CursorDebugWrapper(cursor, self)
+
+    def make_cursor(self, cursor):
+        return CursorWrapper(cursor, self)
+
+    def init_connection_state(self):
+        super().init_connection_state()
+        # Set by the test database creation, to run tests in a schema.
+        schema = self.settings_dict.get("SCHEMA")
+        if schema:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SET search_path TO %s" % self.ops.quote_name(schema))
+            if not self.get_autocommit():
+                self.connection.commit()
+
+    def _cursor(self, name=None):
+        if self.batching_schema_editor is not None:
+            self.batching_schema_editor.flush_statements()
+        return super()._cursor(name)
 
     def check_constraints(self, table_names=None):
         """
@@ -0,0 +1,36 @@
+"""
+SQL compilers of Redshift.
+
+A query of ``RedshiftQuerySet.approximate()`` compiles its subqueries, as of
+`Subquery` and `Exists`, with the same ``Count(distinct=True)``.
+"""
+
+from django.db.models.sql import compiler
+
+from .aggregates import approximate_context
+
+
+class ApproximateMixin:
+    def as_sql(self, *args, **kwargs):
+        with approximate_context(getattr(self.query, "approximate", None)):
+            return super().as_sql(*args, **kwargs)
+
+
+class SQLCompiler(ApproximateMixin, compiler.SQLCompiler):
+    pass
+
+
+class SQLInsertCompiler(compiler.SQLInsertCompiler):
+    pass
+
+
+class SQLDeleteCompiler(ApproximateMixin, compiler.SQLDeleteCompiler):
+    pass
+
+
+class SQLUpdateCompiler(ApproximateMixin, compiler.SQLUpdateCompiler):
+    pass
+
+
+class SQLAggregateCompiler(ApproximateMixin, compiler.SQLAggregateCompiler):
+    pass
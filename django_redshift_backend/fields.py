@@ -0,0 +1,176 @@
+from django.db import models
+from django.db.models import Func, lookups
+
+
+class CompactUUIDField(models.UUIDField):
+    """A UUIDField stored in 32 or 16 bytes instead of ``varchar(36)``.
+
+    The storages are:
+
+    * ``"char"``: ``char(32)`` of the hex without hyphens.
+    * ``"varbyte"``: ``varbyte(16)`` of the bytes.
+
+    Use as follows:
+
+      class MyModel(models.Model):
+          uuid = CompactUUIDField(storage="varbyte")
+
+    On other databases than Redshift, it's a UUIDField.
+    """
+
+    storages = {
+        "char": "char(32)",
+        "varbyte": "varbyte(16)",
+    }
+
+    def __init__(self, *args, storage="char", **kwargs):
+        if storage not in self.storages:
+            raise ValueError(
+                "CompactUUIDField storage must be one of %s, got %r."
+                % (", ".join(self.storages), storage)
+            )
+        self.storage = storage
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        path = path.replace("django_redshift_backend.fields", "django_redshift_backend")
+        if self.storage != "char":
+            kwargs["storage"] = self.storage
+        return name, path, args, kwargs
+
+    def db_type(self, connection):
+        if connection.vendor != "redshift":
+            return super().db_type(connection)
+        return self.storages[self.storage]
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if (
+            value is not None
+            and self.storage == "varbyte"
+            and connection.vendor == "redshift"
+        ):
+            from .psycopg2adapter import RedshiftBinary
+
+            value = RedshiftBinary(bytes.fromhex(value))
+        return value
+
+
+class SuperJSONField(models.JSONField):
+    """A JSONField stored in the SUPER type instead of ``varchar``.
+
+    The values are written with ``JSON_PARSE()``, and the key and index
+    transforms and the lookups are compiled to PartiQL navigation, as
+    ``"data"."owner"[0]``, to filter and project the JSON attributes on the
+    compute nodes.
+
+    Use as follows:
+
+      class MyModel(models.Model):
+          data = SuperJSONField()
+
+    On other databases than Redshift, it's a JSONField.
+    """
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        path = path.replace("django_redshift_backend.fields", "django_redshift_backend")
+        return name, path, args, kwargs
+
+    def db_type(self, connection):
+        if connection.vendor != "redshift":
+            return super().db_type(connection)
+        return "super"
+
+    def get_placeholder(self, value, compiler, connection):
+        if connection.vendor != "redshift":
+            return "%s"
+        return "JSON_PARSE(%s)"
+
+
+class HLLSketchField(models.Field):
+    """A HyperLogLog sketch of Redshift, stored in the HLLSKETCH type.
+
+    A sketch estimates the number of distinct values, and sketches of parts,
+    e.g. of days, combine into the sketch of the whole. The values are the
+    sketches in the JSON or the Base64 format of Redshift.
+
+    Use as follows:
+
+      class DailyUsers(models.Model):
+          day = models.DateField()
+          users = HLLSketchField()
+
+    On other databases than Redshift, the sketches are stored as text.
+    """
+
+    description = "HyperLogLog sketch"
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        path = path.replace("django_redshift_backend.fields", "django_redshift_backend")
+        return name, path, args, kwargs
+
+    def get_internal_type(self):
+        return "HLLSketchField"
+
+    def db_type(self, connection):
+        if connection.vendor != "redshift":
+            return models.TextField().db_type(connection)
+        return super().db_type(connection)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return str(value)
+
+
+class VarbyteHexMixin:
+    """
+    Compare the hex of a varbyte(16) CompactUUIDField with the text lookups.
+    """
+
+    def process_lhs(self, compiler, connection, lhs=None):
+        if (
+            lhs is None
+            and getattr(self.lhs.output_field, "storage", None) == "varbyte"
+            and connection.vendor == "redshift"
+        ):
+            lhs = Func(self.lhs, function="TO_HEX", output_field=models.CharField())
+        return super().process_lhs(compiler, connection, lhs)
+
+
+@CompactUUIDField.register_lookup
+class CompactUUIDIExact(VarbyteHexMixin, lookups.UUIDIExact):
+    pass
+
+
+@CompactUUIDField.register_lookup
+class CompactUUIDContains(VarbyteHexMixin, lookups.UUIDContains):
+    pass
+
+
+@CompactUUIDField.register_lookup
+class CompactUUIDIContains(VarbyteHexMixin, lookups.UUIDIContains):
+    pass
+
+
+@CompactUUIDField.register_lookup
+class CompactUUIDStartsWith(VarbyteHexMixin, lookups.UUIDStartsWith):
+    pass
+
+
+@CompactUUIDField.register_lookup
+class CompactUUIDIStartsWith(VarbyteHexMixin, lookups.UUIDIStartsWith):
+    pass
+
+
+@CompactUUIDField.register_lookup
+class CompactUUIDEndsWith(VarbyteHexMixin, lookups.UUIDEndsWith):
+    pass
+
+
+@CompactUUIDField.register_lookup
+class CompactUUIDIEndsWith(VarbyteHexMixin, lookups.UUIDIEndsWith):
+    pass
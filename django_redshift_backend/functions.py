@@ -0,0 +1,23 @@
+"""
+Functions of Redshift.
+"""
+
+from django.db.models import BigIntegerField, Func
+
+from .fields import HLLSketchField
+
+
+class HllCardinality(Func):
+    """Estimated number of distinct values of a HyperLogLog sketch."""
+
+    function = "HLL_CARDINALITY"
+    arity = 1
+    output_field = BigIntegerField()
+
+
+class HllCombineSketches(Func):
+    """Union of two HyperLogLog sketches."""
+
+    function = "HLL_COMBINE_SKETCHES"
+    arity = 2
+    output_field = HLLSketchField()
@@ -0,0 +1,555 @@
+"""
+Compile the transforms and lookups of Django on Redshift.
+
+Django compiles an expression with its ``as_<vendor>`` method if any, so the
+``as_redshift`` methods are added to the transforms and lookups of Django. The key and index transforms of a SuperJSONField are compiled to
+PartiQL navigation of the SUPER value, as ``"data"."owner"[0]``, and those of
+a JSONField stored as varchar to ``JSON_EXTRACT_PATH_TEXT()`` and
+``JSON_EXTRACT_ARRAY_ELEMENT_TEXT()`` of the JSON text.
+
+``iexact`` is compiled to ILIKE, or to UPPER() of both sides if the value is
+an expression of columns, of which the wildcards can't be escaped.
+
+An ``__in`` lookup of at least ``REDSHIFT_IN_TEMP_TABLE_MIN_VALUES`` values is
+compiled to a semi-join with a temporary table of the values, created by the
+cursor executing the query, instead of a placeholder for each value.
+
+Comparisons of a truncated datetime, as ``__date``, with values are compiled
+to half-open ranges of the datetime column, computed in the time zone of the
+truncation, so that the zone maps of the column can skip the blocks.
+"""
+
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import models
+from django.db.models import lookups
+from django.db.models.functions.datetime import TruncBase
+
+from django.db.models.fields.json import (
+    ContainedBy,
+    DataContains,
+    HasKeyLookup,
+    JSONExact,
+    KeyTextTransform,
+    KeyTransform,
+    KeyTransformGt,
+    KeyTransformGte,
+    KeyTransformIn,
+    KeyTransformLt,
+    KeyTransformLte,
+)
+from django.db.utils import NotSupportedError
+from django.utils import timezone
+
+from .fields import SuperJSONField
+from .meta import DistKey
+
+
+def is_super_json(expression):
+    """
+    Return True if the expression is a SuperJSONField, or a key transform of
+    a SuperJSONField.
+    """
+    while isinstance(expression, KeyTransform):
+        expression = expression.lhs
+    return isinstance(
+        getattr(expression, "_output_field_or_none", None), SuperJSONField
+    )
+
+
+def compile_attribute(key):
+    return '."%s"' % str(key).replace('"', '""').replace("%", "%%")
+
+
+def compile_navigation(key_transforms):
+    """
+    Return the PartiQL navigation of the keys, with integers as array indexes.
+    """
+    path = []
+    for key in key_transforms:
+        try:
+            num = int(key)
+        except ValueError:  # non-integer
+            path.append(compile_attribute(key))
+        else:
+            path.append("[%s]" % num)
+    return "".join(path)
+
+
+def compile_json_extract(lhs, params, key_transforms):
+    """
+    Return (sql, params) extracting the text of the keys from the JSON text of
+    lhs, with integers as array indexes. A missing key is NULL, instead of an
+    empty string.
+    """
+    sql, params = lhs, list(params)
+    keys = []
+    for key in [*key_transforms, None]:
+        try:
+            num = None if key is None else int(key)
+        except ValueError:  # non-integer
+            keys.append(key)
+            continue
+        if keys:
+            sql = "JSON_EXTRACT_PATH_TEXT(%s, %s)" % (
+                sql,
+                ", ".join(["%s"] * len(keys)),
+            )
+            params.extend(keys)
+            keys = []
+        if num is not None:
+            sql = "JSON_EXTRACT_ARRAY_ELEMENT_TEXT(%s, %%s)" % sql
+            params.append(num)
+    return "NULLIF(%s, '')" % sql, params
+
+
+# text of a JSON number, cast to float8 only if matching.
+JSON_NUMBER_PATTERN = "^-?[0-9]+([.][0-9]+)?([eE][-+]?[0-9]+)?$"
+
+
+def get_text_comparison(lhs, lhs_params, value):
+    """
+    Return (lhs, lhs_params, param) to compare the extracted text of lhs with
+    the JSON value, casting lhs for numbers if the text is a number, so that a
+    text of another value doesn't fail the query.
+    """
+    if isinstance(value, bool):
+        # The text of a boolean is true or false.
+        return lhs, lhs_params, json.dumps(value)
+    if isinstance(value, (int, float)):
+        return (
+            "(CASE WHEN %s ~ '%s' THEN %s::float8 END)"
+            % (lhs, JSON_NUMBER_PATTERN, lhs),
+            (*lhs_params, *lhs_params),
+            value,
+        )
+    if isinstance(value, str):
+        return lhs, lhs_params, value
+    # Objects and arrays are compared as the JSON text.
+    return lhs, lhs_params, json.dumps(value)
+
+
+def _iter_contained(value, path=()):
+    """
+    Yield (path, value) of the scalars and arrays of the objects in value.
+    """
+    if isinstance(value, dict) and value:
+        for key, item in value.items():
+            yield from _iter_contained(item, path + (key,))
+    else:
+        yield path, value
+
+
+def key_transform_as_redshift(self, compiler, connection):
+    lhs, params, key_transforms = self.preprocess_lhs(compiler, connection)
+    if not is_super_json(self):
+        sql, params = compile_json_extract(lhs, params, key_transforms)
+        return sql, tuple(params)
+    return "%s%s" % (lhs, compile_navigation(key_transforms)), tuple(params)
+
+
+def key_text_transform_as_redshift(self, compiler, connection):
+    if not is_super_json(self):
+        # The extracted values are text already.
+        return key_transform_as_redshift(self, compiler, connection)
+    sql, params = key_transform_as_redshift(self, compiler, connection)
+    # Strings without quotes, as ->> of PostgreSQL, and others serialized.
+    return (
+        "(CASE WHEN IS_VARCHAR(%s) THEN %s::varchar ELSE JSON_SERIALIZE(%s) END)"
+        % (sql, sql, sql),
+        params * 3,
+    )
+
+
+def json_exact_as_redshift(self, compiler, connection):
+    if not is_super_json(self.lhs):
+        if not isinstance(self.lhs, KeyTransform) or not self.rhs_is_direct_value():
+            return self.as_sql(compiler, connection)
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        _rhs, (rhs_param,) = self.process_rhs(compiler, connection)
+        value = json.loads(rhs_param)
+        if value is None:
+            return "%s IS NULL" % lhs, tuple(lhs_params)
+        lhs, lhs_params, rhs_param = get_text_comparison(lhs, lhs_params, value)
+        return "%s = %%s" % lhs, (*lhs_params, rhs_param)
+    lhs, lhs_params = self.process_lhs(compiler, connection)
+    rhs, rhs_params = self.process_rhs(compiler, connection)
+    if rhs == "%s":
+        # Compare SUPER values instead of the JSON text.
+        rhs = "JSON_PARSE(%s)"
+    return "%s = %s" % (lhs, rhs), (*lhs_params, *rhs_params)
+
+
+def key_transform_in_as_redshift(self, compiler, connection):
+    if not self.rhs_is_direct_value():
+        return self.as_sql(compiler, connection)
+    lhs, lhs_params = self.process_lhs(compiler, connection)
+    _rhs, rhs_params = self.process_rhs(compiler, connection)
+    if not is_super_json(self.lhs):
+        # Compare the texts, of the strings without quotes.
+        values = [json.loads(param) for param in rhs_params]
+        rhs_params = [
+            value if isinstance(value, str) else json.dumps(value) for value in values
+        ]
+        rhs = "(%s)" % ", ".join(["%s"] * len(rhs_params))
+    else:
+        rhs = "(%s)" % ", ".join(["JSON_PARSE(%s)"] * len(rhs_params))
+    return "%s IN %s" % (lhs, rhs), (*lhs_params, *rhs_params)
+
+
+def key_transform_numeric_as_redshift(self, compiler, connection):
+    if is_super_json(self.lhs) or not self.rhs_is_direct_value():
+        return self.as_sql(compiler, connection)
+    lhs, lhs_params = self.process_lhs(compiler, connection)
+    rhs, (rhs_param,) = self.process_rhs(compiler, connection)
+    lhs, lhs_params, rhs_param = get_text_comparison(lhs, lhs_params, rhs_param)
+    return "%s %s" % (lhs, self.get_rhs_op(connection, rhs)), (
+        *lhs_params,
+        rhs_param,
+    )
+
+
+def data_contains_as_redshift(self, compiler, connection):
+    """
+    Compare each scalar or array of the objects in the value, by the path
+    of the keys. Arrays are compared as a whole, not by their elements.
+    """
+    if not is_super_json(self.lhs):
+        return self.as_sql(compiler, connection)
+    if not self.rhs_is_direct_value():
+        raise NotSupportedError(
+            "contains lookup of SuperJSONField is only supported with a value."
+        )
+    lhs, lhs_params = self.process_lhs(compiler, connection)
+    encoder = self.lhs.output_field.encoder
+    conditions = []
+    params = []
+    for path, value in _iter_contained(self.rhs):
+        navigation = lhs + compile_navigation(path)
+        if value == {}:
+            conditions.append("IS_OBJECT(%s)" % navigation)
+            params.extend(lhs_params)
+        else:
+            conditions.append("%s = JSON_PARSE(%%s)" % navigation)
+            params.extend(lhs_params)
+            params.append(connection.ops.adapt_json_value(value, encoder))
+    return "(%s)" % " AND ".join(conditions), tuple(params)
+
+
+def contained_by_as_redshift(self, compiler, connection):
+    if not is_super_json(self.lhs):
+        return self.as_sql(compiler, connection)
+    raise NotSupportedError("contained_by lookup is not supported on SuperJSONField.")
+
+
+def has_key_as_redshift(self, compiler, connection):
+    """
+    A key is found if its value is not null. A key of which the value is JSON
+    null isn't found, as PartiQL navigates a missing key to null too.
+
+    A key of a JSONField is found if its text is not empty, or else if the
+    navigation of the parsed JSON finds it, as of an empty string.
+    """
+    if isinstance(self.lhs, KeyTransform):
+        lhs, lhs_params, lhs_key_transforms = self.lhs.preprocess_lhs(
+            compiler, connection
+        )
+    else:
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        lhs_key_transforms = []
+    rhs = self.rhs
+    if not isinstance(rhs, (list, tuple)):
+        rhs = [rhs]
+    sql_parts = []
+    params = []
+    for key in rhs:
+        if isinstance(key, KeyTransform):
+            *_, rhs_key_transforms = key.preprocess_lhs(compiler, connection)
+        else:
+            rhs_key_transforms = [key]
+        *rhs_key_transforms, final_key = rhs_key_transforms
+        key_transforms = lhs_key_transforms + rhs_key_transforms
+        # The final key is an attribute, even if it's an integer.
+        navigation = compile_navigation(key_transforms) + compile_attribute(final_key)
+        if not is_super_json(self.lhs):
+            if key_transforms:
+                sql, sql_params = compile_json_extract(lhs, lhs_params, key_transforms)
+            else:
+                sql, sql_params = lhs, list(lhs_params)
+            # The text of an empty string, or of a missing key, is empty.
+            sql_parts.append(
+                "(JSON_EXTRACT_PATH_TEXT(%s, %%s) <> '' OR JSON_PARSE(%s)%s IS NOT NULL)"
+                % (sql, lhs, navigation)
+            )
+            params.extend([*sql_params, str(final_key), *lhs_params])
+            continue
+        sql_parts.append("%s%s IS NOT NULL" % (lhs, navigation))
+        params.extend(lhs_params)
+    return self._combine_sql_parts(sql_parts), tuple(params)
+
+
+def iexact_as_redshift(self, compiler, connection):
+    if not getattr(self.rhs, "contains_column_references", False):
+        return self.as_sql(compiler, connection)
+    lhs, lhs_params = self.process_lhs(compiler, connection)
+    rhs, rhs_params = self.process_rhs(compiler, connection)
+    return "UPPER(%s) = UPPER(%s)" % (lhs, rhs), (*lhs_params, *rhs_params)
+
+
+def is_distkey(expression):
+    """
+    Return True if the expression is the DistKey column of its model.
+    """
+    field = getattr(expression, "target", None)
+    if field is None or getattr(field, "model", None) is None:
+        return False
+    return any(
+        isinstance(index, DistKey) and index.fields == [field.name]
+        for index in field.model._meta.indexes
+    )
+
+
+def in_as_redshift(self, compiler, connection):
+    if can_use_trunc_range(self):
+        return trunc_in_as_redshift(self, compiler, connection)
+    min_values = connection.ops.in_temp_table_min_values
+    if (
+        min_values is None
+        or not self.rhs_is_direct_value()
+        or self.bilateral_transforms
+        or len(self.rhs) < min_values
+    ):
+        return self.as_sql(compiler, connection)
+    lhs, lhs_params = self.process_lhs(compiler, connection)
+    _rhs, rhs_params = self.process_rhs(compiler, connection)
+    table = connection.ops.in_temp_table(
+        list(rhs_params), self.lhs.output_field, distkey=is_distkey(self.lhs)
+    )
+    return "%s IN (SELECT %s FROM %%s)" % (
+        lhs,
+        connection.ops.quote_name("value"),
+    ), (*lhs_params, table)
+
+
+lookups.IExact.as_redshift = iexact_as_redshift
+lookups.In.as_redshift = in_as_redshift
+KeyTransform.as_redshift = key_transform_as_redshift
+KeyTextTransform.as_redshift = key_text_transform_as_redshift
+JSONExact.as_redshift = json_exact_as_redshift
+KeyTransformIn.as_redshift = key_transform_in_as_redshift
+DataContains.as_redshift = data_contains_as_redshift
+ContainedBy.as_redshift = contained_by_as_redshift
+HasKeyLookup.as_redshift = has_key_as_redshift
+KeyTransformLt.as_redshift = key_transform_numeric_as_redshift
+KeyTransformLte.as_redshift = key_transform_numeric_as_redshift
+KeyTransformGt.as_redshift = key_transform_numeric_as_redshift
+KeyTransformGte.as_redshift = key_transform_numeric_as_redshift
+
+
+# period of a truncation kind, other than months.
+_trunc_periods = {
+    "week": datetime.timedelta(weeks=1),
+    "day": datetime.timedelta(days=1),
+    "date": datetime.timedelta(days=1),
+    "hour": datetime.timedelta(hours=1),
+    "minute": datetime.timedelta(minutes=1),
+    "second": datetime.timedelta(seconds=1),
+}
+
+
+def truncate_datetime(value, kind):
+    """
+    Return the start of the period of the kind containing the naive datetime,
+    as date_trunc() does.
+    """
+    if kind == "second":
+        return value.replace(microsecond=0)
+    if kind == "minute":
+        return value.replace(second=0, microsecond=0)
+    if kind == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if kind == "week":
+        return value - datetime.timedelta(days=value.weekday())
+    if kind == "month":
+        return value.replace(day=1)
+    if kind == "quarter":
+        return value.replace(month=(value.month - 1) // 3 * 3 + 1, day=1)
+    if kind == "year":
+        return value.replace(month=1, day=1)
+    return value
+
+
+def next_period(start, kind):
+    """
+    Return the start of the period of the kind following the one at start.
+    """
+    if kind in ("year", "quarter", "month"):
+        months = {"year": 12, "quarter": 3, "month": 1}[kind]
+        month = start.month - 1 + months
+        return start.replace(year=start.year + month // 12, month=month % 12 + 1)
+    return start + _trunc_periods[kind]
+
+
+# kinds of truncations of which the periods are ranges of the column.
+_trunc_kinds = (
+    "year",
+    "quarter",
+    "month",
+    "week",
+    "day",
+    "date",
+    "hour",
+    "minute",
+    "second",
+)
+
+
+def can_use_trunc_range(lookup):
+    """
+    Return True if the lookup compares a truncation of a datetime column with
+    values.
+    """
+    return (
+        isinstance(lookup.lhs, TruncBase)
+        and lookup.rhs_is_direct_value()
+        and lookup.lhs.kind in _trunc_kinds
+        and isinstance(lookup.lhs.lhs.output_field, models.DateTimeField)
+    )
+
+
+def get_trunc_period(lookup, value):
+    """
+    Return (start, end, is_start) of the period of the truncation containing
+    value, as datetimes of the column, and whether value is the start.
+
+    A naive datetime is in the current time zone, as of a DateTimeField.
+    """
+    kind = lookup.lhs.kind
+    tzinfo = None
+    if settings.USE_TZ:
+        tzinfo = lookup.lhs.tzinfo or timezone.get_current_timezone()
+    if isinstance(value, datetime.datetime):
+        if tzinfo is not None:
+            if timezone.is_naive(value):
+                value = timezone.make_aware(value, timezone.get_current_timezone())
+            value = timezone.make_naive(value, tzinfo)
+    else:
+        value = datetime.datetime.combine(value, datetime.time.min)
+    start = truncate_datetime(value, kind)
+    end = next_period(start, kind)
+    is_start = value == start
+    if tzinfo is not None:
+        start, end = (
+            timezone.make_aware(start, tzinfo),
+            timezone.make_aware(end, tzinfo),
+        )
+    return start, end, is_start
+
+
+def _exact_bounds(lookup):
+    start, end, is_start = get_trunc_period(lookup, lookup.rhs)
+    if not is_start:
+        return None
+    return [(">=", start), ("<", end)]
+
+
+def _gt_bounds(lookup):
+    _start, end, _is_start = get_trunc_period(lookup, lookup.rhs)
+    return [(">=", end)]
+
+
+def _gte_bounds(lookup):
+    start, end, is_start = get_trunc_period(lookup, lookup.rhs)
+    return [(">=", start if is_start else end)]
+
+
+def _lt_bounds(lookup):
+    start, end, is_start = get_trunc_period(lookup, lookup.rhs)
+    return [("<", start if is_start else end)]
+
+
+def _lte_bounds(lookup):
+    _start, end, _is_start = get_trunc_period(lookup, lookup.rhs)
+    return [("<", end)]
+
+
+def _range_bounds(lookup):
+    lower_start, lower_end, lower_is_start = get_trunc_period(lookup, lookup.rhs[0])
+    _upper_start, upper_end, _upper_is_start = get_trunc_period(lookup, lookup.rhs[1])
+    return [
+        (">=", lower_start if lower_is_start else lower_end),
+        ("<", upper_end),
+    ]
+
+
+# [(operator, datetime), ...] of the column for a lookup, or None if no row
+# matches.
+_trunc_bounds = {
+    "exact": _exact_bounds,
+    "gt": _gt_bounds,
+    "gte": _gte_bounds,
+    "lt": _lt_bounds,
+    "lte": _lte_bounds,
+    "range": _range_bounds,
+}
+
+
+def compile_trunc_bounds(lookup, compiler, connection, bounds):
+    lhs, lhs_params = compiler.compile(lookup.lhs.lhs)
+    field = lookup.lhs.lhs.output_field
+    sql_parts = []
+    params = []
+    for operator, value in bounds:
+        sql_parts.append("%s %s %%s" % (lhs, operator))
+        params.extend(lhs_params)
+        params.append(field.get_db_prep_value(value, connection))
+    return " AND ".join(sql_parts), params
+
+
+def trunc_range_as_redshift(self, compiler, connection):
+    """
+    Compare a truncation of a datetime column with a value by the range of
+    the column in the periods.
+    """
+    if not can_use_trunc_range(self):
+        return self.as_sql(compiler, connection)
+    bounds = _trunc_bounds[self.lookup_name](self)
+    if bounds is None:
+        raise EmptyResultSet
+    sql, params = compile_trunc_bounds(self, compiler, connection, bounds)
+    return sql, tuple(params)
+
+
+def trunc_in_as_redshift(self, compiler, connection):
+    """
+    Compare a truncation of a datetime column with the values by the ranges
+    of the column in the periods of the values, skipping values which aren't
+    the start of a period.
+    """
+    sql_parts = []
+    params = []
+    for value in self.rhs:
+        if value is None:
+            continue
+        start, end, is_start = get_trunc_period(self, value)
+        if is_start:
+            sql, sql_params = compile_trunc_bounds(
+                self, compiler, connection, [(">=", start), ("<", end)]
+            )
+            sql_parts.append("(%s)" % sql)
+            params.extend(sql_params)
+    if not sql_parts:
+        raise EmptyResultSet
+    return "(%s)" % " OR ".join(sql_parts), tuple(params)
+
+
+lookups.Exact.as_redshift = trunc_range_as_redshift
+lookups.GreaterThan.as_redshift = trunc_range_as_redshift
+lookups.GreaterThanOrEqual.as_redshift = trunc_range_as_redshift
+lookups.LessThan.as_redshift = trunc_range_as_redshift
+lookups.LessThanOrEqual.as_redshift = trunc_range_as_redshift
+lookups.Range.as_redshift = trunc_range_as_redshift
@@ -0,0 +1,121 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.loader import AmbiguityError
+
+from django_redshift_backend.planner import DEFAULT_THROUGHPUT, NOT_SQL, estimate_plan
+
+
+class Command(BaseCommand):
+    help = (
+        "Estimates the table rewrites of unapplied migrations on Redshift, "
+        "without applying them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "app_label",
+            nargs="?",
+            help="App label of an application to estimate the migrations of.",
+        )
+        parser.add_argument(
+            "migration_name",
+            nargs="?",
+            help="Migration name to estimate the migrations up to.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            choices=tuple(connections),
+            help='Nominates a database to estimate for. Defaults to the "default" '
+            "database.",
+        )
+        parser.add_argument(
+            "--throughput",
+            type=float,
+            default=DEFAULT_THROUGHPUT,
+            help="MB/s to rewrite a table, to estimate the duration. Defaults to %s."
+            % DEFAULT_THROUGHPUT,
+        )
+        parser.add_argument(
+            "--sql",
+            action="store_true",
+            help="Shows the SQL statements of each operation.",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        executor = MigrationExecutor(connection)
+        loader = executor.loader
+
+        app_label, migration_name = options["app_label"], options["migration_name"]
+        if app_label:
+            try:
+                apps.get_app_config(app_label)
+            except LookupError as err:
+                raise CommandError(str(err))
+            if app_label not in loader.migrated_apps:
+                raise CommandError("App '%s' does not have migrations" % app_label)
+        if migration_name:
+            try:
+                migration = loader.get_migration_by_prefix(app_label, migration_name)
+            except AmbiguityError:
+                raise CommandError(
+                    "More than one migration matches '%s' in app '%s'. Please be "
+                    "more specific." % (migration_name, app_label)
+                )
+            except KeyError:
+                raise CommandError(
+                    "Cannot find a migration matching '%s' from app '%s'."
+                    % (migration_name, app_label)
+                )
+            targets = [(app_label, migration.name)]
+        elif app_label:
+            targets = [key for key in loader.graph.leaf_nodes() if key[0] == app_label]
+        else:
+            targets = loader.graph.leaf_nodes()
+
+        plan = executor.migration_plan(targets)
+        if any(backwards for _migration, backwards in plan):
+            raise CommandError("Estimate of backwards migrations is not supported.")
+        if not plan:
+            self.stdout.write("No migrations to apply.")
+            return
+
+        state = executor._create_project_state(with_applied_migrations=True)
+        try:
+            estimates = estimate_plan(
+                connection, plan, state, throughput=options["throughput"]
+            )
+        except ValueError as err:
+            raise CommandError(str(err))
+
+        total_size = total_seconds = 0
+        migration = None
+        for estimate in estimates:
+            if estimate.migration != migration:
+                migration = estimate.migration
+                self.stdout.write(self.style.MIGRATE_HEADING(migration))
+            if estimate.kind == NOT_SQL:
+                cost = "not estimated"
+            elif estimate.tables and estimate.seconds:
+                cost = "%s: %s rows, %s MB, ~%.0fs" % (
+                    ", ".join(estimate.tables),
+                    estimate.rows,
+                    estimate.size,
+                    estimate.seconds,
+                )
+                total_size += estimate.size
+                total_seconds += estimate.seconds
+            else:
+                cost = ", ".join(estimate.tables)
+            self.stdout.write(
+                "  %s [%s] %s" % (estimate.operation, estimate.kind, cost)
+            )
+            if options["sql"]:
+                for sql in estimate.sql:
+                    self.stdout.write("    " + sql)
+        self.stdout.write(
+            "Rewrites %s MB in ~%.0fs in total." % (total_size, total_seconds)
+        )
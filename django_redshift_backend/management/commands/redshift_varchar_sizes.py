@@ -0,0 +1,135 @@
+import os
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+from django_redshift_backend.sizing import (
+    DEFAULT_HEADROOM,
+    make_migration,
+    propose_sizes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Proposes tighter max_length of CharField and TextField from the longest "
+        "values stored on Redshift, and writes migrations to apply them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "app_label",
+            nargs="*",
+            help="App labels of applications to propose the sizes of.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            choices=tuple(connections),
+            help='Nominates a database to measure. Defaults to the "default" database.',
+        )
+        parser.add_argument(
+            "--headroom",
+            type=float,
+            default=DEFAULT_HEADROOM,
+            help="Headroom over the longest value, as a ratio. Defaults to %s."
+            % DEFAULT_HEADROOM,
+        )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            help="Number of tables to measure in parallel. Defaults to 1.",
+        )
+        parser.add_argument(
+            "--write",
+            action="store_true",
+            help="Writes a migration for each app to alter the sizes in place.",
+        )
+        parser.add_argument(
+            "--include-rewrites",
+            action="store_true",
+            help="Writes also the changes that rewrite the column: from a "
+            "TextField, or of a field with a default.",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        app_labels = options["app_label"]
+        try:
+            app_configs = (
+                [apps.get_app_config(app_label) for app_label in app_labels]
+                if app_labels
+                else apps.get_app_configs()
+            )
+        except LookupError as err:
+            raise CommandError(str(err))
+        models = [
+            model
+            for app_config in app_configs
+            for model in app_config.get_models()
+            if model._meta.managed
+            and not model._meta.proxy
+            and router.allow_migrate_model(connection.alias, model)
+        ]
+
+        proposals = propose_sizes(
+            connection, models, headroom=options["headroom"], jobs=options["jobs"]
+        )
+        proposals = [proposal for proposal in proposals if proposal.max_length]
+        if not proposals:
+            self.stdout.write("No oversized columns.")
+            return
+        for proposal in proposals:
+            self.stdout.write(
+                "%s.%s: %s bytes, longest %s chars, %s bytes -> max_length=%s [%s]"
+                % (
+                    proposal.model._meta.label,
+                    proposal.field.name,
+                    proposal.declared_bytes,
+                    proposal.max_chars or 0,
+                    proposal.max_bytes or 0,
+                    proposal.max_length,
+                    "in-place" if proposal.in_place else "rewrite",
+                )
+            )
+        if not options["write"]:
+            return
+
+        if not options["include_rewrites"]:
+            proposals = [proposal for proposal in proposals if proposal.in_place]
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        for app_label in sorted({p.model._meta.app_label for p in proposals}):
+            if app_label not in loader.migrated_apps:
+                self.stderr.write("App '%s' does not have migrations." % app_label)
+                continue
+            leaf_nodes = loader.graph.leaf_nodes(app_label)
+            if len(leaf_nodes) != 1:
+                raise CommandError(
+                    "Conflicting migrations detected in app '%s'; run "
+                    "'python manage.py makemigrations --merge' to fix them." % app_label
+                )
+            number = MigrationAutodetector.parse_number(leaf_nodes[0][1]) or 0
+            migration = make_migration(
+                app_label,
+                "%04i_right_size_varchars" % (number + 1),
+                leaf_nodes,
+                proposals,
+            )
+            writer = MigrationWriter(migration)
+            with open(writer.path, "w", encoding="utf-8") as fh:
+                fh.write(writer.as_string())
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    "Migration %s:" % os.path.relpath(writer.path)
+                )
+            )
+            for operation in migration.operations:
+                self.stdout.write("  - %s" % operation.describe())
+        self.stdout.write(
+            "Update the max_length of the fields in the models as in the migrations."
+        )
@@ -1,4 +1,4 @@
-from django.db.models import Index
+from django.db.models import BaseConstraint, Index
 
 
 class DistKey(Index):
@@ -19,9 +19,210 @@ class DistKey(Index):
         return (path, expressions, kwargs)
 
 
+class SortKeys(Index):
+    """An index denoting the SORTKEY columns for a model.
+
+    Unlike `SortKey`, it doesn't become the default ordering of Django, so
+    querysets aren't sorted on the leader node unless they ask for it.
+
+    Use as follows:
+
+      class MyModel(models.Model):
+      ...
+
+      class Meta:
+          indexes = [SortKeys(fields=['created_at', 'id'])]
+    """
+
+    def deconstruct(self):
+        path, expressions, kwargs = super().deconstruct()
+        path = path.replace("django_redshift_backend.meta", "django_redshift_backend")
+        return (path, expressions, kwargs)
+
+
+class TableStyle(BaseConstraint):
+    """Base class of the table options declared in the model Meta `constraints`.
+
+    Redshift doesn't have conventional constraints; `constraints` is merely a
+    convenient place in the Meta for a table option that names no field.
+    """
+
+    styles = ()
+    # the table option altered by the style, shared with the keys of the same
+    # option so that a migration alters it at most once.
+    option = None
+
+    def __init__(self, style, *, name=None):
+        style = style.upper()
+        if style not in self.styles:
+            raise ValueError(
+                "{} must be one of {}, got {!r}.".format(
+                    self.__class__.__name__, ", ".join(self.styles), style
+                )
+            )
+        self.style = style
+        if name is None:
+            name = "%(app_label)s_%(class)s_" + self.__class__.__name__.lower()
+        super().__init__(name=name)
+
+    def constraint_sql(self, model, schema_editor):
+        # Rendered as a table option by DatabaseSchemaEditor._get_create_options.
+        return None
+
+    def validate(self, model, instance, exclude=None, using=None):
+        # Nothing to validate on model instances.
+        pass
+
+    def deconstruct(self):
+        path, _, kwargs = super().deconstruct()
+        path = path.replace("django_redshift_backend.meta", "django_redshift_backend")
+        return (path, (self.style,), kwargs)
+
+    def __eq__(self, other):
+        if self.__class__ == other.__class__:
+            return self.deconstruct() == other.deconstruct()
+        return NotImplemented
+
+    def __repr__(self):
+        return "<{}: style={!r} name={!r}>".format(
+            self.__class__.__name__, self.style, self.name
+        )
+
+
+class DistStyle(TableStyle):
+    """A DISTSTYLE in Redshift: one of AUTO, EVEN, KEY or ALL.
+
+    KEY requires a `DistKey` in `indexes`, the other styles must not have one.
+
+    Use as follows:
+
+      class MyModel(models.Model):
+      ...
+
+      class Meta:
+          constraints = [DistStyle('all')]
+    """
+
+    styles = ("AUTO", "EVEN", "KEY", "ALL")
+    option = "diststyle"
+
+    def create_sql(self, model, schema_editor):
+        return schema_editor._alter_diststyle_sql(model, self.style)
+
+    def remove_sql(self, model, schema_editor):
+        return schema_editor._alter_diststyle_sql(model, "AUTO")
+
+
+class SortStyle(TableStyle):
+    """The style of the SORTKEY in Redshift: one of COMPOUND, INTERLEAVED or AUTO.
+
+    COMPOUND and INTERLEAVED apply to the `SortKeys` or `SortKey` columns of the
+    model, AUTO must not have any.
+
+    Use as follows:
+
+      class MyModel(models.Model):
+      ...
+
+      class Meta:
+          ordering = [SortKey('created_at'), SortKey('customer_id')]
+          constraints = [SortStyle('interleaved')]
+    """
+
+    styles = ("COMPOUND", "INTERLEAVED", "AUTO")
+    option = "sortkey"
+
+    def create_sql(self, model, schema_editor):
+        return schema_editor._alter_sortkey_sql(model, self.style)
+
+    def remove_sql(self, model, schema_editor):
+        # Without a SortStyle, sort key columns make a compound sort key.
+        if self.style == "COMPOUND":
+            return None
+        return schema_editor._alter_sortkey_sql(model, None)
+
+
+class MaterializedView(BaseConstraint):
+    """A materialized view in Redshift of a query, backing the model.
+
+    The query is a QuerySet, or SQL with ``params``, of which the columns are
+    the columns of the model. The `DistKey`, `DistStyle`, `SortKeys` and
+    `SortStyle` of the model apply to the view. ``auto_refresh`` lets Redshift
+    refresh the view when its base tables change.
+
+    Migrations record the SQL of the query, and recreate the view when it
+    changes.
+
+    Use as follows:
+
+      class SalesByRegion(models.Model):
+          region = models.CharField(max_length=10, primary_key=True)
+          total = models.BigIntegerField()
+
+          class Meta:
+              constraints = [MaterializedView(
+                  Sale.objects.values('region').annotate(total=Sum('amount')),
+                  auto_refresh=True,
+              )]
+    """
+
+    def __init__(self, query, params=(), *, auto_refresh=False, name=None):
+        self.query = query
+        self.params = tuple(params)
+        self.auto_refresh = auto_refresh
+        if name is None:
+            name = "%(app_label)s_%(class)s_materializedview"
+        super().__init__(name=name)
+
+    def get_sql(self):
+        """Return the SQL and the params of the query."""
+        if isinstance(self.query, str):
+            return self.query, self.params
+        compiler = self.query.query.get_compiler(using=self.query.db)
+        sql, params = compiler.as_sql()
+        return sql, tuple(params)
+
+    def constraint_sql(self, model, schema_editor):
+        # The view replaces the table, see DatabaseSchemaEditor.create_model.
+        return None
+
+    def create_sql(self, model, schema_editor):
+        return schema_editor._create_materialized_view_sql(model, self)
+
+    def remove_sql(self, model, schema_editor):
+        return schema_editor._delete_materialized_view_sql(model)
+
+    def validate(self, model, instance, exclude=None, using=None):
+        # Nothing to validate on model instances.
+        pass
+
+    def deconstruct(self):
+        path, _, kwargs = super().deconstruct()
+        path = path.replace("django_redshift_backend.meta", "django_redshift_backend")
+        sql, params = self.get_sql()
+        if params:
+            kwargs["params"] = params
+        if self.auto_refresh:
+            kwargs["auto_refresh"] = True
+        return (path, (sql,), kwargs)
+
+    def __eq__(self, other):
+        if self.__class__ == other.__class__:
+            return self.deconstruct() == other.deconstruct()
+        return NotImplemented
+
+    def __repr__(self):
+        return "<{}: auto_refresh={!r} name={!r}>".format(
+            self.__class__.__name__, self.auto_refresh, self.name
+        )
+
+
 class SortKey(str):
     """A SORTKEY in Redshift, also valid as ordering in Django.
 
+    As ordering, it's applied to every queryset of the model. Use `SortKeys` to
+    declare the SORTKEY columns without the default ordering.
+
     https://docs.djangoproject.com/en/dev/ref/models/options/#django.db.models.Options.ordering
 
     Use as follows:
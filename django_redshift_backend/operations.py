@@ -0,0 +1,157 @@
+from contextlib import contextmanager, nullcontext
+
+from django.db.migrations.operations.base import Operation
+from django.db.migrations.operations.fields import AlterField
+
+
+class WrapperOperation(Operation):
+    """Base class of operations applying inner operations in a context of
+    the schema editor.
+    """
+
+    serialization_expand_args = ["operations"]
+
+    def __init__(self, operations):
+        self.operations = operations
+
+    @property
+    def reversible(self):
+        return all(operation.reversible for operation in self.operations)
+
+    @property
+    def reduces_to_sql(self):
+        return all(operation.reduces_to_sql for operation in self.operations)
+
+    def context(self, schema_editor):
+        """Return a context manager to apply the operations in."""
+        return nullcontext()
+
+    def apply(self, schema_editor, operation, apply):
+        """Apply an inner operation by calling ``apply()``."""
+        apply()
+
+    def state_forwards(self, app_label, state):
+        for operation in self.operations:
+            operation.state_forwards(app_label, state)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        with self.context(schema_editor):
+            for operation in self.operations:
+                to_state = from_state.clone()
+                operation.state_forwards(app_label, to_state)
+                self.apply(
+                    schema_editor,
+                    operation,
+                    lambda: operation.database_forwards(
+                        app_label, schema_editor, from_state, to_state
+                    ),
+                )
+                from_state = to_state
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        to_states = {}
+        for operation in self.operations:
+            to_states[operation] = to_state
+            to_state = to_state.clone()
+            operation.state_forwards(app_label, to_state)
+        with self.context(schema_editor):
+            for operation in reversed(self.operations):
+                from_state = to_state
+                to_state = to_states[operation]
+                self.apply(
+                    schema_editor,
+                    operation,
+                    lambda: operation.database_backwards(
+                        app_label, schema_editor, from_state, to_state
+                    ),
+                )
+
+
+class AlterColumnStrategy(WrapperOperation):
+    """Apply operations with a strategy to alter columns on Redshift.
+
+    The strategies are:
+
+    * ``"recreate"``: add a temporary column, UPDATE all rows, drop the
+      original column and rename the temporary column.
+    * ``"deep_copy"``: copy the table into a new table with the new column
+      definitions by INSERT ... SELECT, and swap the tables.
+
+    Use as follows:
+
+      operations = [
+          AlterColumnStrategy("deep_copy", [
+              migrations.AlterField(...),
+          ]),
+      ]
+    """
+
+    strategies = ("recreate", "deep_copy")
+
+    def __init__(self, strategy, operations):
+        if strategy not in self.strategies:
+            raise ValueError(
+                "AlterColumnStrategy strategy must be one of %s, got %r."
+                % (", ".join(self.strategies), strategy)
+            )
+        self.strategy = strategy
+        super().__init__(operations)
+
+    def deconstruct(self):
+        return (self.__class__.__qualname__, [self.strategy, self.operations], {})
+
+    @contextmanager
+    def context(self, schema_editor):
+        strategy = getattr(schema_editor, "alter_column_strategy", None)
+        schema_editor.alter_column_strategy = self.strategy
+        try:
+            yield
+        finally:
+            schema_editor.alter_column_strategy = strategy
+
+    def describe(self):
+        return "Alter columns with %s strategy" % self.strategy
+
+    @property
+    def migration_name_fragment(self):
+        return "alter_column_strategy"
+
+
+class BatchAlterFields(WrapperOperation):
+    """Apply AlterField operations with one table rewrite for each table.
+
+    The altered columns of a table are recreated together, by one UPDATE or
+    one deep copy, before any other operation.
+
+    Use as follows:
+
+      operations = [
+          BatchAlterFields([
+              migrations.AlterField(...),
+              migrations.AlterField(...),
+          ]),
+      ]
+    """
+
+    def deconstruct(self):
+        return (self.__class__.__qualname__, [self.operations], {})
+
+    def context(self, schema_editor):
+        if not hasattr(schema_editor, "batch_alterations"):
+            return nullcontext()
+        return schema_editor.batch_alterations()
+
+    def apply(self, schema_editor, operation, apply):
+        # e.g. RunPython doesn't execute statements through the schema editor.
+        if not isinstance(operation, AlterField) and hasattr(
+            schema_editor, "flush_alterations"
+        ):
+            schema_editor.flush_alterations()
+        apply()
+
+    def describe(self):
+        return "Alter fields in batch"
+
+    @property
+    def migration_name_fragment(self):
+        return "batch_alter_fields"
@@ -0,0 +1,110 @@
+import base64
+import binascii
+import collections.abc
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.db import models
+from django.utils.functional import cached_property
+
+from .query import estimated_count, get_seek_keys, seek
+
+
+class EstimatedCountPaginator(Paginator):
+    """A Paginator of a QuerySet counting the rows by estimated_count().
+
+    The count of an unfiltered queryset is estimated by svv_table_info, and
+    with ``explain = True`` the count of a filtered queryset is estimated by
+    ``EXPLAIN``, so the last pages may be fewer or empty.
+
+    Use as follows:
+
+      class MyModelAdmin(admin.ModelAdmin):
+          paginator = EstimatedCountPaginator
+          show_full_result_count = False
+    """
+
+    explain = False
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, models.QuerySet):
+            return estimated_count(self.object_list, explain=self.explain)
+        return super().count
+
+
+class KeysetPaginator:
+    """A paginator of a QuerySet seeking the rows after the sort key of the
+    last row of the previous page, instead of an OFFSET.
+
+    The pages are ordered by the sort key of the model, from `SortKey` in the
+    ordering or else `SortKeys`, and the primary key, or by the ``keys``. A
+    page returns an opaque cursor of the next page, so that a page costs as
+    much as the first page. The keys must not be null.
+
+    Use as follows:
+
+      paginator = KeysetPaginator(MyModel.objects.filter(...), 100)
+      page = paginator.page(request.GET.get("cursor"))
+      ...
+      page.next_cursor
+    """
+
+    def __init__(self, object_list, per_page, keys=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.keys = list(keys) if keys is not None else get_seek_keys(object_list.model)
+
+    def _get_fields(self):
+        opts = self.object_list.model._meta
+        return [
+            opts.pk if key.lstrip("-") == "pk" else opts.get_field(key.lstrip("-"))
+            for key in self.keys
+        ]
+
+    def encode_cursor(self, obj):
+        """Return the cursor of the rows after the object."""
+        values = [field.value_to_string(obj) for field in self._get_fields()]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        """Return the values of the keys of the cursor."""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            fields = self._get_fields()
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(fields, values)]
+        except (binascii.Error, TypeError, ValueError, ValidationError):
+            raise InvalidPage("Invalid cursor.")
+
+    def page(self, cursor=None):
+        """Return the KeysetPage of the cursor, or the first page."""
+        values = None if cursor is None else self.decode_cursor(cursor)
+        queryset = seek(self.object_list, values, self.keys)
+        object_list = list(queryset[: self.per_page + 1])
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[: self.per_page]
+            next_cursor = self.encode_cursor(object_list[-1])
+        return KeysetPage(object_list, next_cursor, self)
+
+
+class KeysetPage(collections.abc.Sequence):
+    def __init__(self, object_list, next_cursor, paginator):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.paginator = paginator
+
+    def __repr__(self):
+        return "<Page of %s objects>" % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
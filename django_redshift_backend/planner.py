@@ -0,0 +1,150 @@
+"""
+Estimate the cost of migrations on Redshift before applying them.
+
+The operations are applied to a schema editor in collect-only mode, and the
+collected statements are classified and joined with svv_table_info.
+"""
+
+from collections import namedtuple
+import re
+
+METADATA = "metadata-only"
+IN_PLACE = "in-place alter"
+FULL_UPDATE = "full-table update"
+REBUILD = "table rebuild"
+NOT_SQL = "not SQL"
+
+# kinds in order of cost.
+KINDS = (METADATA, IN_PLACE, FULL_UPDATE, REBUILD)
+
+# MB/s to rewrite a table, to estimate the duration.
+DEFAULT_THROUGHPUT = 50
+
+# Estimate of an operation of a migration.
+OperationEstimate = namedtuple(
+    "OperationEstimate",
+    ["migration", "operation", "kind", "tables", "rows", "size", "seconds", "sql"],
+)
+
+_statement_patterns = [
+    (REBUILD, re.compile(r'^INSERT INTO .* SELECT .* FROM "?([\w$]+)"?$', re.S)),
+    # the view is materialized from the table of the first FROM of its query.
+    (
+        REBUILD,
+        re.compile(r'^CREATE MATERIALIZED VIEW .*? FROM "?([\w$]+)"?', re.S),
+    ),
+    (FULL_UPDATE, re.compile(r'^UPDATE "?([\w$]+)"? SET ', re.S)),
+    # Redshift rewrites the column to change the size of a VARCHAR.
+    (
+        FULL_UPDATE,
+        re.compile(r'^ALTER TABLE "?([\w$]+)"? ALTER COLUMN "?[\w$]+"? TYPE '),
+    ),
+    (
+        IN_PLACE,
+        re.compile(
+            r'^ALTER TABLE "?([\w$]+)"? ALTER '
+            r"(DISTSTYLE|DISTKEY|SORTKEY|COMPOUND SORTKEY|INTERLEAVED SORTKEY)"
+        ),
+    ),
+]
+
+
+# separator of the statements executed at once, e.g. by the deep copy.
+_statement_separator_re = re.compile(
+    r";\s*(?=(?:ALTER|CREATE|DELETE|DROP|GRANT|INSERT|LOCK|UPDATE)\b)"
+)
+
+
+def classify_statement(sql):
+    """
+    Return (kind, table) of the statement, or of the costliest statement of
+    statements joined by ";". The table is None for metadata-only statements.
+    """
+    result = (METADATA, None)
+    for statement in _statement_separator_re.split(sql.strip().rstrip(";")):
+        for kind, pattern in _statement_patterns:
+            m = pattern.match(statement.strip())
+            if m:
+                if KINDS.index(kind) > KINDS.index(result[0]):
+                    result = (kind, m.group(1))
+                break
+    return result
+
+
+def estimate_plan(connection, plan, state, throughput=DEFAULT_THROUGHPUT):
+    """
+    Return a list of OperationEstimate for the forwards ``plan`` of
+    [(migration, backwards), ...] applied from the project ``state``.
+
+    The duration is the size of the rewritten tables divided by the
+    ``throughput`` in MB/s, without the background sort of Redshift.
+    """
+    estimates = []
+    table_infos = {}
+
+    def get_table_info(table):
+        if table not in table_infos:
+            with connection.cursor() as cursor:
+                table_infos[table] = connection.introspection.get_table_info(
+                    cursor, table
+                )
+        return table_infos[table]
+
+    for migration, backwards in plan:
+        if backwards:
+            raise ValueError(
+                "Estimate of backwards migration %s is not supported." % migration
+            )
+        with connection.schema_editor(
+            collect_sql=True, atomic=migration.atomic
+        ) as schema_editor:
+            for operation in migration.operations:
+                if not operation.reduces_to_sql:
+                    operation.state_forwards(migration.app_label, state)
+                    estimates.append(
+                        OperationEstimate(
+                            str(migration),
+                            operation.describe(),
+                            NOT_SQL,
+                            [],
+                            None,
+                            None,
+                            None,
+                            [],
+                        )
+                    )
+                    continue
+                old_state = state.clone()
+                operation.state_forwards(migration.app_label, state)
+                start = len(schema_editor.collected_sql)
+                operation.database_forwards(
+                    migration.app_label, schema_editor, old_state, state
+                )
+                sql = schema_editor.collected_sql[start:]
+                kind = METADATA
+                tables = []
+                for statement in sql:
+                    statement_kind, table = classify_statement(statement)
+                    if KINDS.index(statement_kind) > KINDS.index(kind):
+                        kind = statement_kind
+                    if table and table not in tables:
+                        tables.append(table)
+                rows = size = 0
+                for table in tables:
+                    info = get_table_info(table)
+                    if info is not None:
+                        rows += info.tbl_rows or 0
+                        size += info.size or 0
+                estimates.append(
+                    OperationEstimate(
+                        str(migration),
+                        operation.describe(),
+                        kind,
+                        tables,
+                        rows,
+                        size,
+                        size / throughput,
+                        sql,
+                    )
+                )
+    return estimates
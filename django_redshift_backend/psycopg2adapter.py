@@ -1,10 +1,53 @@
-from codecs import encode
+from binascii import hexlify
 
-from psycopg2.extensions import Binary
+from psycopg2.extensions import Binary, register_adapter
+
+# bytes of the value hex-encoded at a time, to bound the intermediate copies.
+HEX_CHUNK_SIZE = 64 * 1024
+
+# Redshift reports the server version 8.0.2, which Django doesn't support on
+# PostgreSQL.
+REDSHIFT_MAX_SERVER_VERSION = 90000
+
+_VARBYTE_PREFIX = b"to_varbyte('"
+_VARBYTE_SUFFIX = b"', 'hex')::varbyte"
 
 
 class RedshiftBinary(Binary):
+    # VARBYTE unless prepared for a connection to PostgreSQL.
+    _bytea = False
+
+    def prepare(self, conn):
+        self._bytea = conn.server_version >= REDSHIFT_MAX_SERVER_VERSION
+        if self._bytea:
+            super().prepare(conn)
+
     def getquoted(self) -> bytes:
-        hex_encoded = encode(self.adapted, "hex_codec")
-        statement = b"to_varbyte('%s', 'hex')::varbyte" % hex_encoded
-        return statement
+        if self._bytea:
+            return super().getquoted()
+        # A view of bytes, bytearray or memoryview, without copying the value.
+        data = memoryview(self.adapted).cast("B")
+        size = len(data)
+        start = len(_VARBYTE_PREFIX)
+        buffer = bytearray(start + size * 2 + len(_VARBYTE_SUFFIX))
+        buffer[:start] = _VARBYTE_PREFIX
+        for offset in range(0, size, HEX_CHUNK_SIZE):
+            chunk = data[offset : offset + HEX_CHUNK_SIZE]
+            end = start + len(chunk) * 2
+            buffer[start:end] = hexlify(chunk)
+            start = end
+        buffer[start:] = _VARBYTE_SUFFIX
+        # psycopg2 requires bytes, a copy of the buffer.
+        return bytes(buffer)
+
+
+def adapt_binary(value):
+    """
+    Adapt `Binary` values, as values of BinaryField, to `RedshiftBinary`.
+    """
+    if isinstance(value, RedshiftBinary):
+        return value
+    return RedshiftBinary(value.adapted)
+
+
+register_adapter(Binary, adapt_binary)
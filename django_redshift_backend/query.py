@@ -0,0 +1,212 @@
+"""
+QuerySet with the features of Redshift.
+"""
+
+from contextlib import contextmanager
+import re
+import uuid
+
+from django.db import connections, models
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.sql.datastructures import BaseTable
+
+from .meta import SortKey, SortKeys
+
+
+def estimated_count(model_or_queryset, explain=False):
+    """
+    Return the number of rows of a model or a queryset, estimated by
+    svv_table_info for an unfiltered queryset, or by the plan of ``EXPLAIN``
+    for another queryset with ``explain``, or else counted by ``count()``.
+    """
+    if isinstance(model_or_queryset, models.QuerySet):
+        queryset = model_or_queryset
+    else:
+        queryset = model_or_queryset._default_manager.all()
+    query = queryset.query
+    connection = connections[queryset.db]
+    if connection.vendor == "redshift" and not (
+        query.where
+        or query.is_sliced
+        or query.distinct
+        or query.combinator
+        or query.group_by is not None
+        or query.extra
+    ):
+        return connection.ops.estimated_row_count(queryset.model._meta.db_table)
+    if explain:
+        # rows of the top node of the plan.
+        match = re.search(r"\brows=(\d+)", queryset.explain())
+        if match:
+            return int(match.group(1))
+    return queryset.count()
+
+
+def get_seek_keys(model):
+    """
+    Return the field names of the sort key of the model, from `SortKey` in the
+    ordering or else `SortKeys`, prefixed by "-" if descending, followed by
+    "pk" unless the primary key is one of them, to order the rows uniquely.
+    """
+    keys = [str(key) for key in model._meta.ordering if isinstance(key, SortKey)]
+    if not keys:
+        for index in model._meta.indexes:
+            if isinstance(index, SortKeys):
+                keys = list(index.fields)
+    if not any(
+        key.lstrip("-") == "pk" or model._meta.get_field(key.lstrip("-")).primary_key
+        for key in keys
+    ):
+        keys.append("pk")
+    return keys
+
+
+def seek(queryset, values=None, keys=None):
+    """
+    Return the queryset ordered by the ``keys``, of the sort key of the model
+    by default, of the rows after the ``values`` of the keys if any.
+
+    The rows after (v1, v2) of the keys (k1, k2) are filtered by
+    ``k1 >= v1 AND (k1 > v1 OR (k1 = v1 AND k2 > v2))``, of which the first
+    condition lets the zone maps of the sort key skip the blocks before.
+    """
+    if keys is None:
+        keys = get_seek_keys(queryset.model)
+    queryset = queryset.order_by(*keys)
+    if values is None:
+        return queryset
+    if len(values) != len(keys):
+        raise ValueError(
+            "seek() requires a value for each of the keys %s, got %r."
+            % (", ".join(keys), values)
+        )
+    after = None
+    for key, value in reversed(list(zip(keys, values))):
+        name = key.lstrip("-")
+        lookup = "lt" if key.startswith("-") else "gt"
+        condition = Q(**{"%s__%s" % (name, lookup): value})
+        if after is not None:
+            condition |= Q(**{name: value}) & after
+        after = condition
+    if len(keys) > 1:
+        name = keys[0].lstrip("-")
+        lookup = "lte" if keys[0].startswith("-") else "gte"
+        after = Q(**{"%s__%s" % (name, lookup): values[0]}) & after
+    return queryset.filter(after)
+
+
+class RedshiftQuerySet(models.QuerySet):
+    """A QuerySet with the features of Redshift.
+
+    Use as follows:
+
+      class MyModel(models.Model):
+      ...
+
+      objects = RedshiftQuerySet.as_manager()
+    """
+
+    def approximate(self, enabled=True):
+        """
+        Return a queryset compiling ``Count(distinct=True)`` to ``APPROXIMATE
+        COUNT(DISTINCT ...)`` if ``enabled``, or to an exact count if not,
+        regardless of the ``REDSHIFT_APPROXIMATE_COUNT_DISTINCT`` setting.
+        """
+        clone = self._chain()
+        clone.query.approximate = enabled
+        return clone
+
+    def estimated_count(self, explain=False):
+        """
+        Return the number of rows estimated by ``estimated_count()``.
+        """
+        return estimated_count(self, explain=explain)
+
+    def seek(self, values=None, keys=None):
+        """
+        Return the queryset ordered by the sort key, of the rows after the
+        ``values`` of the keys, see ``seek()``.
+        """
+        return seek(self, values, keys)
+
+    def _get_column(self, query, name):
+        if name in query.annotation_select:
+            return name
+        return self.model._meta.get_field(name).column
+
+    @contextmanager
+    def materialize(self, distkey=None, sortkey=()):
+        """
+        Store the result of the queryset into a temporary table of the session
+        with ``CREATE TEMP TABLE ... AS``, distributed by the ``distkey`` field
+        and sorted by the ``sortkey`` fields, and yield a queryset of the model
+        reading the table. The table is dropped when the context exits, unless
+        the transaction failed, see ``DatabaseOperations.drop_temp_tables()``.
+
+        Annotations are stored as columns, and are annotations of the yielded
+        queryset reading them from the table.
+        """
+        self._not_support_combined_queries("materialize")
+        if self._fields is not None:
+            raise TypeError(
+                "Cannot call materialize() after .values() or .values_list()."
+            )
+        if isinstance(sortkey, str):
+            sortkey = [sortkey]
+        query = self.query.chain()
+        # The table has a column for each concrete field and annotation.
+        query.select_related = False
+        query.clear_deferred_loading()
+        if not query.is_sliced:
+            query.clear_ordering(force=True)
+        connection = connections[self.db]
+        sql, params = query.get_compiler(connection=connection).as_sql()
+        table = "django_materialized_%s" % uuid.uuid4().hex[:16]
+        connection.ops.create_temp_table_as(
+            table,
+            sql,
+            params,
+            distkey=None if distkey is None else self._get_column(query, distkey),
+            sortkey=[self._get_column(query, name) for name in sortkey],
+        )
+        quote_name = connection.ops.quote_name
+        try:
+            queryset = self.__class__(self.model, using=self.db)
+            queryset.query.join(BaseTable(table, None))
+            yield queryset.annotate(
+                **{
+                    name: RawSQL(
+                        "%s.%s" % (quote_name(table), quote_name(name)),
+                        (),
+                        output_field=annotation.output_field,
+                    )
+                    for name, annotation in query.annotation_select.items()
+                }
+            )
+        finally:
+            connection.ops.drop_temp_tables([quote_name(table)])
+
+    def refresh_materialized_view(self):
+        """
+        Refresh the materialized view of the model with
+        ``REFRESH MATERIALIZED VIEW``.
+        """
+        connection = connections[self.db]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "REFRESH MATERIALIZED VIEW %s"
+                % connection.ops.quote_name(self.model._meta.db_table)
+            )
+
+    def get_materialized_view_info(self):
+        """
+        Return the MaterializedViewInfo of the materialized view of the model
+        from stv_mv_info, of which ``is_stale`` tells whether the view needs a
+        refresh.
+        """
+        connection = connections[self.db]
+        with connection.cursor() as cursor:
+            return connection.introspection.get_materialized_view_info(
+                cursor, self.model._meta.db_table
+            )
@@ -0,0 +1,181 @@
+"""
+Propose tighter VARCHAR lengths from the data stored on Redshift.
+
+Redshift allocates the declared width of a VARCHAR in memory for sorts,
+hashes and intermediate results, so oversized columns spill to disk. The
+longest value of each column is measured in characters with MAX(LEN(...)) and
+in bytes with MAX(OCTET_LENGTH(...)), and a ``max_length`` is proposed with a
+headroom over the characters, large enough that the column, of
+``REDSHIFT_VARCHAR_LENGTH_MULTIPLIER`` bytes for each character, holds the
+bytes.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import math
+
+from django.conf import settings
+from django.db import connections, models
+from django.db.migrations import AlterField, Migration
+
+# headroom over the longest value, as a ratio.
+DEFAULT_HEADROOM = 0.25
+
+# bytes of varchar(max), of TextField.
+MAX_VARCHAR_BYTES = 65535
+
+# Proposed size of a column. ``max_length`` is None if the column is not
+# oversized, ``in_place`` is False if the change rewrites the column.
+SizeProposal = namedtuple(
+    "SizeProposal",
+    [
+        "model",
+        "field",
+        "declared_bytes",
+        "max_chars",
+        "max_bytes",
+        "max_length",
+        "in_place",
+    ],
+)
+
+
+def get_sized_fields(model):
+    """
+    Return the CharField and TextField of the model stored as VARCHAR, except
+    primary keys and fields referenced by foreign keys, of which the size must
+    match the other table.
+    """
+    referenced = {
+        rel.field_name for rel in model._meta.related_objects if not rel.many_to_many
+    }
+    return [
+        field
+        for field in model._meta.local_concrete_fields
+        if isinstance(field, (models.CharField, models.TextField))
+        and not field.primary_key
+        and field.name not in referenced
+    ]
+
+
+def measure_max_lengths(connection, model, fields):
+    """
+    Return {field.name: (characters, bytes) of the longest values or None} of
+    the model's table, with one scan of the columns.
+    """
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT %s FROM %s"
+            % (
+                ", ".join(
+                    "MAX(LEN(%s)), MAX(OCTET_LENGTH(%s))"
+                    % (quote_name(field.column), quote_name(field.column))
+                    for field in fields
+                ),
+                quote_name(model._meta.db_table),
+            )
+        )
+        row = cursor.fetchone()
+    return {field.name: (row[2 * i], row[2 * i + 1]) for i, field in enumerate(fields)}
+
+
+def propose_max_length(max_chars, max_bytes, multiplier, headroom=DEFAULT_HEADROOM):
+    """
+    Return the max_length of the field for the longest value of ``max_chars``
+    characters with the ``headroom``, at least so that the column, of
+    ``multiplier`` bytes for each character of max_length, holds the longest
+    value of ``max_bytes`` bytes with the headroom.
+    """
+    return max(
+        1,
+        math.ceil((max_chars or 0) * (1 + headroom)),
+        math.ceil((max_bytes or 0) * (1 + headroom) / multiplier),
+    )
+
+
+def propose_sizes(connection, models_, headroom=DEFAULT_HEADROOM, jobs=1):
+    """
+    Return a list of SizeProposal for the VARCHAR columns of the models.
+
+    The tables are measured by ``jobs`` threads, each with a connection.
+    """
+    multiplier = int(getattr(settings, "REDSHIFT_VARCHAR_LENGTH_MULTIPLIER", 1))
+    tables = [(model, get_sized_fields(model)) for model in models_]
+    tables = [(model, fields) for model, fields in tables if fields]
+
+    def measure(table):
+        model, fields = table
+        # connections are thread-local.
+        thread_connection = connections[connection.alias]
+        try:
+            return measure_max_lengths(thread_connection, model, fields)
+        finally:
+            thread_connection.close()
+
+    if jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(measure, tables))
+    else:
+        results = [
+            measure_max_lengths(connection, model, fields) for model, fields in tables
+        ]
+
+    schema_editor = connection.schema_editor(collect_sql=True)
+    proposals = []
+    for (model, fields), max_lengths in zip(tables, results):
+        for field in fields:
+            max_chars, max_bytes = max_lengths[field.name]
+            if isinstance(field, models.TextField):
+                declared_bytes = MAX_VARCHAR_BYTES
+            else:
+                declared_bytes = field.max_length * multiplier
+            max_length = propose_max_length(max_chars, max_bytes, multiplier, headroom)
+            if max_length * multiplier >= declared_bytes:
+                max_length = None
+            proposals.append(
+                SizeProposal(
+                    model,
+                    field,
+                    declared_bytes,
+                    max_chars,
+                    max_bytes,
+                    max_length,
+                    # The size of a VARCHAR is altered in place, except with a
+                    # default or from a TextField, see _alter_column_type_sql.
+                    isinstance(field, models.CharField)
+                    and schema_editor.effective_default(field) is None,
+                )
+            )
+    return proposals
+
+
+def resize_field(field, max_length):
+    """
+    Return a copy of the field with the max_length.
+    """
+    name, path, args, kwargs = field.deconstruct()
+    kwargs["max_length"] = max_length
+    if isinstance(field, models.TextField):
+        return models.CharField(*args, **kwargs)
+    return field.__class__(*args, **kwargs)
+
+
+def make_migration(app_label, name, dependencies, proposals):
+    """
+    Return a migration of the app, altering the fields of the proposals to
+    their proposed max_length.
+    """
+    migration = Migration(name, app_label)
+    migration.dependencies = list(dependencies)
+    migration.operations = [
+        AlterField(
+            model_name=proposal.model._meta.model_name,
+            name=proposal.field.name,
+            field=resize_field(proposal.field, proposal.max_length),
+        )
+        for proposal in proposals
+        if proposal.model._meta.app_label == app_label
+        and proposal.max_length is not None
+    ]
+    return migration
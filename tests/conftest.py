@@ -56,6 +56,10 @@ def postgres_fixture():
             mock.patch(
                 'django_redshift_backend.base.DatabaseSchemaEditor._get_create_options',
                 lambda self, model: '',
+            ), \
+            mock.patch(
+                'django_redshift_backend.base.DatabaseIntrospection.get_column_encodings',
+                lambda self, cursor, table_name: {},
             ):
             yield
 
@@ -104,6 +104,16 @@ class IntrospectionTest(unittest.TestCase):
                 call_args[0],
             )
 
+    def test_get_constraints_without_constraints(self):
+        conn = connections['default']
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            # a table without constraints, e.g. cloned by CREATE TABLE ... (LIKE ...)
+            mock_cursor.fetchall.side_effect = [[], []]
+            table_constraints = conn.introspection.get_constraints(
+                mock_cursor, 'testapp_testmodel')
+            self.assertEqual(table_constraints, {})
+
     def test_get_get_constraints_does_not_use_unsupported_functions(self):
         conn = connections['default']
         with mock.patch.object(conn, 'cursor') as mock_cursor_method:
@@ -186,6 +196,34 @@ class IntrospectionTest(unittest.TestCase):
             self.assertNotIn('unnest', executed_sql)
             self.assertEqual(self.expected_indexes_query, executed_sql)
 
+    def test_get_table_keys(self):
+        conn = connections['default']
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            mock_cursor.fetchall.return_value = [
+                # attname, attisdistkey, attsortkeyord
+                ('id', False, 2),
+                ('fk_id', True, 0),
+                ('created_at', False, 1),
+            ]
+            keys = conn.introspection.get_table_keys(mock_cursor, 'testapp_testmodelwithsortkeys')
+
+        self.assertEqual(keys.distkey, 'fk_id')
+        self.assertEqual(keys.sortkeys, ['created_at', 'id'])
+        self.assertFalse(keys.interleaved)
+
+    def test_get_field_type_of_hll_sketch(self):
+        from django.db.backends.base.introspection import FieldInfo
+        from testapp.models import TestModelWithHLLSketch
+        conn = connections['default']
+        field = TestModelWithHLLSketch._meta.get_field('users')
+        self.assertEqual(field.db_type(conn), 'hllsketch')
+        description = FieldInfo('users', 2935, None, None, None, None, False, None, None)
+        self.assertEqual(
+            conn.introspection.get_field_type(2935, description),
+            'django_redshift_backend.HLLSketchField',
+        )
+
 
 @skipif_no_database
 class InspectDbTests(OperationTestBase):
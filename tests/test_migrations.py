@@ -1,7 +1,7 @@
 import contextlib
 from unittest import mock
 
-from django.db import migrations, models
+from django.db import connection, migrations, models
 from django.db.migrations.state import ProjectState
 import pytest
 
@@ -20,16 +20,25 @@ class MigrationTests(OperationTestBase):
 
     @contextlib.contextmanager
     def collect_sql(self):
+        from django_redshift_backend.base import BasePGDatabaseSchemaEditor, DeepCopy
         collected_sql = []
+        base_execute = BasePGDatabaseSchemaEditor.execute
 
-        def execute(self, sql, params=()):
+        def execute_statement(self, sql, params=()):
             sql = str(sql)
             ending = "" if sql.endswith(";") else ";"
             if params is not None:
                 collected_sql.append((sql % tuple(map(self.quote_value, params))) + ending)
             else:
                 collected_sql.append(sql + ending)
-            return super(type(self), self).execute(sql, params)
+            return base_execute(self, sql, params)
+
+        def execute(self, sql, params=()):
+            if isinstance(sql, DeepCopy):
+                # The statements of the deep copy are executed by the base class.
+                with mock.patch.object(BasePGDatabaseSchemaEditor, 'execute', execute_statement):
+                    return self._execute_deep_copy(sql)
+            return execute_statement(self, sql, params)
 
         with mock.patch('django_redshift_backend.base.DatabaseSchemaEditor.execute', execute):
             yield collected_sql
@@ -363,6 +372,122 @@ class MigrationTests(OperationTestBase):
             '''ALTER TABLE test_pony RENAME COLUMN "weight_tmp" TO "weight";''',
         ], sqls)
 
+    @postgres_fixture()
+    def test_alter_type_with_deep_copy(self):
+        from django_redshift_backend.operations import AlterColumnStrategy
+
+        new_state = self.set_up_test_model('test')
+        operations = [
+            AlterColumnStrategy('deep_copy', [
+                migrations.AlterField(
+                    model_name='Pony',
+                    name='weight',
+                    field=models.CharField(max_length=10, null=False, default=''),
+                ),
+            ]),
+        ]
+
+        with self.collect_sql() as sqls:
+            self.apply_operations('test', new_state, operations)
+
+        if TEST_WITH_POSTGRES:
+            id_type = 'serial'
+        elif TEST_WITH_REDSHIFT:
+            id_type = 'integer GENERATED BY DEFAULT AS IDENTITY(1, 1)'
+        owner = connection.settings_dict['USER']
+
+        self.assertEqual([
+            '''LOCK TABLE "test_pony";''',
+            f'''CREATE TABLE "test_pony_deepcopy" ("id" {id_type} NOT NULL PRIMARY KEY, "pink" integer NOT NULL, "weight" varchar(10) DEFAULT '' NOT NULL) ;''',
+            '''INSERT INTO "test_pony_deepcopy" ("id", "pink", "weight") SELECT "id", "pink", "weight" FROM "test_pony";''',
+            '''ALTER TABLE "test_pony" RENAME TO "test_pony_deepcopy_old";''',
+            '''ALTER TABLE "test_pony_deepcopy" RENAME TO "test_pony";''',
+            '''DROP TABLE "test_pony_deepcopy_old";''',
+            f'''ALTER TABLE "test_pony" OWNER TO "{owner}";''',
+        ], sqls)
+
+    @postgres_fixture()
+    def test_alter_types_in_batch(self):
+        from django_redshift_backend.operations import BatchAlterFields
+
+        new_state = self.set_up_test_model('test')
+        operations = [
+            BatchAlterFields([
+                migrations.AlterField(
+                    model_name='Pony',
+                    name='pink',
+                    field=models.BigIntegerField(default=3),
+                ),
+                migrations.AlterField(
+                    model_name='Pony',
+                    name='weight',
+                    field=models.CharField(max_length=10, null=False, default=''),
+                ),
+            ]),
+        ]
+
+        with self.collect_sql() as sqls:
+            self.apply_operations('test', new_state, operations)
+
+        self.assertEqual([
+            '''ALTER TABLE "test_pony" ADD COLUMN "pink_tmp" bigint DEFAULT 3 NOT NULL;''',
+            '''ALTER TABLE "test_pony" ADD COLUMN "weight_tmp" varchar(10) DEFAULT '' NOT NULL;''',
+            '''UPDATE test_pony SET "pink_tmp" = COALESCE("pink"::bigint, "pink_tmp"), "weight_tmp" = COALESCE("weight"::varchar(10), "weight_tmp");''',
+            '''ALTER TABLE test_pony DROP COLUMN "pink" CASCADE;''',
+            '''ALTER TABLE test_pony DROP COLUMN "weight" CASCADE;''',
+            '''ALTER TABLE test_pony RENAME COLUMN "pink_tmp" TO "pink";''',
+            '''ALTER TABLE test_pony RENAME COLUMN "weight_tmp" TO "weight";''',
+        ], sqls)
+
+    @postgres_fixture()
+    def test_alter_nullable_with_default_in_batch(self):
+        from django_redshift_backend.operations import BatchAlterFields
+
+        new_state = self.set_up_test_model('test')
+        new_state = self.apply_operations('test', new_state, [
+            migrations.AddField(
+                model_name='Pony',
+                name='rank',
+                field=models.IntegerField(null=True),
+            ),
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO "test_pony" ("pink", "weight", "rank") '
+                'VALUES (1, 1.0, NULL), (2, 2.0, 5)'
+            )
+        operations = [
+            BatchAlterFields([
+                migrations.AlterField(
+                    model_name='Pony',
+                    name='pink',
+                    field=models.BigIntegerField(default=3),
+                ),
+                migrations.AlterField(
+                    model_name='Pony',
+                    name='rank',
+                    field=models.BigIntegerField(null=True, default=7),
+                ),
+            ]),
+        ]
+
+        with self.collect_sql() as sqls:
+            self.apply_operations('test', new_state, operations)
+
+        self.assertEqual([
+            '''ALTER TABLE "test_pony" ADD COLUMN "pink_tmp" bigint DEFAULT 3 NOT NULL;''',
+            '''ALTER TABLE "test_pony" ADD COLUMN "rank_tmp" bigint DEFAULT 7 NULL;''',
+            '''UPDATE test_pony SET "pink_tmp" = COALESCE("pink"::bigint, "pink_tmp"), "rank_tmp" = COALESCE("rank"::bigint, "rank_tmp");''',
+            '''ALTER TABLE test_pony DROP COLUMN "pink" CASCADE;''',
+            '''ALTER TABLE test_pony DROP COLUMN "rank" CASCADE;''',
+            '''ALTER TABLE test_pony RENAME COLUMN "pink_tmp" TO "pink";''',
+            '''ALTER TABLE test_pony RENAME COLUMN "rank_tmp" TO "rank";''',
+        ], sqls)
+        # NULL values take the default, as when the column is altered alone.
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT "pink", "rank" FROM "test_pony" ORDER BY "pink"')
+            self.assertEqual(cursor.fetchall(), [(1, 7), (2, 5)])
+
     @postgres_fixture()
     def test_alter_notnull_with_default(self):
         new_state = self.set_up_test_model('test')
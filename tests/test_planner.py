@@ -0,0 +1,85 @@
+import unittest
+from unittest import mock
+
+from django.apps import apps
+from django.db import connections, migrations, models
+from django.db.migrations.state import ProjectState
+
+from django_redshift_backend.base import TableStorageInfo
+from django_redshift_backend.planner import (
+    FULL_UPDATE,
+    IN_PLACE,
+    METADATA,
+    NOT_SQL,
+    REBUILD,
+    classify_statement,
+    estimate_plan,
+)
+
+
+class ClassifyStatementTest(unittest.TestCase):
+
+    def test_classify_statement(self):
+        self.assertEqual(
+            classify_statement('ALTER TABLE "t" ADD COLUMN "c_tmp" bigint DEFAULT 0 NOT NULL;'),
+            (METADATA, None),
+        )
+        self.assertEqual(
+            classify_statement('UPDATE t SET "c_tmp" = "c" WHERE "c" IS NOT NULL;'),
+            (FULL_UPDATE, 't'),
+        )
+        self.assertEqual(
+            classify_statement('ALTER TABLE "t" ALTER DISTSTYLE KEY DISTKEY "c";'),
+            (IN_PLACE, 't'),
+        )
+        self.assertEqual(
+            classify_statement('ALTER TABLE "t" ALTER COMPOUND SORTKEY ("c");'),
+            (IN_PLACE, 't'),
+        )
+        self.assertEqual(
+            classify_statement('ALTER TABLE "t" ALTER COLUMN "c" TYPE varchar(20);'),
+            (FULL_UPDATE, 't'),
+        )
+        self.assertEqual(
+            classify_statement(
+                'CREATE MATERIALIZED VIEW "v" DISTSTYLE EVEN AS '
+                'SELECT "t"."c" FROM "t" INNER JOIN "u" ON ("t"."u_id" = "u"."id");'
+            ),
+            (REBUILD, 't'),
+        )
+        self.assertEqual(
+            classify_statement('INSERT INTO "t_deepcopy" ("c") SELECT "c" FROM "t";'),
+            (REBUILD, 't'),
+        )
+        self.assertEqual(
+            classify_statement(
+                'LOCK TABLE "t"; INSERT INTO "t_deepcopy" ("c") SELECT "c" FROM "t"; '
+                'ALTER TABLE "t" RENAME TO "t_deepcopy_old"; '
+                'ALTER TABLE "t_deepcopy" RENAME TO "t";'
+            ),
+            (REBUILD, 't'),
+        )
+
+
+class EstimatePlanTest(unittest.TestCase):
+
+    def test_estimate_plan(self):
+        conn = connections['default']
+        state = ProjectState.from_apps(apps)
+        migration = migrations.Migration('0002_alter', 'testapp')
+        migration.operations = [
+            migrations.AlterField('testmodelwithmetakeys', 'age', models.BigIntegerField(default=0)),
+            migrations.RunPython(migrations.RunPython.noop),
+        ]
+        info = TableStorageInfo('KEY(fk_id)', 'created_at', 0.0, 1000000, 1000000, 500)
+        with mock.patch.object(conn, 'cursor'), \
+                mock.patch.object(conn.introspection, 'get_table_info', return_value=info):
+            estimates = estimate_plan(conn, [(migration, False)], state, throughput=100)
+
+        alter, run_python = estimates
+        self.assertEqual(alter.migration, 'testapp.0002_alter')
+        self.assertEqual(alter.kind, FULL_UPDATE)
+        self.assertEqual(alter.tables, ['testapp_testmodelwithmetakeys'])
+        self.assertEqual((alter.rows, alter.size, alter.seconds), (1000000, 500, 5.0))
+        self.assertEqual(len(alter.sql), 4)
+        self.assertEqual(run_python.kind, NOT_SQL)
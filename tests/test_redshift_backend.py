@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 
+import datetime
 import unittest
+from unittest import mock
 
 from django.db import connections
 from django.db.utils import NotSupportedError
 from django.core.management.color import no_style
+from django.test import override_settings
 
 from conftest import skipif_no_database
 
@@ -20,6 +23,222 @@ class DatabaseWrapperTest(unittest.TestCase):
         self.assertIsNotNone(db)
 
 
+class FlushTest(unittest.TestCase):
+
+    def test_track_written_tables(self):
+        conn = connections['default']
+        with mock.patch.dict('django_redshift_backend.base._written_tables', {'default': {}}):
+            conn.track_written_tables('SELECT * FROM "testapp_a"', 10)
+            conn.track_written_tables('INSERT INTO "testapp_b" ("x") VALUES (1)', 1)
+            conn.track_written_tables(
+                'INSERT INTO "testapp_b" ("x") VALUES (1);\n'
+                'UPDATE "public"."testapp_c" SET "x" = 2;\n'
+                'delete from testapp_d where x = 3',
+                -1,
+            )
+            conn.track_written_tables('UPDATE "testapp_e" SET "x" = 2', 5)
+            self.assertEqual(conn.written_tables, {
+                'testapp_b': None,
+                'testapp_c': None,
+                'testapp_d': None,
+                'testapp_e': 5,
+            })
+
+    def test_written_tables_not_tracked(self):
+        conn = connections['default']
+        with mock.patch.dict('django_redshift_backend.base._written_tables', clear=True):
+            conn.track_written_tables('INSERT INTO "testapp_b" ("x") VALUES (1)', 1)
+            self.assertIsNone(conn.written_tables)
+
+    def test_track_written_tables_in_test_database(self):
+        conn = connections['default']
+        with mock.patch.dict('django_redshift_backend.base._written_tables', clear=True):
+            conn.creation._track_written_tables()
+            self.assertIsNone(conn.written_tables)
+            with mock.patch.dict(conn.settings_dict['TEST'], {'FLUSH_WRITTEN_TABLES': True}):
+                conn.creation._track_written_tables()
+            self.assertEqual(conn.written_tables, {})
+
+    @override_settings(REDSHIFT_FLUSH_DELETE_MAX_ROWS=1000)
+    def test_sql_flush(self):
+        conn = connections['default']
+        written_tables = {'testapp_small': 10, 'testapp_large': 5000, 'testapp_unknown': None}
+        with mock.patch.dict('django_redshift_backend.base._written_tables',
+                             {'default': written_tables}), \
+                mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            sql_list = conn.ops.sql_flush(
+                no_style(),
+                ['testapp_large', 'testapp_small', 'testapp_unknown', 'testapp_unwritten'],
+            )
+        self.assertEqual(sql_list, [
+            'DELETE FROM "testapp_small";',
+            'TRUNCATE "testapp_large";',
+            'TRUNCATE "testapp_unknown";',
+        ])
+        mock_cursor_method.assert_not_called()
+
+    def test_sql_flush_without_written_tables(self):
+        conn = connections['default']
+        with mock.patch.dict('django_redshift_backend.base._written_tables', {'default': {}}):
+            self.assertEqual(conn.ops.sql_flush(no_style(), ['testapp_a']), [])
+
+    def test_sql_flush_not_tracked(self):
+        conn = connections['default']
+        with mock.patch.dict('django_redshift_backend.base._written_tables', clear=True), \
+                mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            sql_list = conn.ops.sql_flush(no_style(), ['testapp_a', 'testapp_b'])
+        self.assertEqual(sql_list, ['TRUNCATE "testapp_a";', 'TRUNCATE "testapp_b";'])
+        mock_cursor_method.assert_not_called()
+
+
+class CreationTest(unittest.TestCase):
+
+    def test_snapshot_schema(self):
+        conn = connections['default']
+        schema = conn.creation._get_snapshot_schema()
+        self.assertRegex(schema, r'^django_snapshot_[0-9a-f]{12}$')
+        self.assertEqual(schema, conn.creation._get_snapshot_schema())
+        with override_settings(REDSHIFT_VARCHAR_LENGTH_MULTIPLIER=3):
+            self.assertNotEqual(schema, conn.creation._get_snapshot_schema())
+
+    def test_clone_settings(self):
+        conn = connections['default']
+        with mock.patch.dict(conn.settings_dict['TEST'], {'SNAPSHOT': True}):
+            clone_settings = conn.creation.get_test_db_clone_settings('2')
+        self.assertEqual(clone_settings['NAME'], conn.settings_dict['NAME'])
+        self.assertEqual(clone_settings['SCHEMA'], 'django_test_2')
+
+    def test_create_test_db_snapshot(self):
+        from copy import deepcopy
+        from django.apps import apps
+        from django.conf import settings
+        conn = connections['default']
+        creation = conn.creation
+        migration_modules = []
+        old_databases = deepcopy(settings.DATABASES)
+        test_settings = {'SNAPSHOT': True, 'MIGRATE': False, 'DROP_OLD_SNAPSHOTS': True}
+        with mock.patch.dict(conn.settings_dict), \
+                mock.patch.dict(conn.settings_dict['TEST'], test_settings), \
+                mock.patch.object(conn, 'cursor') as mock_cursor_method, \
+                mock.patch.object(conn, 'ensure_connection'), \
+                mock.patch.object(creation, '_create_test_db'), \
+                mock.patch.object(creation, '_clone_schema'), \
+                mock.patch.object(creation, '_get_snapshot_schema', return_value='django_snapshot_1'), \
+                mock.patch('django.core.management.call_command') as mock_call_command:
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            mock_cursor.fetchone.return_value = None
+            mock_cursor.fetchall.return_value = [
+                ('django_snapshot_0',), ('django_snapshot_1',), ('django_snapshot_2_build',),
+            ]
+            mock_call_command.side_effect = (
+                lambda name, **options: migration_modules.append(settings.MIGRATION_MODULES)
+            )
+            creation.create_test_db(verbosity=0, serialize=False)
+            self.assertEqual(conn.settings_dict['SCHEMA'], 'django_test')
+        executed_sql = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        self.assertEqual(executed_sql, [
+            'SELECT 1 FROM pg_namespace WHERE nspname = %s',
+            'DROP SCHEMA IF EXISTS "django_snapshot_1_build" CASCADE',
+            'CREATE SCHEMA "django_snapshot_1_build"',
+            'ALTER SCHEMA "django_snapshot_1_build" RENAME TO "django_snapshot_1"',
+            'SELECT nspname FROM pg_namespace',
+            # the snapshot being built by another run is kept.
+            'DROP SCHEMA "django_snapshot_0" CASCADE',
+        ])
+        self.assertEqual(migration_modules[0], {
+            app.label: None for app in apps.get_app_configs()
+        })
+        self.assertNotEqual(settings.MIGRATION_MODULES, migration_modules[0])
+        self.assertEqual(settings.DATABASES, old_databases)
+
+    def test_clone_schema(self):
+        conn = connections['default']
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            mock_cursor.fetchall.side_effect = [
+                [
+                    ('testapp_testmodel',),
+                    ('legacy_table',),
+                    ('django_migrations',),
+                    # the materialized view and its data.
+                    ('testapp_testmaterializedview',),
+                    ('mv_tbl__testapp_testmaterializedview__0',),
+                ],
+                # attributes and constraints of the target schema.
+                [
+                    ('django_migrations', 1, 'id'),
+                ],
+                [
+                    ('django_migrations', 'django_migrations_pkey', 'p', [1], None, None),
+                ],
+                # attributes and constraints of the source schema.
+                [
+                    ('testapp_testmodel', 1, 'id'),
+                    ('legacy_table', 1, 'id'),
+                    ('legacy_table', 2, 'model_id'),
+                    ('django_migrations', 1, 'id'),
+                ],
+                [
+                    ('django_migrations', 'django_migrations_pkey', 'p', [1], None, None),
+                    ('legacy_table', 'legacy_table_pkey', 'p', [1], None, None),
+                    ('testapp_testmodel', 'testapp_testmodel_pkey', 'p', [1], None, None),
+                    ('legacy_table', 'legacy_table_model_fk', 'f', [2], 'testapp_testmodel', [1]),
+                    ('legacy_table', 'legacy_table_other_fk', 'f', [2], None, [1]),
+                ],
+            ]
+            mock_cursor.fetchone.side_effect = [
+                None,  # testapp_testmodel is empty
+                (1,),
+                (1,),
+                (12,),  # MAX(id) of django_migrations
+                ('"$user", public',),  # search_path
+            ]
+            conn.creation._clone_schema('django_snapshot_0', 'django_test_1')
+        executed_sql = [norm_sql(c[0][0]) for c in mock_cursor.execute.call_args_list]
+        # the attributes and constraints of the schemas.
+        catalog_sql = [sql for sql in executed_sql if sql.startswith('SELECT cl.relname')]
+        self.assertEqual(len(catalog_sql), 4)
+        executed_sql = [sql for sql in executed_sql if sql not in catalog_sql]
+        self.assertEqual(executed_sql, [
+            'DROP SCHEMA IF EXISTS "django_test_1" CASCADE',
+            'CREATE SCHEMA "django_test_1"',
+            'SELECT tablename FROM pg_tables WHERE schemaname = %s',
+            'SELECT 1 FROM "django_snapshot_0"."testapp_testmodel" LIMIT 1',
+            'CREATE TABLE "django_test_1"."testapp_testmodel" '
+            '(LIKE "django_snapshot_0"."testapp_testmodel" INCLUDING DEFAULTS)',
+            'SELECT 1 FROM "django_snapshot_0"."legacy_table" LIMIT 1',
+            'CREATE TABLE "django_test_1"."legacy_table" '
+            '(LIKE "django_snapshot_0"."legacy_table" INCLUDING DEFAULTS)',
+            'INSERT INTO "django_test_1"."legacy_table" '
+            'SELECT * FROM "django_snapshot_0"."legacy_table"',
+            'SELECT 1 FROM "django_snapshot_0"."django_migrations" LIMIT 1',
+            'SELECT MAX("id") FROM "django_snapshot_0"."django_migrations"',
+            'CREATE TABLE "django_test_1"."django_migrations" ('
+            '"id" integer GENERATED BY DEFAULT AS IDENTITY(13, 1) NOT NULL PRIMARY KEY, '
+            '"app" varchar(255) NOT NULL, "name" varchar(255) NOT NULL, '
+            '"applied" timestamp with time zone NOT NULL)',
+            'INSERT INTO "django_test_1"."django_migrations" ("id", "app", "name", "applied") '
+            'SELECT "id", "app", "name", "applied" FROM "django_snapshot_0"."django_migrations"',
+            'ALTER TABLE "django_test_1"."legacy_table" '
+            'ADD CONSTRAINT "legacy_table_pkey" PRIMARY KEY ("id")',
+            'ALTER TABLE "django_test_1"."testapp_testmodel" '
+            'ADD CONSTRAINT "testapp_testmodel_pkey" PRIMARY KEY ("id")',
+            'ALTER TABLE "django_test_1"."legacy_table" '
+            'ADD CONSTRAINT "legacy_table_model_fk" FOREIGN KEY ("model_id") '
+            'REFERENCES "django_test_1"."testapp_testmodel" ("id")',
+            'SHOW search_path',
+            'SET search_path TO "django_test_1"',
+            'CREATE MATERIALIZED VIEW "testapp_testmaterializedview" '
+            'DISTKEY("age") AUTO REFRESH YES AS '
+            'SELECT "testapp_testparentmodel"."age", '
+            'COUNT("testapp_testparentmodel"."id") AS "total" '
+            'FROM "testapp_testparentmodel" '
+            'WHERE "testapp_testparentmodel"."age" >= 20 '
+            'GROUP BY "testapp_testparentmodel"."age"',
+            'SET search_path TO "$user", public',
+        ])
+
+
 expected_ddl_normal = norm_sql(
     u'''CREATE TABLE "testapp_testmodel" (
     "id" integer identity(1, 1) NOT NULL PRIMARY KEY,
@@ -39,6 +258,29 @@ expected_ddl_meta_keys = norm_sql(
 ) DISTKEY("fk_id") SORTKEY("created_at", "id")
 ;''')
 
+expected_ddl_diststyle = norm_sql(
+    u'''CREATE TABLE "testapp_testmodelwithdiststyle" (
+    "id" integer identity(1, 1) NOT NULL PRIMARY KEY,
+    "name" varchar(100) NOT NULL
+) DISTSTYLE ALL
+;''')
+
+expected_ddl_sortstyle = norm_sql(
+    u'''CREATE TABLE "testapp_testmodelwithsortstyle" (
+    "id" integer identity(1, 1) NOT NULL PRIMARY KEY,
+    "created_at" timestamp with time zone NOT NULL,
+    "customer_id" integer NOT NULL
+) INTERLEAVED SORTKEY("created_at", "customer_id")
+;''')
+
+expected_ddl_sortkeys = norm_sql(
+    u'''CREATE TABLE "testapp_testmodelwithsortkeys" (
+    "id" integer identity(1, 1) NOT NULL PRIMARY KEY,
+    "created_at" timestamp with time zone NOT NULL,
+    "fk_id" integer NOT NULL
+) DISTKEY("fk_id") SORTKEY("created_at", "id")
+;''')
+
 
 expected_dml_annotate = norm_sql(
     u'''SELECT
@@ -106,6 +348,76 @@ class ModelTest(unittest.TestCase):
         sql = norm_sql(compiler.as_sql()[0])
         self.assertEqual(sql, expected_aggregate_filter_emulated)
 
+    def test_approximate_aggregates(self):
+        from django.db.models import Count
+        from django_redshift_backend import ApproxCountDistinct, ApproxPercentileDisc, Median
+        from testapp.models import TestModelWithQuerySet
+        query = TestModelWithQuerySet.objects.values('parent').annotate(
+            customers=ApproxCountDistinct('amount'),
+            p90=ApproxPercentileDisc('amount', 0.9),
+            median=Median('amount'),
+        ).query
+        sql, params = query.get_compiler(using='default').as_sql()
+        self.assertEqual(sql, norm_sql(
+            '''SELECT "testapp_testmodelwithqueryset"."parent_id",
+            APPROXIMATE COUNT(DISTINCT "testapp_testmodelwithqueryset"."amount") AS "customers",
+            APPROXIMATE PERCENTILE_DISC(0.9) WITHIN GROUP
+            (ORDER BY "testapp_testmodelwithqueryset"."amount") AS "p90",
+            MEDIAN("testapp_testmodelwithqueryset"."amount") AS "median"
+            FROM "testapp_testmodelwithqueryset"
+            GROUP BY "testapp_testmodelwithqueryset"."parent_id"'''
+        ))
+        with self.assertRaises(ValueError):
+            ApproxPercentileDisc('amount', 90)
+
+        # Count(distinct=True) is approximate by the setting or the queryset.
+        queryset = TestModelWithQuerySet.objects.annotate(
+            n=Count('amount', distinct=True),
+        )
+        for approximate, setting, expected in [
+            (None, False, 'COUNT(DISTINCT'),
+            (None, True, 'APPROXIMATE COUNT(DISTINCT'),
+            (True, False, 'APPROXIMATE COUNT(DISTINCT'),
+            (False, True, 'COUNT(DISTINCT'),
+        ]:
+            with self.subTest(approximate=approximate, setting=setting), \
+                    override_settings(REDSHIFT_APPROXIMATE_COUNT_DISTINCT=setting):
+                query = (queryset if approximate is None else queryset.approximate(approximate)).query
+                sql, params = query.get_compiler(using='default').as_sql()
+                self.assertIn(', %s "testapp_testmodelwithqueryset"."amount")' % expected, sql)
+
+        # aggregation over a subquery of the queryset.
+        conn = connections['default']
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            mock_cursor = mock_cursor_method.return_value
+            mock_cursor.fetchone.return_value = (1,)
+            TestModelWithQuerySet.objects.approximate()[:10].aggregate(
+                n=Count('amount', distinct=True),
+            )
+            sql = mock_cursor.execute.call_args[0][0]
+            self.assertTrue(sql.startswith('SELECT APPROXIMATE COUNT(DISTINCT "__col1")'), sql)
+
+    def test_approximate_subqueries(self):
+        from django.db.models import Count, Exists, OuterRef, Subquery
+        from testapp.models import TestModelWithQuerySet
+        children = TestModelWithQuerySet.objects.filter(parent=OuterRef('parent')).values(
+            'parent').annotate(n=Count('amount', distinct=True)).values('n')
+        queryset = TestModelWithQuerySet.objects.annotate(
+            n=Subquery(children),
+        ).filter(Exists(children.filter(n__gt=1)))
+        # the subqueries are compiled with approximate() of the queryset.
+        sql, params = queryset.approximate().query.get_compiler(using='default').as_sql()
+        self.assertEqual(sql.count('APPROXIMATE COUNT(DISTINCT'), 2)
+        self.assertNotIn(' COUNT(DISTINCT', sql.replace('APPROXIMATE COUNT(DISTINCT', ''))
+        sql, params = queryset.query.get_compiler(using='default').as_sql()
+        self.assertNotIn('APPROXIMATE', sql)
+        # approximate() of a subquery takes precedence.
+        queryset = TestModelWithQuerySet.objects.approximate().annotate(
+            n=Subquery(children.approximate(False)),
+        )
+        sql, params = queryset.query.get_compiler(using='default').as_sql()
+        self.assertNotIn('APPROXIMATE', sql)
+
     def test_insert_uuid_field(self):
         import uuid
         from django.db.models import sql
@@ -120,6 +432,635 @@ class ModelTest(unittest.TestCase):
         self.assertEqual(type(uuid_insert_value), str)
         self.assertEqual(len(uuid_insert_value), 32)
 
+    def test_create_model_with_compact_uuid(self):
+        from testapp.models import TestModelWithCompactUUID
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        schema_editor.create_model(TestModelWithCompactUUID)
+        self.assertEqual(norm_sql(schema_editor.collected_sql[0]), norm_sql(
+            u'''CREATE TABLE "testapp_testmodelwithcompactuuid" (
+            "id" integer identity(1, 1) NOT NULL PRIMARY KEY,
+            "uuid" char(32) NOT NULL,
+            "bytes_uuid" varbyte(16) NOT NULL
+            ) ;'''))
+
+    def test_compact_uuid_lookups(self):
+        import uuid
+        from testapp.models import TestModelWithCompactUUID
+        value = uuid.UUID('6ba7b810-9dad-11d1-80b4-00c04fd430c8')
+        query = TestModelWithCompactUUID.objects.filter(uuid=value, bytes_uuid=value).query
+        sql, params = query.get_compiler(using='default').as_sql()
+        self.assertIn('6ba7b8109dad11d180b400c04fd430c8', params)
+        varbyte_param, = [p for p in params if not isinstance(p, str)]
+        self.assertEqual(
+            varbyte_param.getquoted(),
+            b"to_varbyte('6ba7b8109dad11d180b400c04fd430c8', 'hex')::varbyte",
+        )
+        query = TestModelWithCompactUUID.objects.filter(bytes_uuid__startswith='6ba7b810-9dad').query
+        sql, params = query.get_compiler(using='default').as_sql()
+        self.assertIn(
+            'TO_HEX("testapp_testmodelwithcompactuuid"."bytes_uuid") LIKE',
+            sql,
+        )
+
+    def test_convert_compact_uuid_value(self):
+        import uuid
+        conn = connections['default']
+        value = uuid.UUID('6ba7b810-9dad-11d1-80b4-00c04fd430c8')
+        self.assertEqual(conn.ops.convert_uuidfield_value(value.hex, None, conn), value)
+        self.assertEqual(
+            conn.ops.convert_uuidfield_value(memoryview(value.bytes), None, conn), value)
+        self.assertIsNone(conn.ops.convert_uuidfield_value(None, None, conn))
+
+    def test_insert_binary_field(self):
+        from django.db.models import sql
+        from psycopg2.extensions import adapt
+        from django_redshift_backend.psycopg2adapter import RedshiftBinary
+        from testapp.models import TestModelWithBinary
+        objs = [
+            TestModelWithBinary(data=b'\x80\x00'),
+            TestModelWithBinary(data=memoryview(b'\x01\xff')),
+        ]
+        q = sql.InsertQuery(TestModelWithBinary)
+        q.insert_values([TestModelWithBinary._meta.get_field('data')], objs)
+        (_sql, params), = q.get_compiler('default').as_sql()
+        adapted = [adapt(p) for p in params]
+        self.assertEqual([type(p) for p in adapted], [RedshiftBinary, RedshiftBinary])
+        self.assertEqual(
+            [p.getquoted() for p in adapted],
+            [b"to_varbyte('8000', 'hex')::varbyte", b"to_varbyte('01ff', 'hex')::varbyte"],
+        )
+
+    def test_binary_field_prepared_for_redshift(self):
+        from unittest import mock
+        from psycopg2.extensions import Binary, adapt
+        adapted = adapt(Binary(b'\x80\x00'))
+        # Redshift reports the server version 8.0.2.
+        adapted.prepare(mock.Mock(server_version=80002))
+        self.assertEqual(adapted.getquoted(), b"to_varbyte('8000', 'hex')::varbyte")
+
+    def test_bulk_insert_binary_field_memory(self):
+        import tracemalloc
+        from django_redshift_backend.psycopg2adapter import RedshiftBinary
+        size = 4 * 1024 * 1024
+        value = b'\x01' * size
+        tracemalloc.start()
+        try:
+            quoted = RedshiftBinary(value).getquoted()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(quoted[:16], b"to_varbyte('0101")
+        # the buffer and the quoted copy of it, not the copies of the hex.
+        self.assertLess(peak, size * 2 * 3)
+
+    def test_create_model_with_super_json(self):
+        from testapp.models import TestModelWithSuperJSON
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        schema_editor.create_model(TestModelWithSuperJSON)
+        self.assertEqual(norm_sql(schema_editor.collected_sql[0]), norm_sql(
+            u'''CREATE TABLE "testapp_testmodelwithsuperjson" (
+            "id" integer identity(1, 1) NOT NULL PRIMARY KEY,
+            "data" super NULL
+            ) ;'''))
+
+    def test_hll_sketch_field_on_other_databases(self):
+        from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+        from django_redshift_backend import HLLSketchField
+        conn = connections['default']
+        self.assertEqual(HLLSketchField().db_type(conn), 'hllsketch')
+        # the sketches are text, instead of a column omitted without a type.
+        sqlite = SQLiteDatabaseWrapper({'NAME': ':memory:'})
+        self.assertEqual(HLLSketchField().db_type(sqlite), 'text')
+
+    def test_create_model_with_hll_sketch(self):
+        from testapp.models import TestModelWithHLLSketch
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        schema_editor.create_model(TestModelWithHLLSketch)
+        self.assertEqual(norm_sql(schema_editor.collected_sql[0]), norm_sql(
+            u'''CREATE TABLE "testapp_testmodelwithhllsketch" (
+            "id" integer identity(1, 1) NOT NULL PRIMARY KEY,
+            "day" date NOT NULL,
+            "users" hllsketch NOT NULL
+            ) ;'''))
+
+    def test_hll_sketch_expressions(self):
+        from django_redshift_backend import (
+            HllCardinality, HllCombine, HllCombineSketches, HllCreateSketch,
+        )
+        from testapp.models import TestModelWithHLLSketch, TestModelWithQuerySet
+        query = TestModelWithQuerySet.objects.values('created_at__date').annotate(
+            users=HllCreateSketch('parent'),
+        ).query
+        sql, params = query.get_compiler(using='default').as_sql()
+        self.assertIn(
+            'HLL_CREATE_SKETCH("testapp_testmodelwithqueryset"."parent_id") AS "users"', sql
+        )
+
+        query = TestModelWithHLLSketch.objects.values('day__year').annotate(
+            n=HllCardinality(HllCombine('users')),
+        ).query
+        sql, params = query.get_compiler(using='default').as_sql()
+        self.assertIn(
+            'HLL_CARDINALITY(HLL_COMBINE("testapp_testmodelwithhllsketch"."users")) AS "n"',
+            sql,
+        )
+
+        query = TestModelWithHLLSketch.objects.annotate(
+            combined=HllCombineSketches('users', 'users'),
+        ).query
+        sql, params = query.get_compiler(using='default').as_sql()
+        self.assertIn(
+            'HLL_COMBINE_SKETCHES("testapp_testmodelwithhllsketch"."users",'
+            ' "testapp_testmodelwithhllsketch"."users") AS "combined"',
+            sql,
+        )
+
+    def test_insert_super_json(self):
+        from django.db.models import sql
+        from testapp.models import TestModelWithSuperJSON
+        obj = TestModelWithSuperJSON(data={'owner': {'name': 'x'}})
+        q = sql.InsertQuery(TestModelWithSuperJSON)
+        q.insert_values([TestModelWithSuperJSON._meta.get_field('data')], [obj])
+        (sql, params), = q.get_compiler('default').as_sql()
+        self.assertEqual(
+            sql, 'INSERT INTO "testapp_testmodelwithsuperjson" ("data") VALUES (JSON_PARSE(%s))')
+        self.assertEqual(params, ('{"owner": {"name": "x"}}',))
+
+    def test_super_json_lookups(self):
+        from testapp.models import TestModelWithSuperJSON
+        data = '"testapp_testmodelwithsuperjson"."data"'
+        for lookup, expected_where, expected_params in [
+            ({'data__owner__name': 'x'}, data + '."owner"."name" = JSON_PARSE(%s)', ('"x"',)),
+            ({'data__tags__0': 1}, data + '."tags"[0] = JSON_PARSE(%s)', ('1',)),
+            ({'data__n__gt': 3}, data + '."n" > %s', (3,)),
+            ({'data__owner__in': ['a', 1]},
+             data + '."owner" IN (JSON_PARSE(%s), JSON_PARSE(%s))', ('"a"', '1')),
+            ({'data__owner__isnull': True}, data + '."owner" IS NULL', ()),
+            ({'data__has_key': 'owner'}, data + '."owner" IS NOT NULL', ()),
+            ({'data__owner__has_any_keys': ['a', '1']},
+             '(%s."owner"."a" IS NOT NULL OR %s."owner"."1" IS NOT NULL)' % (data, data), ()),
+            ({'data__contains': {'a': 1, 'b': {'c': [1]}, 'd': {}}},
+             '(%s."a" = JSON_PARSE(%%s) AND %s."b"."c" = JSON_PARSE(%%s) AND IS_OBJECT(%s."d"))'
+             % (data, data, data),
+             ('1', '[1]')),
+        ]:
+            with self.subTest(lookup=lookup):
+                query = TestModelWithSuperJSON.objects.filter(**lookup).query
+                sql, params = query.get_compiler(using='default').as_sql()
+                self.assertEqual(sql.split(' WHERE ', 1)[1], expected_where)
+                self.assertEqual(params, expected_params)
+
+        query = TestModelWithSuperJSON.objects.filter(data__owner__name__startswith='x').query
+        sql, params = query.get_compiler(using='default').as_sql()
+        self.assertIn(
+            'WHERE (CASE WHEN IS_VARCHAR(%s."owner"."name") THEN %s."owner"."name"::varchar '
+            'ELSE JSON_SERIALIZE(%s."owner"."name") END)' % (data, data, data),
+            sql,
+        )
+        self.assertEqual(params, ('x%',))
+        with self.assertRaises(NotSupportedError):
+            TestModelWithSuperJSON.objects.filter(data__contained_by={'a': 1}).query.get_compiler(
+                using='default').as_sql()
+
+    def test_super_json_has_key_of_null_value(self):
+        from testapp.models import TestModelWithSuperJSON
+        # A key of JSON null isn't found, as a missing key navigates to null.
+        sqls = [
+            TestModelWithSuperJSON.objects.filter(**lookup).query.get_compiler(
+                using='default').as_sql()[0].split(' WHERE ', 1)[1]
+            for lookup in [{'data__has_key': 'owner'}, {'data__owner__isnull': False}]
+        ]
+        self.assertEqual(sqls[0], sqls[1])
+        self.assertEqual(sqls[0], '"testapp_testmodelwithsuperjson"."data"."owner" IS NOT NULL')
+
+    def test_super_json_values(self):
+        from testapp.models import TestModelWithSuperJSON
+        query = TestModelWithSuperJSON.objects.values('data__owner__0').query
+        sql, params = query.get_compiler(using='default').as_sql()
+        self.assertEqual(
+            sql,
+            'SELECT "testapp_testmodelwithsuperjson"."data"."owner"[0] '
+            'FROM "testapp_testmodelwithsuperjson"',
+        )
+
+    def test_json_key_lookups(self):
+        from testapp.models import TestModelWithJSON
+        data = '"testapp_testmodelwithjson"."data"'
+        for lookup, expected_where, expected_params in [
+            ({'data__owner__name': 'x'},
+             "NULLIF(JSON_EXTRACT_PATH_TEXT(%s, %%s, %%s), '') = %%s" % data,
+             ('owner', 'name', 'x')),
+            ({'data__tags__0__id': 2},
+             "(CASE WHEN {0} ~ '^-?[0-9]+([.][0-9]+)?([eE][-+]?[0-9]+)?$' "
+             "THEN {0}::float8 END) = %s".format(
+                 "NULLIF(JSON_EXTRACT_PATH_TEXT(JSON_EXTRACT_ARRAY_ELEMENT_TEXT("
+                 "JSON_EXTRACT_PATH_TEXT(%s, %%s), %%s), %%s), '')" % data),
+             ('tags', 0, 'id', 'tags', 0, 'id', 2)),
+            ({'data__ok': True},
+             "NULLIF(JSON_EXTRACT_PATH_TEXT(%s, %%s), '') = %%s" % data,
+             ('ok', 'true')),
+            ({'data__owner': None},
+             "NULLIF(JSON_EXTRACT_PATH_TEXT(%s, %%s), '') IS NULL" % data, ('owner',)),
+            ({'data__n__gte': 3},
+             "(CASE WHEN {0} ~ '^-?[0-9]+([.][0-9]+)?([eE][-+]?[0-9]+)?$' "
+             "THEN {0}::float8 END) >= %s".format(
+                 "NULLIF(JSON_EXTRACT_PATH_TEXT(%s, %%s), '')" % data),
+             ('n', 'n', 3)),
+            ({'data__owner__in': ['a', 1]},
+             "NULLIF(JSON_EXTRACT_PATH_TEXT(%s, %%s), '') IN (%%s, %%s)" % data,
+             ('owner', 'a', '1')),
+            ({'data__has_key': 'owner'},
+             "(JSON_EXTRACT_PATH_TEXT({0}, %s) <> '' OR JSON_PARSE({0}).\"owner\" IS NOT NULL)"
+             .format(data), ('owner',)),
+            ({'data__tags__0__has_key': 'id'},
+             "(JSON_EXTRACT_PATH_TEXT(NULLIF(JSON_EXTRACT_ARRAY_ELEMENT_TEXT("
+             "JSON_EXTRACT_PATH_TEXT({0}, %s), %s), ''), %s) <> '' "
+             "OR JSON_PARSE({0}).\"tags\"[0].\"id\" IS NOT NULL)".format(data),
+             ('tags', 0, 'id')),
+            ({'data__owner__isnull': False},
+             "NULLIF(JSON_EXTRACT_PATH_TEXT(%s, %%s), '') IS NOT NULL" % data, ('owner',)),
+        ]:
+            with self.subTest(lookup=lookup):
+                query = TestModelWithJSON.objects.filter(**lookup).query
+                sql, params = query.get_compiler(using='default').as_sql()
+                self.assertEqual(sql.split(' WHERE ', 1)[1], expected_where)
+                self.assertEqual(params, expected_params)
+
+    def test_json_key_values(self):
+        from testapp.models import TestModelWithJSON
+        query = TestModelWithJSON.objects.values('data__owner__name').query
+        sql, params = query.get_compiler(using='default').as_sql()
+        self.assertEqual(
+            sql,
+            'SELECT NULLIF(JSON_EXTRACT_PATH_TEXT("testapp_testmodelwithjson"."data", %s, %s), \'\') '
+            'FROM "testapp_testmodelwithjson"',
+        )
+        self.assertEqual(params, ('owner', 'name'))
+
+    def test_text_lookups_without_cast(self):
+        from django.db.models import F
+        from testapp.models import TestModel, TestParentModel
+        for queryset, expected_where, expected_params in [
+            (TestModel.objects.filter(text__iexact='a_b%'),
+             '"testapp_testmodel"."text" ILIKE %s', ('a\\_b\\%',)),
+            (TestModel.objects.filter(text__icontains='ab'),
+             '"testapp_testmodel"."text" ILIKE %s', ('%ab%',)),
+            (TestModel.objects.filter(text__startswith='ab'),
+             '"testapp_testmodel"."text" LIKE %s', ('ab%',)),
+            (TestModel.objects.filter(text__iexact=F('text')),
+             'UPPER("testapp_testmodel"."text") = UPPER(("testapp_testmodel"."text"))', ()),
+            # The other types are cast to text.
+            (TestParentModel.objects.filter(age__contains=1),
+             '"testapp_testparentmodel"."age"::text LIKE %s', ('%1%',)),
+            (TestParentModel.objects.filter(age__iexact=1),
+             '"testapp_testparentmodel"."age"::text ILIKE %s', ('1',)),
+        ]:
+            with self.subTest(where=expected_where):
+                sql, params = queryset.query.get_compiler(using='default').as_sql()
+                self.assertEqual(sql.split(' WHERE ', 1)[1], expected_where)
+                self.assertEqual(params, expected_params)
+
+    def test_truncated_datetime_lookups_as_range(self):
+        import zoneinfo
+        from django.core.exceptions import EmptyResultSet
+        from django.db.models.functions import TruncHour
+        from django.utils import timezone
+        from testapp.models import TestModel
+        tz = zoneinfo.ZoneInfo('Asia/Tokyo')
+        ctime = '"testapp_testmodel"."ctime"'
+        with timezone.override(tz):
+            for queryset, expected_where, expected_params in [
+                (TestModel.objects.filter(ctime__date=datetime.date(2024, 3, 1)),
+                 '%s >= %%s AND %s < %%s' % (ctime, ctime),
+                 (datetime.datetime(2024, 3, 1, tzinfo=tz), datetime.datetime(2024, 3, 2, tzinfo=tz))),
+                (TestModel.objects.filter(ctime__date__gt=datetime.date(2024, 3, 1)),
+                 '%s >= %%s' % ctime, (datetime.datetime(2024, 3, 2, tzinfo=tz),)),
+                (TestModel.objects.filter(ctime__date__lt=datetime.date(2024, 3, 1)),
+                 '%s < %%s' % ctime, (datetime.datetime(2024, 3, 1, tzinfo=tz),)),
+                (TestModel.objects.filter(
+                    ctime__date__range=(datetime.date(2024, 3, 1), datetime.date(2024, 3, 31))),
+                 '%s >= %%s AND %s < %%s' % (ctime, ctime),
+                 (datetime.datetime(2024, 3, 1, tzinfo=tz), datetime.datetime(2024, 4, 1, tzinfo=tz))),
+                # 05:00 UTC is 14:00 in Tokyo.
+                (TestModel.objects.alias(hour=TruncHour('ctime')).filter(
+                    hour__lte=datetime.datetime(2024, 3, 1, 5, 30, tzinfo=datetime.timezone.utc)),
+                 '%s < %%s' % ctime, (datetime.datetime(2024, 3, 1, 15, tzinfo=tz),)),
+                # not rewritten, the hours of all days are not a range.
+                (TestModel.objects.filter(ctime__hour=3),
+                 'EXTRACT(HOUR FROM %s AT TIME ZONE %%s) = %%s' % ctime, ('Asia/Tokyo', 3)),
+            ]:
+                with self.subTest(where=expected_where):
+                    sql, params = queryset.query.get_compiler(using='default').as_sql()
+                    self.assertEqual(sql.split(' WHERE ', 1)[1], expected_where)
+                    self.assertEqual(params, expected_params)
+
+            # no datetime truncates to a value in the middle of an hour.
+            queryset = TestModel.objects.alias(hour=TruncHour('ctime')).filter(
+                hour=datetime.datetime(2024, 3, 1, 5, 30, tzinfo=datetime.timezone.utc))
+            with self.assertRaises(EmptyResultSet):
+                queryset.query.get_compiler(using='default').as_sql()
+
+    def test_truncated_datetime_in_lookup_as_ranges(self):
+        import zoneinfo
+        from django.core.exceptions import EmptyResultSet
+        from django.db.models.functions import TruncHour
+        from django.utils import timezone
+        from testapp.models import TestModel
+        tz = zoneinfo.ZoneInfo('Asia/Tokyo')
+        ctime = '"testapp_testmodel"."ctime"'
+        with timezone.override(tz):
+            queryset = TestModel.objects.filter(
+                ctime__date__in=[datetime.date(2024, 3, 1), datetime.date(2024, 3, 5)])
+            sql, params = queryset.query.get_compiler(using='default').as_sql()
+            self.assertEqual(
+                sql.split(' WHERE ', 1)[1],
+                '((%s >= %%s AND %s < %%s) OR (%s >= %%s AND %s < %%s))' % ((ctime,) * 4),
+            )
+            self.assertEqual(params, (
+                datetime.datetime(2024, 3, 1, tzinfo=tz), datetime.datetime(2024, 3, 2, tzinfo=tz),
+                datetime.datetime(2024, 3, 5, tzinfo=tz), datetime.datetime(2024, 3, 6, tzinfo=tz),
+            ))
+            # no datetime truncates to a value in the middle of an hour.
+            queryset = TestModel.objects.alias(hour=TruncHour('ctime')).filter(
+                hour__in=[datetime.datetime(2024, 3, 1, 5, 30, tzinfo=tz)])
+            with self.assertRaises(EmptyResultSet):
+                queryset.query.get_compiler(using='default').as_sql()
+
+    def test_truncated_naive_datetime_in_current_timezone(self):
+        import zoneinfo
+        from django.db.models.functions import TruncHour
+        from django.utils import timezone
+        from django_redshift_backend.lookups import get_trunc_period
+        from testapp.models import TestModel
+        tz = zoneinfo.ZoneInfo('Asia/Tokyo')
+        queryset = TestModel.objects.alias(
+            hour=TruncHour('ctime', tzinfo=datetime.timezone.utc)
+        ).filter(hour=datetime.datetime(2024, 3, 1, 5, tzinfo=datetime.timezone.utc))
+        lookup = queryset.query.where.children[0]
+        with timezone.override(tz):
+            # 14:30 in Tokyo is in the hour of 05:00 UTC.
+            start, end, is_start = get_trunc_period(lookup, datetime.datetime(2024, 3, 1, 14, 30))
+        self.assertEqual(start, datetime.datetime(2024, 3, 1, 5, tzinfo=datetime.timezone.utc))
+        self.assertEqual(end, datetime.datetime(2024, 3, 1, 6, tzinfo=datetime.timezone.utc))
+        self.assertFalse(is_start)
+
+    def test_truncated_datetime_lookups_not_registered(self):
+        from django.db.models.functions.datetime import TruncBase
+        # compiled by as_redshift of the lookups, not registered on TruncBase.
+        self.assertNotIn('exact', TruncBase.get_class_lookups())
+        self.assertNotIn('in', TruncBase.get_class_lookups())
+
+    @override_settings(REDSHIFT_IN_TEMP_TABLE_MIN_VALUES=3)
+    def test_in_lookup_with_temp_table(self):
+        from django.db.utils import DataError
+        from django_redshift_backend.base import CursorWrapper, InTempTable
+        from testapp.models import TestModel, TestModelWithMetaKeys
+        conn = connections['default']
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method, \
+                mock.patch.object(conn, 'connection'), \
+                mock.patch.object(conn.ops, 'in_temp_table_batch_size', 2):
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            query = TestModel.objects.filter(text__in=['a', 'b', None, 'b', 'ccc']).query
+            sql, params = query.get_compiler(using='default').as_sql()
+            # compiling the query doesn't create the table.
+            str(query)
+            mock_cursor.execute.assert_not_called()
+            table, = params
+            self.assertIsInstance(table, InTempTable)
+            self.assertRegex(str(table), r'^"django_in_[0-9a-f]{16}"$')
+            self.assertEqual(
+                sql.split(' WHERE ', 1)[1],
+                '"testapp_testmodel"."text" IN (SELECT "value" FROM %s)',
+            )
+            # named by the adapted values.
+            same = TestModel.objects.filter(text__in=['ccc', 'a', 'b']).query
+            self.assertEqual(str(same.get_compiler(using='default').as_sql()[1][0]), str(table))
+            other = TestModel.objects.filter(text__in=['a', 'b', 'cc']).query
+            self.assertNotEqual(str(other.get_compiler(using='default').as_sql()[1][0]), str(table))
+
+            # created by the cursor executing the query, and dropped after.
+            raw_cursor = mock.Mock(rowcount=3)
+            raw_cursor.name = None
+            conn.connection.get_transaction_status.return_value = 0
+            CursorWrapper(raw_cursor, conn).execute(sql, params)
+            raw_cursor.execute.assert_called_once_with(sql, params)
+            statements = [c[0] for c in mock_cursor.execute.call_args_list]
+            self.assertEqual(statements, [
+                ('DROP TABLE IF EXISTS %s' % table,),
+                ('CREATE TEMP TABLE %s ("value" varchar(3)) DISTSTYLE ALL SORTKEY("value")' % table,),
+                ('INSERT INTO %s VALUES (%%s), (%%s)' % table, ['a', 'b']),
+                ('INSERT INTO %s VALUES (%%s)' % table, ['ccc']),
+                ('DROP TABLE IF EXISTS %s' % table,),
+            ])
+
+            # a server-side cursor drops the table when it's closed.
+            mock_cursor.reset_mock()
+            raw_cursor.name = 'chunked'
+            cursor = CursorWrapper(raw_cursor, conn)
+            cursor.execute(sql, params)
+            self.assertEqual(len(mock_cursor.execute.call_args_list), 4)
+            cursor.close()
+            raw_cursor.close.assert_called_once_with()
+            self.assertEqual(
+                mock_cursor.execute.call_args_list[-1][0], ('DROP TABLE IF EXISTS %s' % table,))
+
+            # the rollback of a failed transaction drops the table.
+            mock_cursor.reset_mock()
+            raw_cursor.name = None
+            raw_cursor.execute.side_effect = conn.Database.DataError
+            conn.connection.get_transaction_status.return_value = 3  # INERROR
+            with self.assertRaises(DataError):
+                CursorWrapper(raw_cursor, conn).execute(sql, params)
+            self.assertEqual(len(mock_cursor.execute.call_args_list), 4)
+
+            # distributed as the distkey of the table.
+            query = TestModelWithMetaKeys.objects.filter(fk__in=[1, 2, 3]).query
+            _sql, (table,) = query.get_compiler(using='default').as_sql()
+            self.assertEqual((table.db_type, table.distkey), ('integer', True))
+
+            # fewer values are placeholders.
+            query = TestModel.objects.filter(text__in=['a', 'b']).query
+            sql, params = query.get_compiler(using='default').as_sql()
+            self.assertTrue(sql.endswith('"testapp_testmodel"."text" IN (%s, %s)'))
+
+    def test_materialize(self):
+        from django.db.models import F, Sum
+        from testapp.models import TestModelWithQuerySet
+        conn = connections['default']
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            queryset = TestModelWithQuerySet.objects.filter(amount__gt=10).annotate(
+                parent_age=F('parent__age'),
+            ).order_by('created_at')
+            with queryset.materialize(distkey='parent', sortkey=['created_at', 'parent_age']) as base:
+                (create_sql, params), _ = mock_cursor.execute.call_args
+                table = create_sql.split()[3]
+                self.assertRegex(table, r'^"django_materialized_[0-9a-f]{16}"$')
+                self.assertEqual(create_sql, norm_sql(
+                    '''CREATE TEMP TABLE %s DISTKEY("parent_id") SORTKEY("created_at", "parent_age") AS
+                    SELECT "testapp_testmodelwithqueryset"."id",
+                    "testapp_testmodelwithqueryset"."amount",
+                    "testapp_testmodelwithqueryset"."created_at",
+                    "testapp_testmodelwithqueryset"."parent_id",
+                    "testapp_testparentmodel"."age" AS "parent_age"
+                    FROM "testapp_testmodelwithqueryset"
+                    INNER JOIN "testapp_testparentmodel"
+                    ON ("testapp_testmodelwithqueryset"."parent_id" = "testapp_testparentmodel"."id")
+                    WHERE "testapp_testmodelwithqueryset"."amount" > %%s''' % table
+                ))
+                self.assertEqual(params, (10,))
+
+                query = base.values('parent_age').annotate(total=Sum('amount')).query
+                sql, params = query.get_compiler(using='default').as_sql()
+                self.assertEqual(sql, norm_sql(
+                    '''SELECT (%(t)s."parent_age") AS "parent_age",
+                    SUM(%(t)s."amount") AS "total"
+                    FROM %(t)s
+                    GROUP BY 1''' % {'t': table}
+                ))
+                mock_cursor.execute.reset_mock()
+            mock_cursor.execute.assert_called_once_with('DROP TABLE IF EXISTS %s' % table)
+
+        with self.assertRaises(TypeError):
+            with TestModelWithQuerySet.objects.values('amount').materialize():
+                pass
+
+    def test_materialize_in_failed_transaction(self):
+        from django.db.utils import DataError
+        from testapp.models import TestModelWithQuerySet
+        conn = connections['default']
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method, \
+                mock.patch.object(conn, 'connection') as mock_connection:
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            # the error of the query is raised, without executing DROP TABLE.
+            mock_connection.get_transaction_status.return_value = 3  # INERROR
+            with self.assertRaises(DataError):
+                with TestModelWithQuerySet.objects.materialize():
+                    mock_cursor.execute.reset_mock()
+                    raise DataError('invalid input')
+            mock_cursor.execute.assert_not_called()
+
+            # nor in an atomic block to roll back.
+            mock_connection.get_transaction_status.return_value = 0
+            with mock.patch.object(conn, 'needs_rollback', True), \
+                    self.assertRaises(DataError):
+                with TestModelWithQuerySet.objects.materialize():
+                    mock_cursor.execute.reset_mock()
+                    raise DataError('invalid input')
+            mock_cursor.execute.assert_not_called()
+
+    def test_refresh_materialized_view(self):
+        from testapp.models import TestMaterializedView
+        conn = connections['default']
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            TestMaterializedView.objects.refresh_materialized_view()
+            mock_cursor.execute.assert_called_once_with(
+                'REFRESH MATERIALIZED VIEW "testapp_testmaterializedview"'
+            )
+
+            mock_cursor.reset_mock()
+            mock_cursor.fetchone.return_value = (True, 1, True)
+            info = TestMaterializedView.objects.get_materialized_view_info()
+            self.assertTrue(info.is_stale)
+            self.assertEqual(info.state, 1)
+            self.assertIn('FROM stv_mv_info', mock_cursor.execute.call_args[0][0])
+            self.assertEqual(
+                mock_cursor.execute.call_args[0][1], ['testapp_testmaterializedview']
+            )
+
+    def test_estimated_count(self):
+        from django_redshift_backend import EstimatedCountPaginator, estimated_count
+        from django_redshift_backend import base
+        from testapp.models import TestModelWithQuerySet
+        conn = connections['default']
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method, \
+                mock.patch.dict(base._estimated_row_counts, clear=True):
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            # diststyle, sortkey1, unsorted, tbl_rows, estimated_visible_rows, size
+            mock_cursor.fetchone.return_value = ('KEY(parent_id)', 'created_at', 0, 1200, 1000, 10)
+            self.assertEqual(estimated_count(TestModelWithQuerySet), 1000)
+            self.assertEqual(mock_cursor.execute.call_args[0][1], ['testapp_testmodelwithqueryset'])
+            # cached for REDSHIFT_ESTIMATED_COUNT_TIMEOUT seconds.
+            mock_cursor.reset_mock()
+            self.assertEqual(TestModelWithQuerySet.objects.order_by('amount').estimated_count(), 1000)
+            mock_cursor.execute.assert_not_called()
+
+            paginator = EstimatedCountPaginator(TestModelWithQuerySet.objects.order_by('id'), 100)
+            self.assertEqual(paginator.num_pages, 10)
+            mock_cursor.execute.assert_not_called()
+
+        # filtered querysets are estimated by EXPLAIN, or counted.
+        queryset = TestModelWithQuerySet.objects.filter(amount__gt=10)
+        with mock.patch.object(type(queryset), 'explain', return_value=(
+            'XN Seq Scan on testapp_testmodelwithqueryset  (cost=0.00..0.15 rows=42 width=24)\n'
+            '  Filter: (amount > 10)'
+        )):
+            self.assertEqual(estimated_count(queryset, explain=True), 42)
+        with mock.patch.object(type(queryset), 'count', return_value=7):
+            self.assertEqual(estimated_count(queryset), 7)
+
+    def test_seek(self):
+        from django_redshift_backend.query import get_seek_keys, seek
+        from testapp.models import TestModelWithMetaKeys, TestModelWithSortKeys, TestModel
+        self.assertEqual(get_seek_keys(TestModelWithMetaKeys), ['created_at', '-id'])
+        self.assertEqual(get_seek_keys(TestModelWithSortKeys), ['created_at', 'id'])
+        self.assertEqual(get_seek_keys(TestModel), ['pk'])
+
+        ctime = datetime.datetime(2024, 3, 1, 9, tzinfo=datetime.timezone.utc)
+        query = seek(TestModelWithMetaKeys.objects.all(), [ctime, 10]).query
+        sql, params = query.get_compiler(using='default').as_sql()
+        self.assertEqual(sql.split(' WHERE ', 1)[1], norm_sql(
+            '''("testapp_testmodelwithmetakeys"."created_at" >= %s
+            AND ("testapp_testmodelwithmetakeys"."created_at" > %s
+            OR ("testapp_testmodelwithmetakeys"."created_at" = %s
+            AND "testapp_testmodelwithmetakeys"."id" < %s)))
+            ORDER BY "testapp_testmodelwithmetakeys"."created_at" ASC,
+            "testapp_testmodelwithmetakeys"."id" DESC'''
+        ))
+        self.assertEqual(params[3], 10)
+
+        query = seek(TestModel.objects.all(), [10]).query
+        sql, params = query.get_compiler(using='default').as_sql()
+        self.assertTrue(sql.endswith(
+            'WHERE "testapp_testmodel"."id" > %s ORDER BY "testapp_testmodel"."id" ASC'
+        ))
+        with self.assertRaises(ValueError):
+            seek(TestModel.objects.all(), [ctime, 10])
+
+    def test_keyset_paginator(self):
+        from django.core.paginator import InvalidPage
+        from django_redshift_backend import KeysetPaginator
+        from django_redshift_backend import paginator as paginator_module
+        from testapp.models import TestModelWithMetaKeys
+        ctime = datetime.datetime(2024, 3, 1, 9, tzinfo=datetime.timezone.utc)
+        rows = [TestModelWithMetaKeys(id=i, created_at=ctime) for i in (9, 8, 7)]
+        paginator = KeysetPaginator(TestModelWithMetaKeys.objects.all(), 2)
+        with mock.patch.object(paginator_module, 'seek', return_value=rows) as mock_seek:
+            page = paginator.page()
+            self.assertEqual(list(page), rows[:2])
+            self.assertTrue(page.has_next())
+            mock_seek.assert_called_once_with(
+                paginator.object_list, None, ['created_at', '-id'],
+            )
+
+            mock_seek.reset_mock()
+            mock_seek.return_value = rows[2:]
+            page = paginator.page(page.next_cursor)
+            self.assertEqual(list(page), rows[2:])
+            self.assertFalse(page.has_next())
+            self.assertEqual(mock_seek.call_args[0][1], [ctime, 8])
+
+        for cursor in ['', 'not a cursor', paginator.encode_cursor(rows[0])[:-4]]:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidPage):
+                paginator.page(cursor)
+
     def test_distinct(self):
         from testapp.models import TestModel
         query = TestModel.objects.distinct().query
@@ -127,6 +1068,13 @@ class ModelTest(unittest.TestCase):
         sql = norm_sql(compiler.as_sql()[0])
         self.assertEqual(sql, expected_dml_distinct)
 
+    def test_sortkeys_without_ordering(self):
+        from testapp.models import TestModelWithSortKeys
+        query = TestModelWithSortKeys.objects.all().query
+        compiler = query.get_compiler(using='default')
+        sql = norm_sql(compiler.as_sql()[0])
+        self.assertNotIn('ORDER BY', sql)
+
     def test_distinct_with_fields(self):
         from testapp.models import TestModel
         query = TestModel.objects.distinct('text').query
@@ -153,6 +1101,684 @@ class MigrationTest(unittest.TestCase):
         from testapp.models import TestModelWithMetaKeys
         self.check_model_creation(TestModelWithMetaKeys, expected_ddl_meta_keys)
 
+    def test_create_table_diststyle(self):
+        from testapp.models import TestModelWithDistStyle
+        self.check_model_creation(TestModelWithDistStyle, expected_ddl_diststyle)
+
+    def test_diststyle_key_requires_distkey(self):
+        from django.db import models
+        from django_redshift_backend import DistStyle
+
+        class DistStyleKeyModel(models.Model):
+            class Meta:
+                app_label = 'testapp'
+                constraints = [DistStyle('key')]
+
+        with self.assertRaises(ValueError):
+            self.check_model_creation(DistStyleKeyModel, '')
+
+    def test_diststyle_with_distkey(self):
+        from django.db import models
+        from django_redshift_backend import DistKey, DistStyle
+
+        class DistStyleEvenModel(models.Model):
+            code = models.IntegerField()
+
+            class Meta:
+                app_label = 'testapp'
+                indexes = [DistKey(fields=['code'])]
+                constraints = [DistStyle('even')]
+
+        with self.assertRaises(ValueError):
+            self.check_model_creation(DistStyleEvenModel, '')
+
+    def test_diststyle_deconstruct(self):
+        from django_redshift_backend import DistStyle
+        from testapp.models import TestModelWithDistStyle
+        diststyle = TestModelWithDistStyle._meta.constraints[0]
+        self.assertEqual(diststyle.deconstruct(), (
+            'django_redshift_backend.DistStyle',
+            ('ALL',),
+            {'name': 'testapp_testmodelwithdiststyle_diststyle'},
+        ))
+        self.assertEqual(diststyle, diststyle.clone())
+        self.assertNotEqual(diststyle, DistStyle('even', name=diststyle.name))
+
+    def test_alter_diststyle(self):
+        from django_redshift_backend import DistStyle
+        from testapp.models import TestModelWithDistStyle
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        old = TestModelWithDistStyle._meta.constraints[0]
+        new = DistStyle('even', name=old.name)
+        # a changed DistStyle is migrated as RemoveConstraint + AddConstraint
+        schema_editor.remove_constraint(TestModelWithDistStyle, old)
+        schema_editor.add_constraint(TestModelWithDistStyle, new)
+        self.assertEqual(schema_editor.deferred_sql, [])
+        self.assertEqual(schema_editor.collected_sql, [
+            'ALTER TABLE "testapp_testmodelwithdiststyle" ALTER DISTSTYLE EVEN;',
+        ])
+
+    def test_remove_diststyle(self):
+        from testapp.models import TestModelWithDistStyle
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        old = TestModelWithDistStyle._meta.constraints[0]
+        schema_editor.remove_constraint(TestModelWithDistStyle, old)
+        self.assertEqual(
+            [str(sql) for sql in schema_editor.deferred_sql],
+            ['ALTER TABLE "testapp_testmodelwithdiststyle" ALTER DISTSTYLE AUTO'],
+        )
+
+    def test_create_table_sortstyle(self):
+        from testapp.models import TestModelWithSortStyle
+        self.check_model_creation(TestModelWithSortStyle, expected_ddl_sortstyle)
+
+    def test_create_table_sortstyle_auto(self):
+        from django.db import models
+        from django_redshift_backend import SortStyle
+
+        class SortStyleAutoModel(models.Model):
+            class Meta:
+                app_label = 'testapp'
+                constraints = [SortStyle('auto')]
+
+        self.check_model_creation(SortStyleAutoModel, norm_sql(
+            '''CREATE TABLE "testapp_sortstyleautomodel" (
+            "id" integer identity(1, 1) NOT NULL PRIMARY KEY
+            ) SORTKEY AUTO;'''
+        ))
+
+    def test_sortstyle_interleaved_requires_sortkey(self):
+        from django.db import models
+        from django_redshift_backend import SortStyle
+
+        class SortStyleNoKeyModel(models.Model):
+            class Meta:
+                app_label = 'testapp'
+                constraints = [SortStyle('interleaved')]
+
+        with self.assertRaises(ValueError):
+            self.check_model_creation(SortStyleNoKeyModel, '')
+
+    def test_alter_sortstyle_to_compound(self):
+        from django_redshift_backend import SortStyle
+        from testapp.models import TestModelWithSortStyle
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        old = TestModelWithSortStyle._meta.constraints[0]
+        new = SortStyle('compound', name=old.name)
+        schema_editor.remove_constraint(TestModelWithSortStyle, old)
+        schema_editor.add_constraint(TestModelWithSortStyle, new)
+        self.assertEqual(schema_editor.deferred_sql, [])
+        self.assertEqual(schema_editor.collected_sql, [
+            'ALTER TABLE "testapp_testmodelwithsortstyle" '
+            'ALTER COMPOUND SORTKEY ("created_at", "customer_id");',
+        ])
+
+    def test_alter_sortstyle_to_interleaved(self):
+        from testapp.models import TestModelWithSortStyle
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        constraint = TestModelWithSortStyle._meta.constraints[0]
+        with self.assertRaises(NotSupportedError):
+            schema_editor.add_constraint(TestModelWithSortStyle, constraint)
+
+    def test_alter_sortstyle_auto_with_sortkey(self):
+        from django_redshift_backend import SortStyle
+        from testapp.models import TestModelWithSortStyle
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        old = TestModelWithSortStyle._meta.constraints[0]
+        new = SortStyle('auto', name=old.name)
+        schema_editor.remove_constraint(TestModelWithSortStyle, old)
+        with self.assertRaises(ValueError):
+            schema_editor.add_constraint(TestModelWithSortStyle, new)
+        self.assertEqual(schema_editor.collected_sql, [])
+
+    def test_create_table_sortkeys(self):
+        from testapp.models import TestModelWithSortKeys
+        self.check_model_creation(TestModelWithSortKeys, expected_ddl_sortkeys)
+
+    def test_sortkeys_with_sortkey_ordering(self):
+        from django.db import models
+        from django_redshift_backend import SortKey, SortKeys
+
+        class BothSortKeysModel(models.Model):
+            created_at = models.DateTimeField()
+
+            class Meta:
+                app_label = 'testapp'
+                indexes = [SortKeys(fields=['created_at'])]
+                ordering = [SortKey('created_at')]
+
+        with self.assertRaises(ValueError):
+            self.check_model_creation(BothSortKeysModel, '')
+
+    def test_alter_distkey(self):
+        from django_redshift_backend import DistKey
+        from testapp.models import TestModelWithMetaKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        old = TestModelWithMetaKeys._meta.indexes[0]
+        schema_editor.remove_index(TestModelWithMetaKeys, old)
+        schema_editor.add_index(
+            TestModelWithMetaKeys, DistKey(fields=['fk'], name=old.name)
+        )
+        self.assertEqual(schema_editor.deferred_sql, [])
+        self.assertEqual(schema_editor.collected_sql, [
+            'ALTER TABLE "testapp_testmodelwithmetakeys" ALTER DISTSTYLE KEY DISTKEY "fk_id";',
+        ])
+
+    def test_alter_distkey_with_diststyle_key(self):
+        from django.db import models
+        from django_redshift_backend import DistKey, DistStyle
+
+        class DistStyleKeyDistKeyModel(models.Model):
+            code = models.IntegerField()
+
+            class Meta:
+                app_label = 'testapp'
+                indexes = [DistKey(fields=['code'], name='distkey_code_idx')]
+                constraints = [DistStyle('key')]
+
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        schema_editor.add_index(DistStyleKeyDistKeyModel, DistStyleKeyDistKeyModel._meta.indexes[0])
+        schema_editor.add_constraint(DistStyleKeyDistKeyModel, DistStyleKeyDistKeyModel._meta.constraints[0])
+        # DistKey and DistStyle KEY alter the table once
+        self.assertEqual(schema_editor.collected_sql, [
+            'ALTER TABLE "testapp_diststylekeydistkeymodel" ALTER DISTSTYLE KEY DISTKEY "code";',
+        ])
+
+    def test_alter_sortkeys(self):
+        from django_redshift_backend import SortKeys
+        from testapp.models import TestModelWithSortKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        old = SortKeys(fields=['id'], name='sortkeys_id_idx')
+        new = TestModelWithSortKeys._meta.indexes[1]
+        schema_editor.remove_index(TestModelWithSortKeys, old)
+        schema_editor.add_index(TestModelWithSortKeys, new)
+        self.assertEqual(schema_editor.deferred_sql, [])
+        self.assertEqual(schema_editor.collected_sql, [
+            'ALTER TABLE "testapp_testmodelwithsortkeys" '
+            'ALTER COMPOUND SORTKEY ("created_at", "id");',
+        ])
+
+    def test_remove_sortkeys(self):
+        from testapp.models import TestModelWithSortKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        schema_editor.remove_index(TestModelWithSortKeys, TestModelWithSortKeys._meta.indexes[1])
+        self.assertEqual(
+            [str(sql) for sql in schema_editor.deferred_sql],
+            ['ALTER TABLE "testapp_testmodelwithsortkeys" ALTER SORTKEY NONE'],
+        )
+
+    def test_wait_for_table_keys(self):
+        from django_redshift_backend.base import TableStorageInfo
+        from testapp.models import TestModelWithSortKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        progress = [
+            TableStorageInfo('KEY(fk_id)', 'created_at', 40.0, 1000, 1000, 10),
+            TableStorageInfo('KEY(fk_id)', 'created_at', 0.0, 1000, 1000, 10),
+        ]
+        with mock.patch.object(conn, 'cursor'), \
+                mock.patch.object(conn.introspection, 'get_table_info', side_effect=progress), \
+                mock.patch('django_redshift_backend.base.time.sleep') as sleep:
+            info = schema_editor.wait_for_table_keys(TestModelWithSortKeys, poll_interval=5)
+        self.assertEqual(info, progress[1])
+        sleep.assert_called_once_with(5)
+
+    def test_wait_for_table_keys_timeout(self):
+        from django_redshift_backend.base import TableStorageInfo
+        from testapp.models import TestModelWithSortKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        info = TableStorageInfo('EVEN', None, None, 1000, 1000, 10)
+        with mock.patch.object(conn, 'cursor'), \
+                mock.patch.object(conn.introspection, 'get_table_info', return_value=info):
+            with self.assertRaises(TimeoutError):
+                schema_editor.wait_for_table_keys(TestModelWithSortKeys, timeout=0)
+
+    def test_alter_column_with_deep_copy(self):
+        from django.db import models
+        from django_redshift_backend.base import TablePrivileges
+        from testapp.models import TestModelWithSortKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor()
+        schema_editor.deferred_sql = []
+        schema_editor.alter_column_strategy = 'deep_copy'
+        old_field = TestModelWithSortKeys._meta.get_field('created_at')
+        new_field = models.DateField(default=datetime.date(2000, 1, 1))
+        new_field.set_attributes_from_name('created_at')
+        new_field.model = TestModelWithSortKeys
+        privileges = TablePrivileges('owner', [
+            ('PUBLIC', ['SELECT']),
+            ('GROUP "analysts"', ['SELECT', 'INSERT']),
+        ])
+        encodings = {'id': 'AZ64', 'created_at': 'AZ64', 'fk_id': 'RAW'}
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method, \
+                mock.patch('django_redshift_backend.base.transaction.atomic') as mock_atomic, \
+                mock.patch.object(schema_editor, '_constraint_names', return_value=[]), \
+                mock.patch.object(conn.introspection, 'get_dependent_views', return_value=[]), \
+                mock.patch.object(conn.introspection, 'get_column_encodings', return_value=encodings), \
+                mock.patch.object(conn.introspection, 'get_table_privileges', return_value=privileges):
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            mock_cursor.fetchone.return_value = (41,)
+            schema_editor.alter_field(TestModelWithSortKeys, old_field, new_field)
+        mock_atomic.assert_called_once_with(using='default', savepoint=False)
+        executed = [norm_sql(c.args[0]) for c in mock_cursor.execute.call_args_list]
+        # The IDENTITY is seeded after the table is locked.
+        self.assertEqual(executed, [
+            'LOCK TABLE "testapp_testmodelwithsortkeys"',
+            'SELECT MAX("id") FROM "testapp_testmodelwithsortkeys"',
+            'CREATE TABLE "testapp_testmodelwithsortkeys_deepcopy" ('
+            '"id" integer GENERATED BY DEFAULT AS IDENTITY(42, 1) ENCODE AZ64 '
+            'NOT NULL PRIMARY KEY, '
+            '"created_at" date DEFAULT %s NOT NULL, '
+            '"fk_id" integer ENCODE RAW NOT NULL'
+            ') DISTKEY("fk_id") SORTKEY("created_at", "id")',
+            'GRANT SELECT ON "testapp_testmodelwithsortkeys_deepcopy" TO PUBLIC',
+            'GRANT SELECT, INSERT ON "testapp_testmodelwithsortkeys_deepcopy" '
+            'TO GROUP "analysts"',
+            'INSERT INTO "testapp_testmodelwithsortkeys_deepcopy" ("id", "created_at", "fk_id") '
+            'SELECT "id", "created_at", "fk_id" FROM "testapp_testmodelwithsortkeys"',
+            'ALTER TABLE "testapp_testmodelwithsortkeys" '
+            'RENAME TO "testapp_testmodelwithsortkeys_deepcopy_old"',
+            'ALTER TABLE "testapp_testmodelwithsortkeys_deepcopy" '
+            'RENAME TO "testapp_testmodelwithsortkeys"',
+            'DROP TABLE "testapp_testmodelwithsortkeys_deepcopy_old"',
+            'ALTER TABLE "testapp_testmodelwithsortkeys" ADD CONSTRAINT '
+            '"testapp_testmodelwit_fk_id_39595f42_fk_testapp_t" FOREIGN KEY ("fk_id") '
+            'REFERENCES "testapp_testreferencedmodel" ("id")',
+            'ALTER TABLE "testapp_testmodelwithsortkeys" OWNER TO "owner"',
+        ])
+        self.assertEqual(
+            mock_cursor.execute.call_args_list[2].args[1], [datetime.date(2000, 1, 1)]
+        )
+
+    def test_alter_column_with_deep_copy_collect_sql(self):
+        from django.db import models
+        from testapp.models import TestModelWithSortKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        schema_editor.alter_column_strategy = 'deep_copy'
+        old_field = TestModelWithSortKeys._meta.get_field('created_at')
+        new_field = models.DateField(default=datetime.date(2000, 1, 1))
+        new_field.set_attributes_from_name('created_at')
+        new_field.model = TestModelWithSortKeys
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method, \
+                mock.patch.object(schema_editor, '_constraint_names', return_value=[]), \
+                mock.patch.object(conn.introspection, 'get_dependent_views', return_value=[]), \
+                mock.patch.object(conn.introspection, 'get_column_encodings', return_value={}), \
+                mock.patch.object(conn.introspection, 'get_table_privileges', return_value=None):
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            # The seed of the IDENTITY is only known when the migration is applied.
+            with self.assertRaisesRegex(NotSupportedError, 'deep copy of .* as SQL'):
+                schema_editor.alter_field(TestModelWithSortKeys, old_field, new_field)
+        mock_cursor.execute.assert_not_called()
+
+    def test_alter_column_with_deep_copy_seed(self):
+        from django.db import models
+        from testapp.models import TestModelWithSortKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor()
+        old_field = TestModelWithSortKeys._meta.get_field('created_at')
+        new_field = models.DateField(default=datetime.date(2000, 1, 1))
+        new_field.set_attributes_from_name('created_at')
+        new_field.model = TestModelWithSortKeys
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            mock_cursor.fetchone.return_value = (41,)
+            fragment, insert = schema_editor._copy_table_sqls(
+                TestModelWithSortKeys, '"t"', '"t_deepcopy"', [(old_field, new_field)]
+            )
+        self.assertIn('GENERATED BY DEFAULT AS IDENTITY(42, 1)', fragment[0])
+        mock_cursor.execute.assert_called_once_with('SELECT MAX("id") FROM "t"')
+
+    def test_alter_column_with_deep_copy_dependent_views(self):
+        from django.db import models
+        from testapp.models import TestModelWithSortKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        schema_editor.alter_column_strategy = 'deep_copy'
+        old_field = TestModelWithSortKeys._meta.get_field('created_at')
+        new_field = models.DateField(default=datetime.date(2000, 1, 1))
+        new_field.set_attributes_from_name('created_at')
+        new_field.model = TestModelWithSortKeys
+        with mock.patch.object(conn, 'cursor'), \
+                mock.patch.object(schema_editor, '_constraint_names', return_value=[]), \
+                mock.patch.object(conn.introspection, 'get_dependent_views', return_value=['v']):
+            with self.assertRaisesRegex(NotSupportedError, 'the views v depend on it'):
+                schema_editor.alter_field(TestModelWithSortKeys, old_field, new_field)
+        self.assertEqual(schema_editor.collected_sql, [])
+
+    def test_get_table_privileges(self):
+        from django_redshift_backend.base import TablePrivileges
+        conn = connections['default']
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            cursor = mock_cursor_method.return_value.__enter__.return_value
+            cursor.fetchone.return_value = (
+                'owner', '{owner=arwdRxtD/owner,=r/owner,bob=rwx/owner,"group analysts=ra/owner"}'
+            )
+            privileges = conn.introspection.get_table_privileges(cursor, 't')
+        self.assertEqual(privileges, TablePrivileges('owner', [
+            ('PUBLIC', ['SELECT']),
+            ('"bob"', ['SELECT', 'UPDATE', 'REFERENCES']),
+            ('GROUP "analysts"', ['SELECT', 'INSERT']),
+        ]))
+
+    def test_alter_uuid_to_compact_uuid(self):
+        from django_redshift_backend import CompactUUIDField
+        from testapp.models import TestModel
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        old_field = TestModel._meta.get_field('uuid')
+        new_field = CompactUUIDField(storage='varbyte')
+        new_field.set_attributes_from_name('uuid')
+        new_field.model = TestModel
+        schema_editor.alter_field(TestModel, old_field, new_field)
+        self.assertEqual(schema_editor.collected_sql, [
+            'ALTER TABLE "testapp_testmodel" ADD COLUMN "uuid_tmp" varbyte(16) '
+            'DEFAULT to_varbyte(\'00000000000000000000000000000000\', \'hex\')::varbyte NOT NULL;',
+            'UPDATE testapp_testmodel SET "uuid_tmp" = FROM_HEX(REPLACE("uuid", \'-\', \'\')) '
+            'WHERE "uuid" IS NOT NULL;',
+            'ALTER TABLE testapp_testmodel DROP COLUMN "uuid" CASCADE;',
+            'ALTER TABLE testapp_testmodel RENAME COLUMN "uuid_tmp" TO "uuid";',
+        ])
+
+    def test_compact_uuid_deconstruct(self):
+        from django_redshift_backend import CompactUUIDField
+        name, path, args, kwargs = CompactUUIDField(storage='varbyte').deconstruct()
+        self.assertEqual(path, 'django_redshift_backend.CompactUUIDField')
+        self.assertEqual(kwargs, {'storage': 'varbyte'})
+        with self.assertRaisesRegex(ValueError, 'storage must be one of char, varbyte'):
+            CompactUUIDField(storage='uuid')
+
+    def test_batch_alterations(self):
+        from django.db import models
+        from testapp.models import TestModelWithMetaKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        alterations = []
+        for name, new_field in [
+            ('age', models.BigIntegerField(default=0)),
+            ('created_at', models.DateField(default=datetime.date(2000, 1, 1))),
+        ]:
+            new_field.set_attributes_from_name(name)
+            new_field.model = TestModelWithMetaKeys
+            alterations.append((TestModelWithMetaKeys._meta.get_field(name), new_field))
+        with schema_editor.batch_alterations():
+            for old_field, new_field in alterations:
+                schema_editor.alter_field(TestModelWithMetaKeys, old_field, new_field)
+            self.assertEqual(schema_editor.collected_sql, [])
+        self.assertEqual(schema_editor.collected_sql, [
+            'ALTER TABLE "testapp_testmodelwithmetakeys" ADD COLUMN "age_tmp" bigint DEFAULT 0 NOT NULL;',
+            'ALTER TABLE "testapp_testmodelwithmetakeys" ADD COLUMN "created_at_tmp" date '
+            'DEFAULT \'2000-01-01\'::date NOT NULL;',
+            'UPDATE testapp_testmodelwithmetakeys SET '
+            '"age_tmp" = COALESCE("age"::bigint, "age_tmp"), '
+            '"created_at_tmp" = COALESCE("created_at"::date, "created_at_tmp");',
+            'ALTER TABLE testapp_testmodelwithmetakeys DROP COLUMN "age" CASCADE;',
+            'ALTER TABLE testapp_testmodelwithmetakeys DROP COLUMN "created_at" CASCADE;',
+            'ALTER TABLE testapp_testmodelwithmetakeys RENAME COLUMN "age_tmp" TO "age";',
+            'ALTER TABLE testapp_testmodelwithmetakeys RENAME COLUMN "created_at_tmp" TO "created_at";',
+        ])
+
+    def test_batch_alterations_flushed_before_other_statements(self):
+        from django.db import models
+        from testapp.models import TestModelWithMetaKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        old_field = TestModelWithMetaKeys._meta.get_field('age')
+        new_field = models.BigIntegerField(default=0)
+        new_field.set_attributes_from_name('age')
+        new_field.model = TestModelWithMetaKeys
+        with schema_editor.batch_alterations():
+            schema_editor.alter_field(TestModelWithMetaKeys, old_field, new_field)
+            schema_editor.execute('SELECT 1')
+            self.assertEqual(len(schema_editor.collected_sql), 5)
+            self.assertEqual(schema_editor.collected_sql[-1], 'SELECT 1;')
+
+    def test_chunked_backfill(self):
+        from django.db import models
+        from django_redshift_backend.base import ChunkedUpdate
+        from testapp.models import TestModelWithMetaKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor()
+        old_field = TestModelWithMetaKeys._meta.get_field('age')
+        new_field = models.BigIntegerField(default=0)
+        new_field.set_attributes_from_name('age')
+        with override_settings(REDSHIFT_BACKFILL_CHUNK_SIZE=100), \
+                mock.patch.object(conn, 'cursor') as mock_cursor_method, \
+                mock.patch.object(conn.introspection, 'get_table_description', return_value=[]), \
+                mock.patch('django_redshift_backend.base.transaction.atomic'):
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            fragment, actions = schema_editor._alter_columns_with_update(
+                TestModelWithMetaKeys, [(old_field, new_field)])
+            update = actions[0][0]
+            self.assertIsInstance(update, ChunkedUpdate)
+            self.assertEqual(update.key, 'id')  # created_at sortkey isn't an integer
+
+            # MIN/MAX of the key, and resume after 100
+            mock_cursor.fetchone.side_effect = [(1, 250), (100,)]
+            mock_cursor.rowcount = 100
+            schema_editor.execute(update)
+
+        updates = [
+            (args[0], args[1] if len(args) > 1 else None)
+            for name, args, kwargs in mock_cursor.execute.mock_calls
+            if args[0].startswith('UPDATE testapp')
+        ]
+        self.assertEqual(updates, [
+            ('UPDATE testapp_testmodelwithmetakeys SET "age_tmp" = "age" '
+             'WHERE "age" IS NOT NULL AND "id" BETWEEN %s AND %s', [101, 200]),
+            ('UPDATE testapp_testmodelwithmetakeys SET "age_tmp" = "age" '
+             'WHERE "age" IS NOT NULL AND "id" BETWEEN %s AND %s', [201, 250]),
+            ('UPDATE testapp_testmodelwithmetakeys SET "age_tmp" = "age" '
+             'WHERE "age" IS NOT NULL AND "id" IS NULL', None),
+        ])
+        self.assertTrue(mock_cursor.execute.mock_calls[-1].args[0].startswith(
+            'DELETE FROM "django_redshift_backfill"'))
+
+    def test_batch_statements(self):
+        from testapp.models import TestModelWithMetaKeys
+        conn = connections['default']
+        with override_settings(REDSHIFT_BATCH_STATEMENTS=100), \
+                mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            mock_cursor.mogrify.side_effect = lambda sql, params: (sql % tuple(params)).encode()
+            with conn.schema_editor() as schema_editor:
+                schema_editor.create_model(TestModelWithMetaKeys)
+                schema_editor.execute('SELECT %s', [1])
+                mock_cursor.execute.assert_not_called()
+        self.assertIsNone(conn.batching_schema_editor)
+        mock_cursor.execute.assert_called_once()
+        sqls = mock_cursor.execute.call_args.args[0].split(';\n')
+        self.assertEqual(len(sqls), 3)
+        self.assertEqual(norm_sql(sqls[0] + ';'), expected_ddl_meta_keys)
+        self.assertEqual(sqls[1], 'SELECT 1')
+        self.assertTrue(sqls[2].startswith('ALTER TABLE "testapp_testmodelwithmetakeys" ADD CONSTRAINT'))
+
+    def test_batch_statements_error(self):
+        from django.db.utils import DatabaseError
+        conn = connections['default']
+        with override_settings(REDSHIFT_BATCH_STATEMENTS=100), \
+                mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            mock_cursor.mogrify.side_effect = lambda sql, params: (sql % tuple(params)).encode()
+            mock_cursor.execute.side_effect = [DatabaseError('batch'), None, DatabaseError('second')]
+            with self.assertRaisesRegex(DatabaseError, 'second'):
+                with conn.schema_editor() as schema_editor:
+                    schema_editor.execute('SELECT 1')
+                    schema_editor.execute('SELECT 2')
+        self.assertEqual(
+            [c.args[0] for c in mock_cursor.execute.call_args_list],
+            ['SELECT 1;\nSELECT 2', 'SELECT 1', 'SELECT 2'],
+        )
+
+    def test_alter_column_strategy_by_table_size(self):
+        from django_redshift_backend.base import TableStorageInfo
+        from testapp.models import TestModelWithSortKeys
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        self.assertEqual(schema_editor._get_alter_column_strategy(TestModelWithSortKeys), 'recreate')
+        info = TableStorageInfo('KEY(fk_id)', 'created_at', 0.0, 5000000, 5000000, 100)
+        with override_settings(REDSHIFT_DEEP_COPY_MIN_ROWS=1000000), \
+                mock.patch.object(conn, 'cursor'), \
+                mock.patch.object(conn.introspection, 'get_table_info', return_value=info):
+            self.assertEqual(schema_editor._get_alter_column_strategy(TestModelWithSortKeys), 'deep_copy')
+
+    def test_alter_column_strategy_operation(self):
+        from django.db import migrations, models
+        from django_redshift_backend.operations import AlterColumnStrategy
+        operation = AlterColumnStrategy('deep_copy', [
+            migrations.AlterField('testmodel', 'text', models.CharField(max_length=10)),
+        ])
+        name, args, kwargs = operation.deconstruct()
+        self.assertEqual(name, 'AlterColumnStrategy')
+        self.assertEqual(args, ['deep_copy', operation.operations])
+        self.assertTrue(operation.reversible)
+        with self.assertRaises(ValueError):
+            AlterColumnStrategy('update', [])
+
+    def test_batch_alter_fields_operation(self):
+        from django.db import migrations, models
+        from django_redshift_backend.operations import BatchAlterFields
+        operation = BatchAlterFields([
+            migrations.AlterField('testmodel', 'text', models.CharField(max_length=10)),
+            migrations.RunPython(migrations.RunPython.noop),
+        ])
+        name, args, kwargs = operation.deconstruct()
+        self.assertEqual(name, 'BatchAlterFields')
+        self.assertEqual(args, [operation.operations])
+        self.assertFalse(operation.reversible)
+        self.assertFalse(operation.reduces_to_sql)
+
+    def test_create_materialized_view(self):
+        from testapp.models import TestMaterializedView
+        self.check_model_creation(TestMaterializedView, norm_sql(
+            '''CREATE MATERIALIZED VIEW "testapp_testmaterializedview"
+            DISTKEY("age") AUTO REFRESH YES AS
+            SELECT "testapp_testparentmodel"."age",
+            COUNT("testapp_testparentmodel"."id") AS "total"
+            FROM "testapp_testparentmodel"
+            WHERE "testapp_testparentmodel"."age" >= 20
+            GROUP BY "testapp_testparentmodel"."age";'''
+        ))
+
+    def test_materialized_view_deconstruct(self):
+        from django_redshift_backend import MaterializedView
+        from testapp.models import TestMaterializedView
+        view = TestMaterializedView._meta.constraints[0]
+        path, args, kwargs = view.deconstruct()
+        self.assertEqual(path, 'django_redshift_backend.MaterializedView')
+        self.assertIn('WHERE "testapp_testparentmodel"."age" >= %s', args[0])
+        self.assertEqual(kwargs, {
+            'params': (20,),
+            'auto_refresh': True,
+            'name': 'testapp_testmaterializedview_materializedview',
+        })
+        # migrations compare the SQL of the query.
+        self.assertEqual(view, view.clone())
+        self.assertNotEqual(view, MaterializedView(args[0], (30,), name=view.name))
+
+    def test_alter_materialized_view(self):
+        from django_redshift_backend import MaterializedView
+        from testapp.models import TestMaterializedView
+        conn = connections['default']
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        old = TestMaterializedView._meta.constraints[0]
+        new = MaterializedView('SELECT 1 AS "age", 2 AS "total"', name=old.name)
+
+        # a changed query is migrated as RemoveConstraint + AddConstraint, of
+        # which the model has the constraint of the target state.
+        with mock.patch.object(TestMaterializedView._meta, 'constraints', []):
+            schema_editor.remove_constraint(TestMaterializedView, old)
+            field = TestMaterializedView._meta.get_field('total')
+            schema_editor.alter_field(TestMaterializedView, field, field)
+        with mock.patch.object(TestMaterializedView._meta, 'constraints', [new]):
+            schema_editor.add_field(TestMaterializedView, field)
+            schema_editor.add_constraint(TestMaterializedView, new)
+        self.assertEqual(schema_editor.deferred_sql, [])
+        # the view is created again, without a table in between.
+        self.assertEqual(schema_editor.collected_sql, [
+            'DROP MATERIALIZED VIEW "testapp_testmaterializedview";',
+            'CREATE MATERIALIZED VIEW "testapp_testmaterializedview" DISTKEY("age")'
+            ' AS SELECT 1 AS "age", 2 AS "total";',
+        ])
+
+        schema_editor.collected_sql = []
+        schema_editor.delete_model(TestMaterializedView)
+        self.assertEqual(schema_editor.collected_sql, [
+            'DROP MATERIALIZED VIEW "testapp_testmaterializedview";',
+        ])
+
+    def test_remove_materialized_view(self):
+        from testapp.models import TestMaterializedView
+        conn = connections['default']
+        view = TestMaterializedView._meta.constraints[0]
+        # a table replaces the removed view, before the next statement.
+        with mock.patch.object(TestMaterializedView._meta, 'constraints', []), \
+                conn.schema_editor(collect_sql=True) as schema_editor:
+            schema_editor.remove_constraint(TestMaterializedView, view)
+            self.assertEqual(len(schema_editor.collected_sql), 1)
+            field = TestMaterializedView._meta.get_field('total')
+            schema_editor.remove_field(TestMaterializedView, field)
+        self.assertEqual(schema_editor.collected_sql[:3], [
+            'DROP MATERIALIZED VIEW "testapp_testmaterializedview";',
+            'CREATE TABLE "testapp_testmaterializedview" ("age" integer NOT NULL PRIMARY KEY,'
+            ' "total" bigint NOT NULL) DISTKEY("age");',
+            'ALTER TABLE "testapp_testmaterializedview" DROP COLUMN "total" CASCADE;',
+        ])
+
+        # or at the end of the migration.
+        with mock.patch.object(TestMaterializedView._meta, 'constraints', []), \
+                conn.schema_editor(collect_sql=True) as schema_editor:
+            schema_editor.remove_constraint(TestMaterializedView, view)
+        self.assertEqual(schema_editor.collected_sql[1], norm_sql(
+            'CREATE TABLE "testapp_testmaterializedview" ("age" integer NOT NULL PRIMARY KEY,'
+            ' "total" bigint NOT NULL) DISTKEY("age");'))
+
+    def test_add_materialized_view_to_table_with_rows(self):
+        from testapp.models import TestMaterializedView
+        conn = connections['default']
+        view = TestMaterializedView._meta.constraints[0]
+        schema_editor = conn.schema_editor()
+        schema_editor.deferred_sql = []
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method, \
+                mock.patch.object(schema_editor, 'execute') as mock_execute:
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            mock_cursor.fetchone.return_value = (1,)
+            with self.assertRaisesRegex(NotSupportedError, 'the table has rows'):
+                schema_editor.add_constraint(TestMaterializedView, view)
+            mock_cursor.execute.assert_called_once_with(
+                'SELECT 1 FROM "testapp_testmaterializedview" LIMIT 1')
+            mock_execute.assert_not_called()
+
+            # an empty table is replaced.
+            mock_cursor.fetchone.return_value = None
+            schema_editor.add_constraint(TestMaterializedView, view)
+            self.assertEqual(mock_execute.call_count, 2)
+
     @skipif_no_database
     def test_sqlmigrate(self):
         from django.db import connection
@@ -0,0 +1,77 @@
+import unittest
+from unittest import mock
+
+from django.db import connections, migrations
+from django.test import override_settings
+
+from django_redshift_backend.sizing import (
+    get_sized_fields,
+    make_migration,
+    propose_max_length,
+    propose_sizes,
+)
+
+
+class ProposeSizesTest(unittest.TestCase):
+
+    def test_propose_max_length(self):
+        self.assertEqual(propose_max_length(40, 40, 1, headroom=0.25), 50)
+        # the characters of the stored values stay valid with the multiplier.
+        self.assertEqual(propose_max_length(40, 40, 3, headroom=0.25), 50)
+        # the column holds the bytes of multi-byte characters.
+        self.assertEqual(propose_max_length(40, 120, 1, headroom=0.25), 150)
+        self.assertEqual(propose_max_length(None, None, 1), 1)
+
+    def test_get_sized_fields(self):
+        from testapp.models import TestModel, TestModelWithMetaKeys
+        self.assertEqual([f.name for f in get_sized_fields(TestModel)], ['text'])
+        self.assertEqual([f.name for f in get_sized_fields(TestModelWithMetaKeys)], ['name'])
+
+    @override_settings(REDSHIFT_VARCHAR_LENGTH_MULTIPLIER=3)
+    def test_propose_sizes(self):
+        from testapp.models import TestModel, TestModelWithMetaKeys
+        conn = connections['default']
+        with mock.patch.object(conn, 'cursor') as mock_cursor_method:
+            mock_cursor = mock_cursor_method.return_value.__enter__.return_value
+            mock_cursor.fetchone.side_effect = [(380, 400), (20, 60)]
+            proposals = propose_sizes(conn, [TestModel, TestModelWithMetaKeys])
+        executed_sql = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        self.assertEqual(executed_sql, [
+            'SELECT MAX(LEN("text")), MAX(OCTET_LENGTH("text")) FROM "testapp_testmodel"',
+            'SELECT MAX(LEN("name")), MAX(OCTET_LENGTH("name"))'
+            ' FROM "testapp_testmodelwithmetakeys"',
+        ])
+        text, name = proposals
+        self.assertEqual(
+            (text.declared_bytes, text.max_chars, text.max_bytes, text.max_length),
+            (65535, 380, 400, 475),
+        )
+        self.assertFalse(text.in_place)
+        self.assertEqual(
+            (name.declared_bytes, name.max_chars, name.max_bytes, name.max_length),
+            (300, 20, 60, 25),
+        )
+        self.assertTrue(name.in_place)
+
+        migration = make_migration('testapp', '0002_right_size_varchars',
+                                   [('testapp', '0001_initial')], [name])
+        operation, = migration.operations
+        self.assertIsInstance(operation, migrations.AlterField)
+        self.assertEqual((operation.model_name, operation.name), ('testmodelwithmetakeys', 'name'))
+        self.assertEqual(operation.field.max_length, 25)
+
+    @override_settings(REDSHIFT_VARCHAR_LENGTH_MULTIPLIER=3)
+    def test_alter_size_with_multiplier(self):
+        from testapp.models import TestModelWithMetaKeys
+        conn = connections['default']
+        old_field = TestModelWithMetaKeys._meta.get_field('name')
+        new_field = old_field.clone()
+        new_field.max_length = 25
+        new_field.set_attributes_from_name('name')
+        new_field.model = TestModelWithMetaKeys
+        schema_editor = conn.schema_editor(collect_sql=True)
+        schema_editor.deferred_sql = []
+        schema_editor.alter_field(TestModelWithMetaKeys, old_field, new_field)
+        self.assertEqual(schema_editor.collected_sql, [
+            'ALTER TABLE "testapp_testmodelwithmetakeys" ALTER COLUMN "name" TYPE varchar(75);',
+        ])
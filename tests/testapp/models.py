@@ -2,7 +2,14 @@
 
 from django.db import models
 
-from django_redshift_backend.base import DistKey, SortKey
+from django_redshift_backend import (
+    CompactUUIDField,
+    HLLSketchField,
+    MaterializedView,
+    RedshiftQuerySet,
+    SuperJSONField,
+)
+from django_redshift_backend.base import DistKey, DistStyle, SortKey, SortKeys, SortStyle
 
 
 class TestModel(models.Model):
@@ -26,6 +33,30 @@ class TestModelWithMetaKeys(models.Model):
         ordering = [SortKey('created_at'), SortKey('-id')]
 
 
+class TestModelWithDistStyle(models.Model):
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [DistStyle('all')]
+
+
+class TestModelWithSortStyle(models.Model):
+    created_at = models.DateTimeField()
+    customer_id = models.IntegerField()
+
+    class Meta:
+        ordering = [SortKey('created_at'), SortKey('customer_id')]
+        constraints = [SortStyle('interleaved')]
+
+
+class TestModelWithSortKeys(models.Model):
+    created_at = models.DateTimeField()
+    fk = models.ForeignKey(TestReferencedModel, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [DistKey(fields=['fk']), SortKeys(fields=['created_at', 'id'])]
+
+
 class TestParentModel(models.Model):
     age = models.IntegerField()
 
@@ -33,3 +64,49 @@ class TestParentModel(models.Model):
 class TestChildModel(models.Model):
     parent = models.ForeignKey(TestParentModel, on_delete=models.CASCADE)
     age = models.IntegerField()
+
+
+class TestModelWithCompactUUID(models.Model):
+    uuid = CompactUUIDField()
+    bytes_uuid = CompactUUIDField(storage='varbyte')
+
+
+class TestModelWithBinary(models.Model):
+    data = models.BinaryField()
+
+
+class TestModelWithJSON(models.Model):
+    data = models.JSONField(null=True)
+
+
+class TestModelWithSuperJSON(models.Model):
+    data = SuperJSONField(null=True)
+
+
+class TestModelWithHLLSketch(models.Model):
+    day = models.DateField()
+    users = HLLSketchField()
+
+
+class TestModelWithQuerySet(models.Model):
+    amount = models.IntegerField()
+    created_at = models.DateTimeField()
+    parent = models.ForeignKey(TestParentModel, on_delete=models.CASCADE)
+
+    objects = RedshiftQuerySet.as_manager()
+
+
+class TestMaterializedView(models.Model):
+    age = models.IntegerField(primary_key=True)
+    total = models.BigIntegerField()
+
+    objects = RedshiftQuerySet.as_manager()
+
+    class Meta:
+        indexes = [DistKey(fields=['age'])]
+        constraints = [MaterializedView(
+            TestParentModel.objects.filter(age__gte=20).values('age').annotate(
+                total=models.Count('id'),
+            ),
+            auto_refresh=True,
+        )]